@@ -0,0 +1,161 @@
+// Offline stand-in for the stat database, below the real player-stat-functions.js.
+//
+//     STAT_STANDIN_FIXTURES=fixtures.json node db_standin.js --worker
+//
+// tedious and databaseConnection.js are replaced by an in-memory connection before
+// player-stat-functions.js is loaded, so every lookup and all of the aggregation in
+// retrieve-statistics.js and player-stat-functions.js (getGameStats included) runs unchanged.
+// Each query is recognized by its SQL and answered from the fixtures written by
+// stat_standin.py's build_fixtures(). A query the stand-in does not know fails loudly, so
+// new SQL cannot silently go unbenchmarked. STAT_STANDIN_LATENCY (seconds) is added to every
+// query to mimic the round trip to Azure.
+const EventEmitter = require('events');
+const fs = require('fs');
+const Module = require('module');
+const path = require('path');
+
+const STAT_DIR = path.join(__dirname, '..', 'stat-retrieval-functions');
+
+const fixtures = JSON.parse(fs.readFileSync(process.env.STAT_STANDIN_FIXTURES || 'stat_standin.json', 'utf8'));
+const queryLatencyMs = parseFloat(process.env.STAT_STANDIN_LATENCY || '0') * 1000;
+
+// Must match fixture_key in stat_standin.py
+function key(...parts) {
+    return parts.join('|');
+}
+
+function parameters(request) {
+    const values = {};
+    for (const parameter of request.parameters) {
+        values[parameter.name] = parameter.value;
+    }
+    return values;
+}
+
+// Games of a team before the given week, newest first, like ORDER BY Season DESC, Week DESC
+function gamesBefore(teamId, year, week) {
+    return fixtures.schedule
+        .filter(game => (game.HomeTeamID === teamId || game.AwayTeamID === teamId) &&
+            (game.Season < year || (game.Season === year && game.Week < week)))
+        .sort((a, b) => b.Season - a.Season || b.Week - a.Week);
+}
+
+function won(game, teamId) {
+    return (game.HomeTeamID === teamId && game.HomePoints > game.AwayPoints) ||
+        (game.AwayTeamID === teamId && game.AwayPoints > game.HomePoints);
+}
+
+// [pattern identifying the query, rows for its parameters]; rows are objects in column order
+const queries = [
+    // getMatchupTeams
+    [/FROM Schedule\s+WHERE GameID = @GameID/, (params) => fixtures.schedule
+        .filter(game => game.GameID === params.GameID)
+        .map(game => ({ HomeTeamID: game.HomeTeamID, AwayTeamID: game.AwayTeamID, Season: game.Season, Week: game.Week }))],
+    // getTeamStats
+    [/AS FCSFBSRatio/, (params) => {
+        const stats = fixtures.team_stats[key(params.TeamID, params.Season, params.Week, params.Period)];
+        return stats ? [stats] : [];
+    }],
+    // getTeamSOR: the team's opponents and results
+    [/END AS OpponentID/, (params) => {
+        let games = gamesBefore(params.TeamID, Number(params.Year), Number(params.Week));
+        if (params.Period === 'lastGame') {
+            games = games.slice(0, 1);
+        } else if (params.Period === 'last3Games') {
+            games = games.slice(0, 3);
+        }
+        return games.map(game => ({
+            OpponentID: game.HomeTeamID === params.TeamID ? game.AwayTeamID : game.HomeTeamID,
+            Result: won(game, params.TeamID) ? 'Win' : 'Loss'
+        }));
+    }],
+    // getTeamRecord: one result per game of the season before the week
+    [/WHEN HomePoints = AwayPoints THEN 'Draw'/, (params) => gamesBefore(params.TeamID, Number(params.Year), Number(params.Week))
+        .filter(game => game.Season === Number(params.Year))
+        .map(game => ({ Result: won(game, params.TeamID) ? 'Win' : game.HomePoints === game.AwayPoints ? 'Draw' : 'Loss' }))],
+    // getTeamRoster
+    [/SELECT TOP 29 PlayerID FROM @FinalPlayers/, (params) =>
+        (fixtures.rosters[key(params.TeamID, params.Year, params.Period)] || []).map(playerId => ({ PlayerID: playerId }))],
+    // getPlayerStats: the player IDs are inlined into the INSERT INTO #PlayerIDs statement
+    [/CREATE TABLE #PlayerIDs/, (params, sql) => {
+        const values = sql.slice(sql.indexOf('VALUES'), sql.indexOf('CREATE TABLE #GamesToConsider'));
+        const playerIds = [...values.matchAll(/\('([^']*)'\)/g)].map(match => match[1]);
+        return playerIds
+            .map(playerId => fixtures.player_stats[key(playerId, params.Year, params.Week, params.Period)])
+            .filter(stats => stats);
+    }]
+];
+
+function answer(request) {
+    const sql = request.sqlTextOrProcedure;
+    const query = queries.find(([pattern]) => pattern.test(sql));
+    if (!query) {
+        throw new Error(`db_standin.js has no fixture for this query:\n${sql.trim().slice(0, 200)}`);
+    }
+    return query[1](parameters(request), sql);
+}
+
+class Request extends EventEmitter {
+    constructor(sqlTextOrProcedure, callback) {
+        super();
+        this.sqlTextOrProcedure = sqlTextOrProcedure;
+        this.callback = callback;
+        this.parameters = [];
+    }
+
+    addParameter(name, type, value) {
+        this.parameters.push({ name, type, value });
+    }
+}
+
+class StandinConnection extends EventEmitter {
+    constructor() {
+        super();
+        // Like a tedious connection, one request runs at a time
+        this.pending = Promise.resolve();
+    }
+
+    execSql(request) {
+        this.pending = this.pending.then(() => new Promise(resolve => setTimeout(() => {
+            let rows;
+            try {
+                rows = answer(request);
+            } catch (error) {
+                request.callback(error);
+                resolve();
+                return;
+            }
+            for (const row of rows) {
+                request.emit('row', Object.entries(row).map(([colName, value]) => ({ value, metadata: { colName } })));
+            }
+            request.emit('requestCompleted');
+            request.callback(null, rows.length, []);
+            resolve();
+        }, queryLatencyMs)));
+    }
+
+    close() {}
+}
+
+const connection = new StandinConnection();
+const tedious = {
+    Connection: StandinConnection,
+    Request,
+    // Parameter types only label the values here
+    TYPES: new Proxy({}, { get: (target, name) => ({ name }) })
+};
+const databaseConnection = { connection, connectPromise: Promise.resolve(connection), config: {} };
+
+const originalLoad = Module._load;
+Module._load = function (request, parent, isMain) {
+    if (request === 'tedious') {
+        return tedious;
+    }
+    if (request === './databaseConnection' && parent && path.dirname(parent.filename) === STAT_DIR) {
+        return databaseConnection;
+    }
+    return originalLoad.apply(this, arguments);
+};
+
+// Runs the worker (or a one-off call) exactly as `node player-stat-functions.js ...` would
+require(path.join(STAT_DIR, 'player-stat-functions.js'));
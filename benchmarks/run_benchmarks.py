@@ -0,0 +1,362 @@
+"""Stage-level benchmarks for the whole pipeline, on fixed offline fixtures.
+
+Stages, in pipeline order:
+
+    stat_retrieval_cold   create-roster.py ingesting games through the real player-stat-functions.js
+                          worker on an in-memory database (db_standin.js), starting from an empty
+                          stat cache (skipped without Node)
+    stat_retrieval_warm   the same games again with the stat cache filled
+    preprocess_data       feature extraction for the ingested games
+    training_epoch        one epoch of create_combined_model (skipped without Keras)
+    inference_batch       the NumPy ensemble runtime over every game in one call
+    inference_single      the same games one call at a time
+    app_routes            /predictions/{week} and /predict/{game_id} through FastAPI's TestClient
+                          (skipped without fastapi/httpx)
+
+Each stage runs ``--repeat`` times and keeps the fastest run. Results are written to JSON and
+compared with a stored baseline; the run fails if any stage got slower by more than ``--threshold``:
+
+    python benchmarks/run_benchmarks.py                    # compare with benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --update-baseline  # record a new baseline on this machine
+
+No baseline is committed: timings only compare on the machine that recorded them, so record one
+with every stage running (Keras, FastAPI and Node installed) on the machine that runs the checks.
+
+``--feature-mask`` runs preprocessing, training and inference with the columns kept by
+feature_selection.py, to measure what pruning saves against a full-width baseline.
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+STAT_DIR = os.path.join(REPO_DIR, 'stat-retrieval-functions')
+FRONTEND_DIR = os.path.join(REPO_DIR, 'frontend')
+sys.path[:0] = [STAT_DIR, FRONTEND_DIR, BENCHMARK_DIR]
+
+from ensemble_runtime import EnsembleRuntime  # noqa: E402
+from feature_selection import load_selected_layout  # noqa: E402
+from game_features import LAYOUT, extract_features  # noqa: E402
+from stat_standin import build_fixtures  # noqa: E402
+from stat_worker import StatWorkerPool  # noqa: E402
+
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, 'baseline.json')
+RESULTS_PATH = os.path.join(BENCHMARK_DIR, 'results.json')
+
+# Layer widths of create_combined_model, used for the random fixture ensemble
+TRUNK_UNITS = [128, 64]
+HEAD_UNITS = {'scores_output': ([64, 32, 2], ['relu', 'relu', 'relu']),
+              'win_chance_output': ([64, 32, 1], ['relu', 'relu', 'sigmoid'])}
+ENSEMBLE_SIZE = 5
+
+
+class Skipped(Exception):
+    """Raised by a stage that cannot run in this environment."""
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def timed(function, repeat):
+    """Fastest of ``repeat`` runs, and the last run's return value."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def write_random_ensemble(path, n_features, seed=0):
+    """An ensemble.npz with the combined model's shapes and random weights."""
+    rng = np.random.default_rng(seed)
+    arrays = {}
+
+    def add(prefix, units, inputs):
+        for i, width in enumerate(units):
+            arrays[f'{prefix}_{i}_kernel'] = (rng.standard_normal((ENSEMBLE_SIZE, inputs, width))
+                                              / np.sqrt(inputs)).astype(np.float32)
+            arrays[f'{prefix}_{i}_bias'] = np.zeros((ENSEMBLE_SIZE, width), dtype=np.float32)
+            inputs = width
+
+    add('trunk', TRUNK_UNITS, n_features)
+    for name, (units, _) in HEAD_UNITS.items():
+        add(name, units, TRUNK_UNITS[-1])
+    meta = {'models': [f'random_{i}' for i in range(ENSEMBLE_SIZE)], 'n_features': n_features,
+            'trunk': ['relu'] * len(TRUNK_UNITS),
+            'heads': {name: activations for name, (_, activations) in HEAD_UNITS.items()}}
+    np.savez(path, meta=np.array(json.dumps(meta)), **arrays)
+
+
+class Benchmark:
+    def __init__(self, work_dir, n_games, repeat, query_latency, layout=LAYOUT):
+        self.work_dir = work_dir
+        self.n_games = n_games
+        self.repeat = repeat
+        self.layout = layout
+        self.results = {}
+
+        self.standin_fixtures = os.path.join(work_dir, 'stat_standin.json')
+        self.schedule = build_fixtures(self.standin_fixtures, n_games)
+        os.environ['STAT_STANDIN_FIXTURES'] = self.standin_fixtures
+        os.environ['STAT_STANDIN_LATENCY'] = str(query_latency)
+        self.roster = load_module('create_roster', os.path.join(STAT_DIR, 'create-roster.py'))
+        self.games = None
+        self.X = None
+        self.game_ids = None
+
+    def record(self, stage, seconds, items):
+        self.results[stage] = {'seconds': seconds, 'items': items, 'per_item_ms': 1000 * seconds / max(items, 1)}
+
+    def run(self, stages):
+        for stage in stages:
+            try:
+                getattr(self, stage)()
+            except Skipped as reason:
+                self.results[stage] = {'skipped': str(reason)}
+        # Stages that only ran to set up fixtures for the requested ones are not reported
+        return {stage: self.results[stage] for stage in stages}
+
+    def _ingest_all(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            games = [self.roster.ingest_game(game) for game in self.schedule]
+        games = [game for game in games if game is not None]
+        # Poll votes are added by update_json_with_votes.js after ingestion
+        votes = {game['GameID']: game for game in self.schedule}
+        for game in games:
+            for field in ('HomeAPVotes', 'AwayAPVotes', 'HomeFCSVotes', 'AwayFCSVotes'):
+                game[field] = votes[game['GameID']][field]
+        return games
+
+    def _use_fresh_stat_cache(self):
+        cache_path = os.path.join(self.work_dir, 'stat_cache.sqlite')
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.roster.close_stat_cache()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(cache_path + suffix):
+                os.remove(cache_path + suffix)
+        self.roster.STAT_CACHE_PATH = cache_path
+
+    def stat_retrieval_cold(self):
+        if shutil.which('node') is None:
+            raise Skipped('Node is not installed')
+        script = os.path.join(BENCHMARK_DIR, 'db_standin.js')
+        self.roster.stat_worker_pool = StatWorkerPool(size=1, script=script)
+        self.roster.stat_worker_pool.call('getMatchupInfo', self.schedule[0]['GameID'])  # Worker start-up
+
+        def ingest_cold():
+            self._use_fresh_stat_cache()
+            return self._ingest_all()
+
+        seconds, self.games = timed(ingest_cold, self.repeat)
+        if len(self.games) != len(self.schedule):
+            raise RuntimeError(f"Only {len(self.games)} of {len(self.schedule)} fixture games were ingested")
+        self.record('stat_retrieval_cold', seconds, len(self.games))
+
+    def stat_retrieval_warm(self):
+        if self.games is None:
+            self.stat_retrieval_cold()
+        seconds, _ = timed(self._ingest_all, self.repeat)
+        self.record('stat_retrieval_warm', seconds, len(self.games))
+
+    def preprocess_data(self):
+        if self.games is None:
+            self.stat_retrieval_cold()
+        seconds, (X, _, _) = timed(lambda: extract_features(self.games, None, self.layout), self.repeat)
+        if X.shape[0] != len(self.games):
+            raise RuntimeError(f"Only {X.shape[0]} of {len(self.games)} fixture games passed the checks")
+        self.X = X
+        self.game_ids = [game['GameID'] for game in self.games]
+        self.record('preprocess_data', seconds, X.shape[0])
+
+    def training_epoch(self):
+        if self.X is None:
+            self.preprocess_data()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                create_model = load_module('create_model', os.path.join(STAT_DIR, 'create_model.py'))
+        except ImportError as e:
+            raise Skipped(f"create_model.py could not be imported: {e}")
+
+        X = (self.X - self.X.mean(axis=0)) / np.where(self.X.std(axis=0) > 0, self.X.std(axis=0), 1)
+        y = np.array([[game['HomePoints'], game['AwayPoints']] for game in self.games], dtype=float)
+        labels = {'scores_output': y, 'win_chance_output': (y[:, 0] > y[:, 1]).astype(float)}
+
+        def one_epoch():
+            model = create_model.create_combined_model(X.shape[1])
+            start = time.perf_counter()
+            model.fit(X, labels, epochs=1, batch_size=64, verbose=0)
+            return time.perf_counter() - start
+
+        # Model construction and graph tracing are excluded; only the epoch itself is timed
+        seconds = min(one_epoch() for _ in range(self.repeat))
+        self.record('training_epoch', seconds, X.shape[0])
+
+    def _runtime(self):
+        if self.X is None:
+            self.preprocess_data()
+        ensemble_path = os.path.join(self.work_dir, 'ensemble.npz')
+        if not os.path.exists(ensemble_path):
+            write_random_ensemble(ensemble_path, self.X.shape[1])
+        return EnsembleRuntime.load(ensemble_path)
+
+    def inference_batch(self):
+        runtime = self._runtime()
+        seconds, _ = timed(lambda: runtime.predict(self.X), self.repeat)
+        self.record('inference_batch', seconds, self.X.shape[0])
+
+    def inference_single(self):
+        runtime = self._runtime()
+        seconds, _ = timed(lambda: [runtime.predict(self.X[i:i + 1]) for i in range(self.X.shape[0])], self.repeat)
+        self.record('inference_single', seconds, self.X.shape[0])
+
+    def app_routes(self, requests=200):
+        try:
+            from fastapi.testclient import TestClient
+        except ImportError as e:
+            raise Skipped(f"FastAPI's TestClient is not available: {e}")
+
+        runtime = self._runtime()
+        app_dir = os.path.join(self.work_dir, 'app')
+        os.makedirs(os.path.join(app_dir, 'templates', 'logos'), exist_ok=True)
+        with open(os.path.join(app_dir, 'templates', 'index.html'), 'w') as f:
+            f.write('<html></html>')
+        shutil.copyfile(os.path.join(self.work_dir, 'ensemble.npz'), os.path.join(app_dir, 'ensemble.npz'))
+        np.savez_compressed(os.path.join(app_dir, 'features.npz'), game_ids=np.array(self.game_ids), X=self.X)
+
+        predicted_scores, win_probability = runtime.predict(self.X)
+        predictions = {}
+        for game, scores, probability in zip(self.games, predicted_scores, win_probability):
+            predictions.setdefault(str(game['Week']), []).append({
+                'GameID': game['GameID'], 'PredictedHomeScore': float(scores[0]),
+                'PredictedAwayScore': float(scores[1]), 'HomeWinProbability': float(probability)})
+        with open(os.path.join(app_dir, 'predictions.json'), 'w') as f:
+            json.dump(predictions, f)
+        week = next(iter(predictions))
+
+        previous_dir = os.getcwd()
+        os.chdir(app_dir)
+        try:
+            app_module = load_module('benchmark_app', os.path.join(FRONTEND_DIR, 'app.py'))
+            with TestClient(app_module.app) as client:
+                etag = client.get(f'/predictions/{week}').headers['etag']
+
+                def run_requests():
+                    for i in range(requests):
+                        client.get(f'/predictions/{week}', headers={'Accept-Encoding': 'gzip'})
+                        client.get(f'/predictions/{week}', headers={'If-None-Match': etag})
+                        client.get(f'/predict/{self.game_ids[i % len(self.game_ids)]}')
+
+                seconds, _ = timed(run_requests, self.repeat)
+        finally:
+            os.chdir(previous_dir)
+        self.record('app_routes', seconds, requests * 3)
+
+
+STAGES = ['stat_retrieval_cold', 'stat_retrieval_warm', 'preprocess_data', 'training_epoch',
+          'inference_batch', 'inference_single', 'app_routes']
+
+
+def compare(results, baseline, threshold):
+    """Stages that are more than ``threshold`` slower than the baseline, as (stage, ratio) pairs."""
+    regressions = []
+    for stage, result in results.items():
+        reference = baseline.get('stages', {}).get(stage, {})
+        if 'seconds' not in result or 'seconds' not in reference:
+            continue
+        ratio = result['seconds'] / reference['seconds']
+        if ratio > 1 + threshold:
+            regressions.append((stage, ratio))
+    return regressions
+
+
+def print_results(results, baseline):
+    for stage, result in results.items():
+        if 'skipped' in result:
+            print(f"{stage:22s} skipped ({result['skipped']})")
+            continue
+        line = f"{stage:22s} {result['seconds']:9.4f} s  {result['per_item_ms']:9.3f} ms/item"
+        reference = baseline.get('stages', {}).get(stage, {})
+        if 'seconds' in reference:
+            line += f"  {result['seconds'] / reference['seconds']:6.2f}x baseline"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every pipeline stage against a stored baseline.')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES, help='Stages to run')
+    parser.add_argument('--games', type=int, default=100, help='Number of fixture games')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per stage; the fastest is kept')
+    parser.add_argument('--query-latency', type=float, default=0.0,
+                        help='Seconds the stat stand-in adds to every query')
+    parser.add_argument('--output', default=RESULTS_PATH, help='Where to write the results')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown, e.g. 0.25 for 25%%')
+    parser.add_argument('--update-baseline', action='store_true', help='Save these results as the new baseline')
+    parser.add_argument('--feature-mask', default=None, help='Feature mask from feature_selection.py to apply')
+    args = parser.parse_args()
+
+    layout = load_selected_layout(args.feature_mask) if args.feature_mask else LAYOUT
+    work_dir = tempfile.mkdtemp(prefix='benchmarks-')
+    try:
+        benchmark = Benchmark(work_dir, args.games, args.repeat, args.query_latency, layout)
+        try:
+            stages = benchmark.run(args.stages)
+        finally:
+            if benchmark.roster.stat_worker_pool is not None:
+                benchmark.roster.stat_worker_pool.close()
+            with contextlib.redirect_stdout(io.StringIO()):
+                benchmark.roster.close_stat_cache()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {
+        'stages': stages,
+        'config': {'games': args.games, 'repeat': args.repeat, 'query_latency': args.query_latency,
+                   'features': layout.n_features},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpus': os.cpu_count()},
+        'recorded_at': int(time.time()),
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(stages, baseline)
+
+    if args.update_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if not baseline:
+        print(f"No baseline at {args.baseline}; record one with --update-baseline")
+    elif baseline.get('config') != results['config']:
+        print("Warning: the baseline was recorded with different settings")
+    regressions = compare(stages, baseline, args.threshold)
+    for stage, ratio in regressions:
+        print(f"REGRESSION: {stage} is {ratio:.2f}x its baseline (allowed {1 + args.threshold:.2f}x)")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Deterministic fixtures for db_standin.js, the offline stand-in for the stat database.
+
+db_standin.js runs the real player-stat-functions.js worker (``node db_standin.js --worker``
+speaks the protocol in stat_worker.py) with tedious and databaseConnection.js replaced by an
+in-memory database that answers each query in retrieve-statistics.js from these fixtures. The
+JavaScript lookups and aggregation, getGameStats included, are therefore benchmarked as they run
+against Azure; only the SQL itself is not.
+
+The fixture file is chosen with the STAT_STANDIN_FIXTURES environment variable and written by
+build_fixtures(); STAT_STANDIN_LATENCY adds a simulated round trip to every query.
+"""
+import json
+import os
+import random
+
+
+AWAY_PERIODS = ['season', 'last3Games', 'last3GamesAway', 'lastSeason', 'seasonAway']
+HOME_PERIODS = ['season', 'last3Games', 'last3GamesHome', 'lastSeason', 'seasonHome']
+ROSTER_SIZE = 29  # getTeamRoster returns the TOP 29 players, enough to fill every position group
+
+TEAM_STAT_RANGES = {
+    'WinPercentage': (0, 1), 'AveragePointsPerGame': (10, 50), 'AveragePointsAllowedPerGame': (10, 50),
+    'AverageYardsPerGame': (250, 550), 'AverageTurnoversPerGame': (0, 3), 'AveragePenaltiesPerGame': (3, 10),
+    'ThirdDownEfficiency': (0.2, 0.6), 'RedZoneEfficiency': (0.5, 1), 'AverageSacksPerGame': (0, 4),
+    'AverageInterceptionsPerGame': (0, 2), 'AverageForcedFumblesPerGame': (0, 2), 'YardsPerPlay': (4, 8),
+    'OpponentYardsPerGame': (250, 550), 'OpponentYardsPerPlay': (4, 8), 'FCSFBSRatio': (0, 1),
+}
+
+PLAYER_STAT_RANGES = {
+    'PassingYardsPerGame': (0, 350), 'PassingTouchdownsPerGame': (0, 3), 'PassingAttemptsPerGame': (0, 40),
+    'PassingCompletionsPerGame': (0, 25), 'PassingInterceptionsPerGame': (0, 2), 'RushingYardsPerGame': (0, 120),
+    'RushingYardsPerCarry': (0, 7), 'RushingTouchdownsPerGame': (0, 1.5), 'ReceivingYardsPerGame': (0, 110),
+    'ReceptionsPerGame': (0, 8), 'ReceivingTouchdownsPerGame': (0, 1), 'TacklesPerGame': (0, 9),
+    'SacksPerGame': (0, 1), 'InterceptionsPerGame': (0, 0.5), 'ForcedFumblesPerGame': (0, 0.3),
+    'PassesDefendedPerGame': (0, 1.5), 'FumblesPerGame': (0, 1),
+}
+
+
+def fixture_key(*parts):
+    # Must match key() in db_standin.js
+    return '|'.join(str(part) for part in parts)
+
+
+def build_fixtures(path, n_games=100, n_teams=40, seasons=(2022, 2023), seed=0):
+    """Write the stand-in database for ``n_games`` games to ``path`` and return their schedule entries."""
+    rng = random.Random(seed)
+    teams = [f'team-{i:03d}' for i in range(n_teams)]
+    fixtures = {'schedule': [], 'team_stats': {}, 'rosters': {}, 'player_stats': {}}
+    schedule = []
+    for i in range(n_games):
+        home, away = rng.sample(teams, 2)
+        season, week = rng.choice(seasons), rng.randint(1, 15)
+        game = {'GameID': f'game-{i:05d}', 'Season': season, 'Week': week, 'HomeTeamID': home,
+                'AwayTeamID': away, 'HomePoints': rng.randint(0, 60), 'AwayPoints': rng.randint(0, 60),
+                'HomeAPVotes': rng.choice([0, rng.randint(1, 1500)]),
+                'AwayAPVotes': rng.choice([0, rng.randint(1, 1500)]), 'HomeFCSVotes': 0, 'AwayFCSVotes': 0}
+        schedule.append(game)
+        fixtures['schedule'].append({field: game[field] for field in
+                                     ('GameID', 'Season', 'Week', 'HomeTeamID', 'AwayTeamID', 'HomePoints',
+                                      'AwayPoints')})
+        for team, periods in ((home, HOME_PERIODS), (away, AWAY_PERIODS)):
+            for period in periods:
+                _add_team_period(fixtures, rng, team, season, week, period)
+
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(fixtures, f, separators=(',', ':'))
+    os.replace(temp_path, path)
+    return schedule
+
+
+def _add_team_period(fixtures, rng, team, season, week, period):
+    key = fixture_key(team, season, week, period)
+    if key not in fixtures['team_stats']:
+        # Columns in the order getTeamStats selects them
+        stats = {'GamesPlayed': rng.randint(1, 12), 'Division': rng.choice(['FBS', 'FBS', 'FBS', 'FCS'])}
+        stats.update((name, round(rng.uniform(low, high), 3)) for name, (low, high) in TEAM_STAT_RANGES.items())
+        fixtures['team_stats'][key] = stats
+
+    roster = [f'{team}-{season}-{slot:02d}' for slot in range(ROSTER_SIZE)]
+    fixtures['rosters'].setdefault(fixture_key(team, season, period), roster)
+    for player_id in roster:
+        player_key = fixture_key(player_id, season, week, period)
+        if player_key in fixtures['player_stats']:
+            continue
+        # Columns in the order getPlayerStats selects them
+        stats = {'PlayerID': player_id, 'PlayerName': f'Player {player_id}'}
+        stats.update((name, round(rng.uniform(low, high), 3)) for name, (low, high) in PLAYER_STAT_RANGES.items())
+        stats.update(RecruitingScore=round(rng.random(), 4), PeriodCompleted=rng.choice(['True', 'False']))
+        fixtures['player_stats'][player_key] = stats
@@ -1,19 +1,44 @@
-import json
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 
-app = FastAPI()
+from predictions_reloader import PredictionServiceReloader, PredictionsReloader
+
+# Predictions and their precompressed week responses, swapped in whenever predictions.json changes
+predictions = PredictionsReloader('predictions.json')
+
+# Ensemble and features for live predictions, swapped in whenever ensemble.npz or features.npz changes;
+# the service is None until export_ensemble.py and generate_predictions.py have run
+live_predictions = PredictionServiceReloader()
+
 
-# Load the predictions data
-with open('predictions.json') as file:
-    predictions_data = json.load(file)
+@asynccontextmanager
+async def lifespan(app):
+    predictions.start()
+    live_predictions.start()
+    yield
+    await predictions.stop()
+    await live_predictions.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.mount("/logos", StaticFiles(directory="templates/logos"), name="logos")
 
 @app.get('/predictions/{week}')
-async def get_predictions_route(week: str):
-    return predictions_data.get(week, [])
+async def get_predictions_route(week: str, request: Request):
+    return predictions.state.week_responses.response(week, request.headers)
+
+@app.get('/predict/{game_id}')
+async def predict_route(game_id: str):
+    prediction_service = live_predictions.service
+    if prediction_service is None:
+        raise HTTPException(status_code=503, detail='Live predictions are not available')
+    if game_id not in prediction_service:
+        raise HTTPException(status_code=404, detail=f'No features for game {game_id}')
+    return await prediction_service.predict(game_id)
 
 @app.get('/')
 async def index():
@@ -21,4 +46,4 @@ async def index():
 
 if __name__ == '__main__':
     import uvicorn
-    uvicorn.run(app, host='0.0.0.0', port=8000)
\ No newline at end of file
+    uvicorn.run(app, host='0.0.0.0', port=8000)
@@ -0,0 +1,119 @@
+"""NumPy forward pass for the combined model ensemble, so serving predictions does not need Keras.
+
+export_ensemble.py turns the trained ``best_model_*.h5`` files and ``scaler.save`` into a single
+``ensemble.npz``. By then the StandardScaler has been folded into the first Dense layer and every
+BatchNormalization into the Dense layer that follows it, so each layer is just ``act(h @ W + b)``.
+The weights of all ensemble members are stacked, so a layer is one batched matmul for all of them:
+
+    runtime = EnsembleRuntime.load('ensemble.npz')
+    predicted_scores, win_probability = runtime.predict(features.X[rows])  # unscaled features
+
+Weights are stored as float32 but evaluated in float64 by default: with the scaler folded in, the
+first layer subtracts large raw feature values and float32 would lose about a digit there.
+
+Layout of ensemble.npz:
+
+    meta                          JSON: member model files and hashes, scaler hash, feature count,
+                                  activations per layer
+    trunk_<i>_kernel / _bias      shared layers, kernels shaped (members, inputs, units)
+    <head>_<i>_kernel / _bias     layers of each output head (scores_output, win_chance_output)
+"""
+import hashlib
+import json
+
+import numpy as np
+
+
+ENSEMBLE_PATH = 'ensemble.npz'
+
+
+def relu(x):
+    return np.maximum(x, 0, out=x)
+
+
+def sigmoid(x):
+    # tanh form does not overflow for large negative inputs
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+def linear(x):
+    return x
+
+
+ACTIVATIONS = {'relu': relu, 'sigmoid': sigmoid, 'linear': linear}
+
+
+class StackedDense:
+    """One Dense layer for every ensemble member: kernel (members, inputs, units), bias (members, units)."""
+
+    def __init__(self, kernel, bias, activation):
+        if activation not in ACTIVATIONS:
+            raise ValueError(f"Unsupported activation {activation!r}")
+        self.kernel = kernel
+        self.bias = bias[:, np.newaxis, :]
+        self.activation = activation
+        self.apply_activation = ACTIVATIONS[activation]
+
+    def __call__(self, h):
+        # h is (rows, inputs) for the first layer and (members, rows, inputs) afterwards
+        return self.apply_activation(np.matmul(h, self.kernel) + self.bias)
+
+
+class EnsembleRuntime:
+    def __init__(self, trunk, heads, n_features, model_files=(), model_ids=(), scaler_id='', feature_schema=None):
+        self.trunk = trunk
+        self.heads = heads
+        self.n_features = n_features
+        # Schema hash of the feature layout (and column mask) the models were trained on, if recorded
+        self.feature_schema = feature_schema
+        self.model_files = list(model_files)
+        self.model_ids = list(model_ids)
+        self.scaler_id = scaler_id
+
+    @property
+    def ensemble_id(self):
+        """Hash of the member models and scaler; changes whenever a different ensemble is exported."""
+        payload = json.dumps([self.model_ids or self.model_files, self.scaler_id])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def load(cls, path=ENSEMBLE_PATH, dtype=np.float64):
+        with np.load(path) as arrays:
+            meta = json.loads(str(arrays['meta']))
+
+            def layers(prefix, activations):
+                return [StackedDense(arrays[f'{prefix}_{i}_kernel'].astype(dtype),
+                                     arrays[f'{prefix}_{i}_bias'].astype(dtype), activation)
+                        for i, activation in enumerate(activations)]
+
+            trunk = layers('trunk', meta['trunk'])
+            heads = {name: layers(name, activations) for name, activations in meta['heads'].items()}
+        return cls(trunk, heads, meta['n_features'], meta['models'],
+                   meta.get('model_ids', ()), meta.get('scaler_id', ''), meta.get('feature_schema'))
+
+    @property
+    def n_members(self):
+        return len(self.model_files)
+
+    def predict_members(self, X):
+        """Outputs of every member before averaging: {head: (members, rows, units)}."""
+        h = np.asarray(X, dtype=self.trunk[0].kernel.dtype)
+        if h.ndim != 2 or h.shape[1] != self.n_features:
+            raise ValueError(f"Expected features of shape (rows, {self.n_features}), got {h.shape}")
+        for layer in self.trunk:
+            h = layer(h)
+
+        outputs = {}
+        for name, layers in self.heads.items():
+            head = h
+            for layer in layers:
+                head = layer(head)
+            outputs[name] = head
+        return outputs
+
+    def predict(self, X):
+        """Ensemble-averaged (predicted_scores (rows, 2), win_probability (rows,)) for unscaled features."""
+        outputs = self.predict_members(X)
+        predicted_scores = outputs['scores_output'].mean(axis=0)
+        win_probability = outputs['win_chance_output'].mean(axis=0)[:, 0]
+        return predicted_scores, win_probability
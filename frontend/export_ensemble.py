@@ -0,0 +1,230 @@
+"""Export the trained ensemble for ensemble_runtime.py.
+
+Reads the 5 best models ranked in ``best_models/registry.json`` (promoted by create_model.py as
+``best_model_<rank>.h5``) and ``scaler.save`` from stat-retrieval-functions, folds the scaler and
+every BatchNormalization layer into the Dense weights, and writes them to ``ensemble.npz``. Before
+writing, the NumPy forward pass is checked against Keras.
+
+    python export_ensemble.py
+
+Folding, for a layer computing ``h @ W + b``:
+
+* scaler: the input is ``(x - mean) / scale``, so ``W' = W / scale[:, None]`` and ``b' = b - (mean / scale) @ W``
+* BatchNormalization comes after the Dense+ReLU it normalizes and is the affine map ``h * a + c`` with
+  ``a = gamma / sqrt(variance + epsilon)`` and ``c = beta - moving_mean * a``, so it folds forward into the
+  next Dense: ``W' = a[:, None] * W`` and ``b' = c @ W + b``
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+
+import joblib
+import numpy as np
+
+from ensemble_runtime import ENSEMBLE_PATH, EnsembleRuntime
+
+sys.path.append('../stat-retrieval-functions')
+from feature_selection import load_selected_layout
+
+
+MODELS_ROOT = '../stat-retrieval-functions'
+REGISTRY_PATH = '../stat-retrieval-functions/best_models/registry.json'
+SCALER_PATH = '../stat-retrieval-functions/scaler.save'
+FEATURE_MASK_PATH = '../stat-retrieval-functions/feature_mask.json'
+OUTPUT_NAMES = ['scores_output', 'win_chance_output']
+ENSEMBLE_SIZE = 5
+
+
+def layer_chain(model, output_name):
+    """Layers from the input to ``output_name``, in order, following each layer's single input."""
+    chain = []
+    layer = model.get_layer(output_name)
+    while layer.__class__.__name__ != 'InputLayer':
+        chain.append(layer)
+        layer = layer.input._keras_history[0]
+    return chain[::-1]
+
+
+def batch_norm_affine(layer):
+    config = layer.get_config()
+    weights = list(layer.get_weights())
+    gamma = weights.pop(0) if config.get('scale', True) else None
+    beta = weights.pop(0) if config.get('center', True) else None
+    moving_mean, moving_variance = weights
+    a = 1.0 / np.sqrt(moving_variance + config['epsilon'])
+    if gamma is not None:
+        a = a * gamma
+    c = -moving_mean * a
+    if beta is not None:
+        c = c + beta
+    return a, c
+
+
+def fold_chain(chain, scaler):
+    """Fold the scaler and BatchNormalization layers into the Dense layers of one input-to-output chain.
+
+    Returns a list of (kernel, bias, activation) for the Dense layers in order.
+    """
+    folded = []
+    # Affine map applied to the input of the next Dense layer: h * a + c
+    a = 1.0 / scaler.scale_
+    c = -scaler.mean_ / scaler.scale_
+    for layer in chain:
+        kind = layer.__class__.__name__
+        if kind == 'Dropout':
+            continue
+        if kind == 'Dense':
+            kernel, bias = (list(layer.get_weights()) + [None])[:2]
+            kernel = kernel.astype(np.float64)
+            bias = np.zeros(kernel.shape[1]) if bias is None else bias.astype(np.float64)
+            if a is not None:
+                bias = c @ kernel + bias
+                kernel = a[:, np.newaxis] * kernel
+                a = c = None
+            folded.append((kernel, bias, layer.get_config()['activation']))
+        elif kind == 'BatchNormalization':
+            if a is not None:
+                raise ValueError(f"{layer.name} does not follow a Dense layer")
+            a, c = batch_norm_affine(layer)
+        else:
+            raise ValueError(f"Cannot export layer {layer.name} of type {kind}")
+    if a is not None:
+        raise ValueError("The model ends with a BatchNormalization layer, which has no Dense layer to fold into")
+    return folded
+
+
+def fold_model(model, scaler):
+    """Folded trunk layers shared by both heads, and the folded layers of each head."""
+    chains = {name: layer_chain(model, name) for name in OUTPUT_NAMES}
+    first, second = chains.values()
+    shared = 0
+    while shared < min(len(first), len(second)) and first[shared] is second[shared]:
+        shared += 1
+    trunk_dense = sum(layer.__class__.__name__ == 'Dense' for layer in first[:shared])
+
+    heads = {name: fold_chain(chain, scaler) for name, chain in chains.items()}
+    # BatchNormalization only folds forward, so the trunk's Dense layers come out the same in every chain
+    trunk = heads[OUTPUT_NAMES[0]][:trunk_dense]
+    heads = {name: layers[trunk_dense:] for name, layers in heads.items()}
+    return trunk, heads
+
+
+def stack_members(members):
+    """Turn per-model [(kernel, bias, activation)] lists into per-layer stacked arrays."""
+    layers = []
+    for position, member_layers in enumerate(zip(*members)):
+        kernels, biases, activations = zip(*member_layers)
+        if len({kernel.shape for kernel in kernels}) != 1 or len(set(activations)) != 1:
+            raise ValueError(f"Ensemble members differ at layer {position}")
+        layers.append((np.stack(kernels), np.stack(biases), activations[0]))
+    return layers
+
+
+def file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def scaler_sha256(scaler):
+    sha256 = hashlib.sha256()
+    sha256.update(np.asarray(scaler.mean_, dtype=np.float64).tobytes())
+    sha256.update(np.asarray(scaler.scale_, dtype=np.float64).tobytes())
+    return sha256.hexdigest()
+
+
+def export_ensemble(model_files, scaler, output_path=ENSEMBLE_PATH, dtype=np.float32, feature_schema=None):
+    from keras.models import load_model
+
+    folded = [fold_model(load_model(file), scaler) for file in model_files]
+    trunk = stack_members([trunk for trunk, _ in folded])
+    heads = {name: stack_members([heads[name] for _, heads in folded]) for name in OUTPUT_NAMES}
+
+    arrays = {}
+    for prefix, layers in [('trunk', trunk)] + list(heads.items()):
+        for i, (kernel, bias, _) in enumerate(layers):
+            arrays[f'{prefix}_{i}_kernel'] = kernel.astype(dtype)
+            arrays[f'{prefix}_{i}_bias'] = bias.astype(dtype)
+    meta = {
+        'models': list(model_files),
+        # Content hashes identify the ensemble in prediction fingerprints (see generate_predictions.py)
+        'model_ids': [file_sha256(file) for file in model_files],
+        'scaler_id': scaler_sha256(scaler),
+        'n_features': int(trunk[0][0].shape[1]),
+        # generate_predictions.py refuses features extracted with a different column mask
+        'feature_schema': feature_schema,
+        'trunk': [activation for _, _, activation in trunk],
+        'heads': {name: [activation for _, _, activation in layers] for name, layers in heads.items()},
+    }
+    # Written to a temporary file and renamed, so a running app.py never reloads a half-written file
+    np.savez(output_path + '.tmp.npz', meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(output_path + '.tmp.npz', output_path)
+
+
+def check_against_keras(model_files, scaler, path=ENSEMBLE_PATH, rows=256, tolerance=1e-3, seed=0):
+    """Compare the exported runtime with Keras on inputs drawn around the scaler's mean."""
+    from keras.models import load_model
+
+    rng = np.random.default_rng(seed)
+    X = scaler.mean_ + scaler.scale_ * rng.standard_normal((rows, scaler.mean_.shape[0]))
+    outputs = EnsembleRuntime.load(path).predict_members(X)
+
+    worst = 0.0
+    for member, file in enumerate(model_files):
+        scores, win_chance = load_model(file).predict(scaler.transform(X), verbose=0)
+        for name, expected in (('scores_output', scores), ('win_chance_output', win_chance)):
+            difference = np.abs(outputs[name][member] - expected)
+            # Scores are in points, so compare them relative to their size
+            worst = max(worst, float(np.max(difference / np.maximum(1.0, np.abs(expected)))))
+    if worst > tolerance:
+        raise ValueError(f"NumPy runtime differs from Keras by up to {worst:.2e} (tolerance {tolerance:.0e})")
+    return worst
+
+
+def registry_models(registry_path=REGISTRY_PATH, ensemble_size=ENSEMBLE_SIZE):
+    """Promoted model files ranked 1 to ensemble_size in create_model.py's registry, best first."""
+    with open(registry_path, 'r') as f:
+        run = json.load(f)
+    members = sorted((member for member in run['members'] if 'promoted' in member and member['rank'] <= ensemble_size),
+                     key=lambda member: member['rank'])
+    # Paths in the registry are relative to stat-retrieval-functions, where create_model.py runs
+    return [os.path.join(MODELS_ROOT, member['promoted']) for member in members]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the model ensemble for the NumPy runtime.')
+    parser.add_argument('--registry', default=REGISTRY_PATH, help='Model registry written by create_model.py')
+    parser.add_argument('--models', default=None,
+                        help=f'Glob of the models to export instead of the registry\'s top {ENSEMBLE_SIZE}')
+    parser.add_argument('--scaler', default=SCALER_PATH, help='Path of the fitted StandardScaler')
+    parser.add_argument('--output', default=ENSEMBLE_PATH, help='Output weights file')
+    parser.add_argument('--feature-mask', default=FEATURE_MASK_PATH,
+                        help='Feature mask the models were trained with (see feature_selection.py)')
+    args = parser.parse_args()
+
+    if args.models:
+        model_files = sorted(glob.glob(args.models))
+        if len(model_files) > ENSEMBLE_SIZE:
+            raise SystemExit(f"{args.models} matches {len(model_files)} models; the ensemble has {ENSEMBLE_SIZE}")
+    else:
+        model_files = registry_models(args.registry)
+    if not model_files:
+        raise SystemExit(f"No models to export (registry {args.registry}, pattern {args.models})")
+    scaler = joblib.load(args.scaler)
+    layout = load_selected_layout(args.feature_mask)
+    if layout.n_features != scaler.mean_.shape[0]:
+        raise SystemExit(f"The scaler has {scaler.mean_.shape[0]} features but {args.feature_mask} keeps "
+                         f"{layout.n_features}; retrain after changing the feature mask")
+
+    export_ensemble(model_files, scaler, args.output, feature_schema=layout.schema_hash())
+    worst = check_against_keras(model_files, scaler, args.output)
+    print(f"Exported {len(model_files)} models to {args.output} (max difference from Keras {worst:.2e})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""On-demand predictions for single games, batched across concurrent requests.
+
+Requests go onto an asyncio queue. A single worker takes the first waiting request, keeps
+collecting until it has ``max_batch_size`` games or ``max_wait`` seconds have passed, and runs one
+forward pass of the ensemble for the whole batch. Requests for a game that is already queued
+share its result, and finished results are kept in a bounded LRU, so load grows with the number of
+batches rather than the number of requests.
+
+Features come from ``features.npz`` (GameIDs and unscaled feature rows), which
+generate_predictions.py writes next to predictions.json. predictions_reloader.py swaps in a new
+service when either file changes; the old one finishes its queued requests and then stops.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from ensemble_runtime import ENSEMBLE_PATH, EnsembleRuntime
+
+
+FEATURES_PATH = 'features.npz'
+
+
+class LRUCache:
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class PredictionService:
+    def __init__(self, runtime, game_ids, X, max_batch_size=64, max_wait=0.005, cache_size=4096):
+        if X.shape[0] != len(game_ids):
+            raise ValueError(f"{len(game_ids)} GameIDs for {X.shape[0]} feature rows")
+        if X.shape[1] != runtime.n_features:
+            raise ValueError(f"The ensemble takes {runtime.n_features} features but the rows have {X.shape[1]}")
+        self.runtime = runtime
+        self.X = X
+        self.row_by_game = {str(game_id): row for row, game_id in enumerate(game_ids)}
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.cache = LRUCache(cache_size)
+        self.batches = 0
+        self._queue = None
+        self._pending = {}
+        self._worker = None
+
+    @classmethod
+    def load(cls, ensemble_path=ENSEMBLE_PATH, features_path=FEATURES_PATH, **kwargs):
+        """Load the exported ensemble and features, or return None if either has not been generated."""
+        if not os.path.exists(ensemble_path) or not os.path.exists(features_path):
+            return None
+        runtime = EnsembleRuntime.load(ensemble_path)
+        with np.load(features_path) as arrays:
+            game_ids = arrays['game_ids']
+            X = arrays['X']
+        return cls(runtime, game_ids, X, **kwargs)
+
+    def __contains__(self, game_id):
+        return game_id in self.row_by_game
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def close(self):
+        """Stop once every request already waiting on this service has its result."""
+        while self._pending:
+            await asyncio.sleep(self.max_wait)
+        await self.stop()
+
+    async def predict(self, game_id):
+        """Prediction for one game; raises KeyError for games without features."""
+        if game_id not in self.row_by_game:
+            raise KeyError(game_id)
+        cached = self.cache.get(game_id)
+        if cached is not None:
+            return cached
+
+        future = self._pending.get(game_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[game_id] = future
+            await self._queue.put(game_id)
+        # shield() so one client disconnecting does not cancel the result for everyone else waiting on it
+        return await asyncio.shield(future)
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                # The forward pass releases the GIL in the matmuls, so run it off the event loop
+                results = await asyncio.to_thread(self._predict_batch, batch)
+            except Exception as error:
+                for game_id in batch:
+                    future = self._pending.pop(game_id)
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+
+            self.batches += 1
+            for game_id, result in zip(batch, results):
+                self.cache.put(game_id, result)
+                future = self._pending.pop(game_id)
+                if not future.done():
+                    future.set_result(result)
+
+    def _predict_batch(self, batch):
+        rows = [self.row_by_game[game_id] for game_id in batch]
+        predicted_scores, win_probability = self.runtime.predict(self.X[rows])
+        return [{
+            'GameID': game_id,
+            'PredictedHomeScore': float(predicted_scores[i, 0]),
+            'PredictedAwayScore': float(predicted_scores[i, 1]),
+            'HomeWinProbability': float(win_probability[i]),
+        } for i, game_id in enumerate(batch)]
@@ -0,0 +1,146 @@
+"""Reload predictions.json and the live prediction service in the running server when they change.
+
+The predictions and their compiled week responses live in one PredictionsState object.
+PredictionsReloader polls the file's mtime and size, parses a changed file in a worker
+thread so the event loop keeps serving, and then replaces ``reloader.state`` in a single
+assignment. A request reads ``reloader.state`` once and so always sees one consistent
+version, and requests in flight finish on the version they started with.
+
+PredictionServiceReloader does the same for ensemble.npz and features.npz: a change to either
+loads a new PredictionService (with an empty result cache) and replaces ``reloader.service``.
+The previous service answers the requests already queued on it and then stops.
+"""
+import asyncio
+import json
+import os
+import zipfile
+
+from prediction_service import ENSEMBLE_PATH, FEATURES_PATH, PredictionService
+from week_responses import WeekResponses
+
+
+class PredictionsState:
+    def __init__(self, predictions_data, stamp=None):
+        self.predictions_data = predictions_data
+        self.week_responses = WeekResponses(predictions_data)
+        self.stamp = stamp
+
+
+def file_stamp(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_predictions(path):
+    stamp = file_stamp(path)
+    with open(path) as file:
+        predictions_data = json.load(file)
+    return PredictionsState(predictions_data, stamp)
+
+
+class PredictionsReloader:
+    def __init__(self, path='predictions.json', interval=5.0):
+        self.path = path
+        self.interval = interval
+        self.state = load_predictions(path)
+        self.reloads = 0
+        self._failed_stamp = None
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.reload_if_changed()
+
+    async def reload_if_changed(self):
+        """Swap in the file's contents if it changed since the last load. Returns True if it did."""
+        stamp = None
+        try:
+            stamp = file_stamp(self.path)
+            if stamp in (self.state.stamp, self._failed_stamp):
+                return False
+            state = await asyncio.to_thread(load_predictions, self.path)
+        except (OSError, ValueError) as error:
+            # Missing or half-written file; keep serving the current predictions until it changes again
+            if stamp is not None:
+                self._failed_stamp = stamp
+                print(f"Could not reload {self.path}: {error}")
+            return False
+        self.state = state
+        self.reloads += 1
+        print(f"Reloaded {self.path}")
+        return True
+
+
+class PredictionServiceReloader:
+    def __init__(self, ensemble_path=ENSEMBLE_PATH, features_path=FEATURES_PATH, interval=5.0):
+        self.ensemble_path = ensemble_path
+        self.features_path = features_path
+        self.interval = interval
+        self.stamp = self._stamp()
+        # None until export_ensemble.py and generate_predictions.py have run
+        self.service = PredictionService.load(ensemble_path, features_path)
+        self.reloads = 0
+        self._failed_stamp = None
+        self._task = None
+
+    def _stamp(self):
+        try:
+            return file_stamp(self.ensemble_path), file_stamp(self.features_path)
+        except OSError:
+            return None
+
+    def start(self):
+        if self.service is not None:
+            self.service.start()
+        self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.service is not None:
+            await self.service.stop()
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.reload_if_changed()
+
+    async def reload_if_changed(self):
+        """Swap in a service built from the current files if either changed. Returns True if it did."""
+        stamp = self._stamp()
+        if stamp is None or stamp in (self.stamp, self._failed_stamp):
+            return False
+        try:
+            service = await asyncio.to_thread(PredictionService.load, self.ensemble_path, self.features_path)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile) as error:
+            # Half-written, or the ensemble and features do not match yet; keep the current service
+            self._failed_stamp = stamp
+            print(f"Could not reload {self.ensemble_path} and {self.features_path}: {error}")
+            return False
+        if service is None:
+            return False
+        service.start()
+        previous, self.service, self.stamp = self.service, service, stamp
+        self.reloads += 1
+        print(f"Reloaded {self.ensemble_path} and {self.features_path}")
+        if previous is not None:
+            await previous.close()
+        return True
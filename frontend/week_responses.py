@@ -0,0 +1,101 @@
+"""Per-week prediction responses, encoded and compressed once when predictions are loaded.
+
+Each week's list of predictions is serialized to JSON bytes a single time, with gzip and (if the
+``brotli`` package is installed) brotli variants alongside. Every variant carries a strong ETag, so
+a request is answered with stored bytes, or with 304 Not Modified when the client already has them.
+"""
+import gzip
+import hashlib
+import json
+
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+CACHE_CONTROL = 'public, max-age=300'
+
+# Preferred first when the client accepts several with the same quality
+ENCODINGS = ['br', 'gzip', 'identity']
+
+
+def encode_json(value):
+    # Same bytes as FastAPI's JSONResponse
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, indent=None, separators=(',', ':')).encode('utf-8')
+
+
+def accepted_encodings(accept_encoding):
+    """Map of content coding to quality from an Accept-Encoding header."""
+    qualities = {}
+    for part in accept_encoding.split(','):
+        coding, _, parameters = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        parameter = parameters.strip()
+        if parameter.startswith('q='):
+            try:
+                quality = float(parameter[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+class CompiledResponse:
+    def __init__(self, value):
+        body = encode_json(value)
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        # A strong ETag identifies exact bytes, so each content coding gets its own
+        self.variants = {'identity': (body, f'"{digest}"')}
+        self.variants['gzip'] = (gzip.compress(body, compresslevel=9, mtime=0), f'"{digest}-gzip"')
+        if brotli is not None:
+            self.variants['br'] = (brotli.compress(body), f'"{digest}-br"')
+        self.etags = {etag for _, etag in self.variants.values()}
+
+    def choose_encoding(self, accept_encoding):
+        qualities = accepted_encodings(accept_encoding or '')
+        best, best_quality = 'identity', 0.0
+        for encoding in ENCODINGS:
+            if encoding not in self.variants:
+                continue
+            # Without an explicit entry, identity is acceptable and other codings are not
+            default = qualities.get('*', 1.0 if encoding == 'identity' else 0.0)
+            quality = qualities.get(encoding, default)
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def not_modified(self, if_none_match):
+        if not if_none_match:
+            return False
+        tags = {tag.strip() for tag in if_none_match.split(',')}
+        if '*' in tags:
+            return True
+        # If-None-Match uses weak comparison, so W/"x" matches "x"
+        return any((tag[2:] if tag.startswith('W/') else tag) in self.etags for tag in tags)
+
+    def response(self, headers):
+        encoding = self.choose_encoding(headers.get('accept-encoding'))
+        body, etag = self.variants[encoding]
+        response_headers = {'ETag': etag, 'Cache-Control': CACHE_CONTROL, 'Vary': 'Accept-Encoding'}
+        if self.not_modified(headers.get('if-none-match')):
+            return Response(status_code=304, headers=response_headers)
+        if encoding != 'identity':
+            response_headers['Content-Encoding'] = encoding
+        return Response(content=body, media_type='application/json', headers=response_headers)
+
+
+class WeekResponses:
+    """Compiled responses for every week in predictions.json; unknown weeks get an empty list."""
+
+    def __init__(self, predictions_data):
+        self.weeks = {week: CompiledResponse(predictions) for week, predictions in predictions_data.items()}
+        self.empty = CompiledResponse([])
+
+    def response(self, week, headers):
+        return self.weeks.get(week, self.empty).response(headers)
@@ -1,29 +1,151 @@
 import subprocess
-import json, os, time
+import json, os, time, atexit, argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from stat_worker import (StatWorkerPool, StatWorkerError, StatWorkerTimeout, StatWorkerCrash, StatBackendError,
+                         call_with_retries)
+from game_store import GameStore, load_game_ids
+from ingest_queue import IngestQueue
+from stat_cache import StatCache, is_cacheable, should_cache
+from tracing import tracer
+
+# Keep long-lived Node workers instead of spawning a process per call
+USE_STAT_WORKERS = True
+STAT_WORKER_COUNT = 1
+
+# Seconds a backend call may take before its worker is killed and the call retried
+STAT_CALL_TIMEOUT = 30
+STAT_CALL_TIMEOUT_MULTIPLES = {'getGameStats': 6}  # Runs every query of a game
+STAT_CALL_RETRIES = 2
+
+# Duplicate idempotent reads still running after the p95 of their recent latencies to a spare worker.
+# Games are then fetched one query per call instead of through getGameStats, so every query is hedged.
+USE_HEDGED_REQUESTS = False
+HEDGE_PERCENTILE = 0.95
+HEDGE_SPARE_WORKERS = 1
+HEDGED_FUNCTIONS = {'getMatchupInfo', 'getTeamStatsForPeriod', 'getSORForTeam', 'getTeamRosterForSeason',
+                    'getPlayerStatsForPeriod'}
+
+# Persistent cache of backend results in front of call_js_function
+USE_STAT_CACHE = True
+STAT_CACHE_PATH = 'stat_cache.sqlite'
+
+# Durable per-game work queue; failed games are retried with exponential backoff
+INGEST_QUEUE_PATH = 'ingest_queue.sqlite'
+INGEST_MAX_ATTEMPTS = 5
+INGEST_RETRY_DELAY = 30
+
+# Spans for every game, period and backend call; summarized (and optionally written) at exit
+TRACE_PATH = None
+
+AWAY_PERIODS = ['season', 'last3Games', 'last3GamesAway', 'lastSeason', 'seasonAway']
+HOME_PERIODS = ['season', 'last3Games', 'last3GamesHome', 'lastSeason', 'seasonHome']
+
+stat_worker_pool = None
+stat_cache = None
+
+
+def get_stat_worker_pool(size=None):
+    global stat_worker_pool
+    if stat_worker_pool is None:
+        size = (size or STAT_WORKER_COUNT) + (HEDGE_SPARE_WORKERS if USE_HEDGED_REQUESTS else 0)
+        stat_worker_pool = StatWorkerPool(size=size, hedge_percentile=HEDGE_PERCENTILE)
+        atexit.register(close_stat_worker_pool)
+    return stat_worker_pool
+
+
+def close_stat_worker_pool():
+    global stat_worker_pool
+    if stat_worker_pool is None:
+        return
+    print(f"Stat workers: {stat_worker_pool.stats()}")
+    stat_worker_pool.close()
+    stat_worker_pool = None
+
+
+def get_stat_cache():
+    global stat_cache
+    if stat_cache is None:
+        stat_cache = StatCache(STAT_CACHE_PATH)
+        atexit.register(close_stat_cache)
+    return stat_cache
+
+
+def close_stat_cache():
+    global stat_cache
+    if stat_cache is None:
+        return
+    print(f"Stat cache: {stat_cache.stats()}")
+    stat_cache.close()
+    stat_cache = None
+
+
+# Names of the arguments recorded on backend-call spans (None: not recorded, e.g. whole rosters)
+CALL_SPAN_ARGS = {
+    'getMatchupInfo': ('game_id',),
+    'getGameStats': ('game_id', None),
+    'getTeamStatsForPeriod': ('team', 'season', 'week', 'period'),
+    'getSORForTeam': ('team', 'season', 'week', 'period'),
+    'getTeamRosterForSeason': ('team', 'season', 'period'),
+    'getPlayerStatsForPeriod': (None, 'season', 'week', 'period'),
+}
+
+
+def call_span_attributes(func_name, args):
+    names = CALL_SPAN_ARGS.get(func_name, ())
+    return {name: arg for name, arg in zip(names, args) if name is not None}
 
 
 def call_js_function(func_name, *args):
-    cmd = ['node', 'player-stat-functions.js', func_name] + list(args)
-    try:
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    """Cached backend call. A failed call raises its StatWorkerError, so the game can record why it failed."""
+    with tracer.span(func_name, category='backend', **call_span_attributes(func_name, args)) as span:
+        cache = get_stat_cache() if USE_STAT_CACHE and is_cacheable(func_name) else None
+        if cache is not None:
+            hit, value = cache.get(func_name, args)
+            span.set(cache='hit' if hit else 'miss')
+            if hit:
+                return value
 
-        # Log the full output for debugging
-        # print("STDOUT:", result.stdout)
-        # print("STDERR:", result.stderr)
+        result = call_stat_backend(func_name, *args)
 
-        # Extract the last line of stdout assuming it's JSON
-        json_output = result.stdout.strip().split('\n')[-1]
+        if cache is not None and should_cache(func_name, result):
+            cache.put(func_name, args, result)
+        return result
 
-        # Parse the extracted JSON string
-        return json.loads(json_output)
 
-    except subprocess.CalledProcessError as e:
-        print(f"Error calling JS function: {e.stderr}")
-        print(f"Output before error: {e.output}")
-        return None
+def report_tracing():
+    tracer.report(TRACE_PATH)
 
 
-def create_roster_object(teamID, year, week, period):
+def call_stat_backend(func_name, *args):
+    """The backend's result. Raises a StatWorkerError subclass if the call still fails after its retries."""
+    timeout = STAT_CALL_TIMEOUT * STAT_CALL_TIMEOUT_MULTIPLES.get(func_name, 1)
+    if USE_STAT_WORKERS:
+        return get_stat_worker_pool().call(func_name, *args, timeout=timeout, retries=STAT_CALL_RETRIES,
+                                           hedge=USE_HEDGED_REQUESTS and func_name in HEDGED_FUNCTIONS)
+    return call_with_retries(lambda: run_stat_process(func_name, args, timeout), STAT_CALL_RETRIES)
+
+
+def run_stat_process(func_name, args, timeout):
+    """Run one backend call in a fresh Node process, raising StatWorkerError subclasses like a worker."""
+    cmd = ['node', 'player-stat-functions.js', func_name] + list(args)
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise StatWorkerTimeout(f"{func_name} did not answer within {timeout:g} s")
+    except OSError as e:
+        raise StatWorkerCrash(f"Could not run {func_name}: {e}")
+
+    # Extract the last line of stdout assuming it's JSON
+    json_output = result.stdout.strip().split('\n')[-1]
+    try:
+        return json.loads(json_output)
+    except json.JSONDecodeError:
+        stderr = result.stderr.strip().split('\n')[-1]
+        raise StatBackendError(f"{func_name} exited with {result.returncode} and no JSON result: {stderr}")
+
+
+def build_roster_object(team_stats_for_period, strength_of_record, player_stats):
     # Initialize teamStats with default values to avoid KeyError
     teamStats = {
         'division': '',
@@ -50,14 +172,13 @@ def create_roster_object(teamID, year, week, period):
         'OLs': []
     }
 
-    # Attempt to get team stats for the period
-    team_stats_for_period = call_js_function('getTeamStatsForPeriod', teamID, year, week, period)
     if team_stats_for_period:
         # Update teamStats with actual values if available
         teamStats.update({
             'division': team_stats_for_period.get('Division', ''),
             'win_percentage': team_stats_for_period.get('WinPercentage', 0),
-            'strength_of_record': call_js_function('getSORForTeam', teamID, year, week, period),
+            # A failed SOR lookup comes back as None and counts as 0, as it always has
+            'strength_of_record': strength_of_record if strength_of_record is not None else 0,
             'points_per_game': team_stats_for_period.get('AveragePointsPerGame', 0),
             'points_allowed_per_game': team_stats_for_period.get('AveragePointsAllowedPerGame', 0),
             'total_YPG': team_stats_for_period.get('AverageYardsPerGame', 0),
@@ -74,9 +195,6 @@ def create_roster_object(teamID, year, week, period):
             'FBS_opponent_ratio': team_stats_for_period.get('FCSFBSRatio', 0),
         })
 
-    player_ids = call_js_function('getTeamRosterForSeason', teamID, year, period)
-    # Attempt to get player stats for the period
-    player_stats = call_js_function('getPlayerStatsForPeriod', player_ids, year, week, period)
     if player_stats:
         # Process player stats to determine starters
         qb_stats, rb_stats, wr_stats, def_stats, ol_stats = process_player_stats(player_stats)
@@ -89,6 +207,115 @@ def create_roster_object(teamID, year, week, period):
     return teamStats
 
 
+def create_roster_object(teamID, year, week, period):
+    with tracer.span(period, category='period', team=teamID, season=year, week=week):
+        # Attempt to get team stats for the period
+        team_stats_for_period = call_js_function('getTeamStatsForPeriod', teamID, year, week, period)
+        strength_of_record = None
+        if team_stats_for_period:
+            strength_of_record = call_js_function('getSORForTeam', teamID, year, week, period)
+
+        player_ids = call_js_function('getTeamRosterForSeason', teamID, year, period)
+        # Attempt to get player stats for the period
+        player_stats = call_js_function('getPlayerStatsForPeriod', player_ids, year, week, period)
+
+        return build_roster_object(team_stats_for_period, strength_of_record, player_stats)
+
+
+def create_team_period_objects(teamID, year, week, periods):
+    period_objects = []
+    for period in periods:
+        result = create_roster_object(teamID, year, week, period)
+        result['period'] = period
+        period_objects.append(result)
+    return period_objects
+
+
+def create_team_objects_per_query(gameID):
+    """Both teams' period objects, fetched one backend call per query.
+
+    Each query then has its own deadline and retries and can be hedged, where inside getGameStats
+    a hung query costs the whole game's deadline and a retry repeats every query of the game.
+    """
+    matchup_json = call_js_function('getMatchupInfo', gameID)
+    if not matchup_json:
+        return None
+    matchup_info = json.loads(matchup_json)
+    season = str(matchup_info['Season'])
+    week = str(matchup_info['Week'])
+    away_stats = create_team_period_objects(matchup_info['AwayTeamID'], season, week, AWAY_PERIODS)
+    home_stats = create_team_period_objects(matchup_info['HomeTeamID'], season, week, HOME_PERIODS)
+    return home_stats, away_stats
+
+
+def stat_call_key(func_name, *args):
+    # Must match statCallKey in player-stat-functions.js
+    return '|'.join([func_name] + [str(arg) for arg in args])
+
+
+def cached_period_results(team_id, season, week, periods):
+    """Results of a team's per-period calls that are already cached, keyed the way getGameStats expects."""
+    cache = get_stat_cache()
+    known = {}
+
+    def lookup(func_name, *args):
+        hit, value = cache.get(func_name, args)
+        if hit:
+            known[stat_call_key(func_name, *args)] = value
+        return hit, value
+
+    for period in periods:
+        lookup('getTeamStatsForPeriod', team_id, season, week, period)
+        lookup('getSORForTeam', team_id, season, week, period)
+        roster_hit, roster = lookup('getTeamRosterForSeason', team_id, season, period)
+        if roster_hit:
+            lookup('getPlayerStatsForPeriod', roster, season, week, period)
+    return known
+
+
+def cached_game_results(gameID):
+    """Cached results for a game, matchup included; empty unless its matchup is cached.
+
+    The matchup is not looked up when it is not cached: getGameStats resolves it in the same request.
+    """
+    hit, matchup_json = get_stat_cache().get('getMatchupInfo', (gameID,))
+    if not hit or not matchup_json:
+        return {}
+    matchup_info = json.loads(matchup_json)
+    season = str(matchup_info['Season'])
+    week = str(matchup_info['Week'])
+    known = {stat_call_key('getMatchupInfo', gameID): matchup_json}
+    known.update(cached_period_results(matchup_info['AwayTeamID'], season, week, AWAY_PERIODS))
+    known.update(cached_period_results(matchup_info['HomeTeamID'], season, week, HOME_PERIODS))
+    return known
+
+
+def record_fetched_spans(fetched, call_start):
+    """Trace the database queries getGameStats ran, placed relative to when the call was sent."""
+    for call in fetched:
+        if 'durationMs' in call:
+            tracer.record(call['func'], 'database', call_start + call.get('startMs', 0) / 1e3,
+                          call['durationMs'] / 1e3, **call_span_attributes(call['func'], call['args']))
+
+
+def remember_fetched_results(fetched):
+    """Cache the individual calls getGameStats had to run against the database."""
+    get_stat_cache().put_many([(call['func'], call['args'], call['result']) for call in fetched
+                               if is_cacheable(call['func']) and should_cache(call['func'], call['result'])])
+
+
+def build_period_objects(period_results, team_id=None):
+    """Turn the per-period results of getGameStats into roster objects tagged with their period."""
+    period_objects = []
+    for period_result in period_results:
+        with tracer.span(period_result['period'], category='period', team=team_id):
+            result = build_roster_object(period_result['teamStats'], period_result['strengthOfRecord'],
+                                         period_result['playerStats'])
+        result['period'] = period_result['period']
+        period_objects.append(result)
+    return period_objects
+
+
 def calculate_completion_percentage(passing_completions, passing_attempts):
     if passing_attempts > 0:
         return (passing_completions / passing_attempts)
@@ -246,74 +473,39 @@ def print_stats_for_position(player_stats_list, position_label):
         print()  # Print a newline for better readability between players
 
 
-total_execution_time = 0
-execution_count = 0
-
 def create_full_team_objects(gameID):
-    global total_execution_time, execution_count  # Use the global variables
-
-    start_time = time.time()  # Start timing
-
-    try:
-        json_output_start_time = time.time()
-        json_output = call_js_function('getMatchupInfo', gameID)
-        print(f"Call to getMatchupInfo took {time.time() - json_output_start_time} seconds.")
-
-        if json_output:
-            matchup_info = json.loads(json_output)
-            home_team_ID = matchup_info['HomeTeamID']
-            away_team_ID = matchup_info['AwayTeamID']
-            week = str(matchup_info['Week'])
-            season = str(matchup_info['Season'])
-
-            home_stats = []
-            away_stats = []
-
-            away_periods = ['season', 'last3Games', 'last3GamesAway', 'lastSeason', 'seasonAway']
-
-            for period in away_periods:
-                period_start_time = time.time()
-                result = create_roster_object(away_team_ID, season, week, period)
-                print(f"Processing away period {period} took {time.time() - period_start_time} seconds.")
-
-                if result is not None:
-                    result['period'] = period
-                    away_stats.append(result)
-                else:
-                    print(f"No data for away team in period: {period}")
-
-            home_periods = ['season', 'last3Games', 'last3GamesHome', 'lastSeason', 'seasonHome']
+    with tracer.span('game', category='game', game_id=gameID) as span:
+        try:
+            if USE_HEDGED_REQUESTS:
+                return create_team_objects_per_query(gameID)
+
+            # Hand the backend whatever it would otherwise look up again for this matchup
+            known_results = cached_game_results(gameID) if USE_STAT_CACHE else {}
+            span.set(known_results=len(known_results))
+
+            # Both teams and all ten periods are resolved by a single backend request
+            call_start = time.perf_counter()
+            game_stats = call_js_function('getGameStats', gameID, json.dumps(known_results))
+
+            if game_stats:
+                fetched = game_stats.get('fetched', [])
+                span.set(fetched=len(fetched))
+                record_fetched_spans(fetched, call_start)
+                if USE_STAT_CACHE:
+                    remember_fetched_results(fetched)
+                matchup = game_stats.get('matchup') or {}
+                away_stats = build_period_objects(game_stats['away'], matchup.get('AwayTeamID'))
+                home_stats = build_period_objects(game_stats['home'], matchup.get('HomeTeamID'))
+                return home_stats, away_stats
 
-            for period in home_periods:
-                period_start_time = time.time()
-                result = create_roster_object(home_team_ID, season, week, period)
-                print(f"Processing home period {period} took {time.time() - period_start_time} seconds.")
-
-                if result is not None:
-                    result['period'] = period
-                    home_stats.append(result)
-                else:
-                    print(f"No data for home team in period: {period}")
-
-            # At the end, before returning:
-            execution_time = time.time() - start_time
-            total_execution_time += execution_time  # Accumulate total execution time
-            execution_count += 1  # Increment execution count
-
-            print(f"Total execution time for create_full_team_objects: {execution_time} seconds.")
-
-            return home_stats, away_stats
-
-        else:
-            print("No data returned from getMatchupInfo function.")
-    except json.decoder.JSONDecodeError as e:
-        print(f"Failed to decode JSON from getMatchupInfo function: {e}")
-    except Exception as e:
-        print(f"An error occurred: {e}")
-    finally:
-        if execution_count > 0:
-            average_execution_time = total_execution_time / execution_count
-            print(f"Average execution time after {execution_count} executions: {average_execution_time} seconds.")
+            else:
+                print("No data returned from getGameStats function.")
+        except StatWorkerError:
+            # Timeouts and backend errors are reported with their type by try_ingest_game
+            raise
+        except Exception as e:
+            span.set(error=type(e).__name__)
+            print(f"An error occurred: {e}")
 
 
 def print_full_team_objects(gameID):
@@ -403,60 +595,120 @@ def replace_none_with_negative_one(data):
 
 
 def fetch_team_stats(gameID):
-    home_stats, away_stats = create_full_team_objects(gameID)
+    team_objects = create_full_team_objects(gameID)
+    if team_objects is None:
+        return None, None
+    home_stats, away_stats = team_objects
     # Recursively replace None values with 0
     replace_none_with_negative_one(home_stats)
     replace_none_with_negative_one(away_stats)
     return home_stats, away_stats
 
 
-def load_existing_data(filename):
-    """Load existing data from the JSON file, if it exists."""
-    if os.path.exists(filename):
-        with open(filename, 'r') as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return []  # Return an empty list if the file is empty or corrupted
-    return []
-
-def append_to_json(data, filename='game_stats_for_dnn.json'):
-    """Append data to an existing JSON file, creating a new file if it doesn't exist."""
-    existing_data = load_existing_data(filename)
-    existing_game_ids = {game['GameID'] for game in existing_data}
-
-    # Check if the game is already in the existing data
-    if data['GameID'] not in existing_game_ids:
-        existing_data.append(data)
-
-    with open(filename, 'w') as f:
-        json.dump(existing_data, f, indent=4)
-
-def main(schedule_json_path='schedule.json', output_json_path='game_stats_for_dnn.json'):
-    with open(schedule_json_path, 'r') as f:
-        schedule = json.load(f)
-
-    existing_data = load_existing_data('full_game_stats_for_dnn.json')
-    recently_generated_data = load_existing_data('game_stats_for_dnn.json')
-    existing_game_ids = {game['GameID'] for game in existing_data}
-    existing_game_ids_recent = {game['GameID'] for game in recently_generated_data}
-
-    for game in schedule:
-        gameID = game['GameID']
-        if gameID not in existing_game_ids and gameID not in existing_game_ids_recent:
-            print(f"Processing game {gameID}")
-            try:
-                home_stats, away_stats = fetch_team_stats(gameID)
-                if home_stats is None or away_stats is None:  # Check if either is None
-                    print(f"Skipping game {gameID} due to missing stats.")
-                    continue  # Skip this game
-            except TypeError:  # Handle the case where fetch_team_stats returns None
-                print(f"Skipping game {gameID} due to an error fetching stats.")
+def try_ingest_game(game):
+    """Fetch and structure a single game: (structured_data, None, False), or (None, error, retryable) if it failed.
+
+    Only backend errors are retryable; a game the backend has no stats for fails the same way until its data changes.
+    """
+    gameID = game['GameID']
+    print(f"Processing game {gameID}")
+    try:
+        home_stats, away_stats = fetch_team_stats(gameID)
+        if home_stats is None or away_stats is None:  # Check if either is None
+            print(f"Skipping game {gameID} due to missing stats.")
+            return None, 'Missing stats', False
+    except StatWorkerError as e:
+        print(f"Skipping game {gameID} after a backend error: {e}")
+        return None, f"{type(e).__name__}: {e}", True
+    except TypeError as e:
+        print(f"Skipping game {gameID} due to an error fetching stats.")
+        return None, f"Error fetching stats: {e}", False
+    except Exception as e:
+        print(f"Skipping game {gameID} due to an unexpected error: {e}")
+        return None, f"{type(e).__name__}: {e}", False
+
+    return structure_data_for_dnn(game, home_stats, away_stats), None, False
+
+
+def ingest_game(game):
+    """Fetch and structure a single game. Any failure is contained to this game and reported as None."""
+    return try_ingest_game(game)[0]
+
+
+def ingest_games_in_order(games, workers):
+    """Ingest games on a pool of threads, yielding (game, structured_data, error, retryable) in schedule order.
+
+    At most ``workers * 2`` games are in flight, so a slow game holds back the output but
+    never the fetching of the games queued behind it.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for game in games:
+            in_flight.append((game, executor.submit(try_ingest_game, game)))
+            if len(in_flight) >= workers * 2:
+                next_game, future = in_flight.popleft()
+                yield (next_game, *future.result())
+        while in_flight:
+            next_game, future = in_flight.popleft()
+            yield (next_game, *future.result())
+
+
+def open_ingest_queue(schedule_json_path, store):
+    """The work queue, synced with the schedule and recovered from any crashed run."""
+    queue = IngestQueue(INGEST_QUEUE_PATH, max_attempts=INGEST_MAX_ATTEMPTS, base_delay=INGEST_RETRY_DELAY)
+    done_ids = store.game_ids
+    seeding = not queue.seeded
+    if seeding:
+        # Only the first run scans the datasets written before the game store and the queue existed
+        done_ids = done_ids | load_game_ids('full_game_stats_for_dnn.json') | load_game_ids('game_stats_for_dnn.json')
+    added = queue.sync_schedule(schedule_json_path, done_ids, force=seeding)
+    if seeding:
+        queue.mark_seeded()
+    rearmed = queue.rearm_missing()
+    if rearmed:
+        print(f"Trying {rearmed} games that had missing stats again")
+    retried, completed = queue.recover(store.game_ids)
+    if retried or completed:
+        print(f"Recovered from an interrupted run: {retried} games to retry, {completed} already stored")
+    print(f"Ingest queue: {added} games added, {queue.counts()}")
+    return queue
+
+
+def main(schedule_json_path='schedule.json', output_store_path='game_stats_for_dnn.jsonl', workers=1,
+         wait_for_retries=True):
+    store = GameStore(output_store_path)
+    queue = open_ingest_queue(schedule_json_path, store)
+    atexit.register(queue.close)
+    atexit.register(report_tracing)
+
+    # One Node worker per ingestion thread so backend calls never queue behind each other
+    get_stat_worker_pool(size=workers)
+    if USE_STAT_CACHE:
+        get_stat_cache()
+
+    while True:
+        for game, structured_data, error, retryable in ingest_games_in_order(queue.iter_claims(), workers):
+            if structured_data is None and not retryable:
+                queue.miss(game['GameID'], error)
+                continue
+            if structured_data is None:
+                retry_at = queue.fail(game['GameID'], error)
+                if retry_at is None:
+                    print(f"Giving up on game {game['GameID']} after {queue.max_attempts} attempts: {error}")
                 continue
+            store.append(structured_data)
+            queue.complete(game['GameID'])
+            print('Finished game:', game['GameID'])
+
+        # Everything due has been attempted; wait out the backoff of the games that failed
+        retry_at = queue.next_retry_at()
+        if retry_at is None or not wait_for_retries:
+            break
+        delay = max(0.0, retry_at - time.time())
+        print(f"Retrying failed games in {delay:.0f} s")
+        time.sleep(delay)
 
-            structured_data = structure_data_for_dnn(game, home_stats, away_stats)
-            append_to_json(structured_data, output_json_path)
-            print('Finished game:', gameID)
+    print(f"Ingest queue: {queue.counts()}")
 
 
 def structure_data_for_dnn(game, home_stats, away_stats):
@@ -471,4 +723,37 @@ def structure_data_for_dnn(game, home_stats, away_stats):
         'AwayStats': away_stats
     }
 
-main()
\ No newline at end of file
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build DNN game records for every game in the schedule.')
+    parser.add_argument('--schedule', default='schedule.json', help='Schedule JSON listing the games to ingest')
+    parser.add_argument('--output', default='game_stats_for_dnn.jsonl', help='Append-only game store the structured games go to')
+    parser.add_argument('--workers', type=int, default=1, help='Number of games fetched concurrently')
+    parser.add_argument('--queue', default=INGEST_QUEUE_PATH, help='Work-queue manifest tracking every game')
+    parser.add_argument('--max-attempts', type=int, default=INGEST_MAX_ATTEMPTS,
+                        help='Attempts a failing game gets before it is given up on')
+    parser.add_argument('--retry-delay', type=float, default=INGEST_RETRY_DELAY,
+                        help='Seconds before the first retry of a failed game; doubles with every attempt')
+    parser.add_argument('--no-wait', action='store_true',
+                        help='Exit once every due game was attempted instead of waiting for retries')
+    parser.add_argument('--call-timeout', type=float, default=STAT_CALL_TIMEOUT,
+                        help='Seconds a backend call may take before its worker is restarted '
+                             f"(getGameStats, which runs every query of a game, gets "
+                             f"{STAT_CALL_TIMEOUT_MULTIPLES['getGameStats']:g} times as long)")
+    parser.add_argument('--call-retries', type=int, default=STAT_CALL_RETRIES,
+                        help='Retries of a backend call that timed out or lost its worker')
+    parser.add_argument('--hedge', action='store_true',
+                        help='Fetch games one query per call and duplicate slow queries to a spare worker, '
+                             'using the first answer')
+    parser.add_argument('--trace', default=None, help='Write a Chrome trace-event file of every span here at exit')
+    parser.add_argument('--trace-top', type=int, default=20, help='Number of slowest spans listed at exit')
+    args = parser.parse_args()
+
+    TRACE_PATH = args.trace
+    INGEST_QUEUE_PATH = args.queue
+    INGEST_MAX_ATTEMPTS = args.max_attempts
+    INGEST_RETRY_DELAY = args.retry_delay
+    STAT_CALL_TIMEOUT = args.call_timeout
+    STAT_CALL_RETRIES = args.call_retries
+    USE_HEDGED_REQUESTS = args.hedge
+    tracer.top_n = args.trace_top
+    main(args.schedule, args.output, workers=max(1, args.workers), wait_for_retries=not args.no_wait)
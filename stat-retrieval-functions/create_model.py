@@ -1,12 +1,19 @@
+import argparse
 import glob, os
 import json, random, joblib
+import multiprocessing
+import shutil
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 import numpy as np
 import pandas as pd
 from AverageMetrics import AverageMetrics
+from evaluation import evaluate, print_report, write_report
+from feature_cache import load_feature_matrix
+from feature_selection import load_selected_layout
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from keras.models import Sequential, Model
@@ -15,7 +22,6 @@ from keras.optimizers import Adam
 from keras.models import load_model
 from keras.regularizers import l2, l1, l1_l2
 from keras.callbacks import EarlyStopping
-from sklearn.linear_model import LassoCV
 from keras.layers import BatchNormalization
 import tensorflow as tf
 from keras.losses import BinaryCrossentropy, mean_squared_error
@@ -24,151 +30,6 @@ import statistics
 import keras
 
 
-def preprocess_data(games, pre_2023_period=True):
-    features = []
-    labels = []
-    feature_names = []
-
-    # Define the structure for stats we are interested in
-    team_stats_fields = ['win_percentage', 'strength_of_record', 'points_per_game', 'points_allowed_per_game',
-                         'total_YPG', 'turnovers_per_game', 'penalties_per_game', '3rd_down_eff',
-                         'redzone_eff', 'sacks_per_game', 'interceptions_per_game', 'forced_fumbles_per_game',
-                         'yards_per_play', 'yards_allowed_per_game', 'yards_allowed_per_play', 'FBS_opponent_ratio']
-    player_roles = ['QB', 'RBs', 'WRs/TEs', 'Defenders']
-
-    QB_stats_fields = ['fumbles_per_game', 'period_completed', 'completion_percentage', 'passing_yards_per_game',
-                       'TD_INT_ratio', 'QBR', 'rushing_yards', 'rushing_touchdowns', 'passing_touchdowns']
-
-    skill_position_stat_fields = ['fumbles_per_game', 'period_completed', 'rushing_yards_per_game',
-                                  'rushing_yards_per_carry',
-                                  'rushing_touchdowns_per_game', 'receiving_touchdowns_per_game', 'receptions_per_game',
-                                  'receiving_yards_per_game', 'receiving_yards_per_catch']
-
-    defender_stat_fields = ['fumbles_per_game', 'period_completed', 'tackles_per_game', 'sacks_per_game',
-                            'interceptions_per_game', 'forced_fumbles_per_game', 'passes_defended_per_game']
-
-    max_players = {'QB': 1, 'RBs': 4, 'WRs/TEs': 7, 'Defenders': 12, 'OLs': 5}
-
-    games_passed_checks = 0
-    # Process each game
-    for game in games:
-        if (pre_2023_period and int(game['Season']) < 2023) or (not pre_2023_period and int(game['Season']) >= 2023):
-            game_feature = [
-                float(game['Season']) - 2014.0,
-                float(game['Week']),
-                float(game['HomeStats'][0]['division'] == "FBS"),
-                float(game['AwayStats'][0]['division'] == "FBS"),
-                float(game['HomeAPVotes']),
-                float(game['AwayAPVotes']),
-                float(game['HomeFCSVotes']),
-                float(game['AwayFCSVotes'])
-            ]
-
-            if any(len(period.get('QB', [])) == 0 for period in game['HomeStats'] + game['AwayStats']):
-                continue
-
-            if any(len(period.get('RBs', [])) == 0 for period in game['HomeStats'] + game['AwayStats']):
-                continue
-
-            if any(len(period.get('WRs/TEs', [])) == 0 for period in game['HomeStats'] + game['AwayStats']):
-                continue
-
-            if any(len(period.get('OLs', [])) == 0 for period in game['HomeStats'] + game['AwayStats']):
-                continue
-
-            games_passed_checks += 1
-
-            home_recruiting_scores = []
-            away_recruiting_scores = []
-
-            # Function to extract recruiting scores from players, filling in zeros if needed
-            def get_recruiting_scores(players, max_count):
-                scores = [float(player.get('recruiting_score', 0)) for player in players[:max_count]]
-                scores += [0] * (max_count - len(scores))  # Fill the remaining slots with zeros
-                return scores
-
-            # Loop over HomeStats and AwayStats
-            for team_key in ['HomeStats', 'AwayStats']:
-                # Loop over each position group and retrieve the recruiting scores
-                for position, max_count in max_players.items():
-                    players = game[team_key][0].get(position, [])
-                    recruiting_scores = get_recruiting_scores(players, max_count)
-                    game_feature.extend(recruiting_scores)
-                    if team_key == 'HomeStats':
-                        home_recruiting_scores.extend(recruiting_scores)
-                    elif team_key == 'AwayStats':
-                        away_recruiting_scores.extend(recruiting_scores)
-                    else:
-                        print('ERROR!!!! Team key is wrong')
-
-            # Calculate full-team recruiting stats
-            home_average_recruit_score = 0
-            for score in home_recruiting_scores:
-                home_average_recruit_score += score
-            home_average_recruit_score = home_average_recruit_score / len(home_recruiting_scores)
-            home_bc_ratio = sum(i > 0.9 for i in home_recruiting_scores) / len(home_recruiting_scores)
-            home_3_star_ratio = sum(i > 0.8 for i in home_recruiting_scores) / len(home_recruiting_scores)
-            home_any_star_ratio = sum(i > 0.1 for i in home_recruiting_scores) / len(home_recruiting_scores)
-
-            away_average_recruit_score = 0
-            for score in away_recruiting_scores:
-                away_average_recruit_score += score
-            away_average_recruit_score = away_average_recruit_score / len(away_recruiting_scores)
-            away_bc_ratio = sum(i > 0.9 for i in away_recruiting_scores) / len(away_recruiting_scores)
-            away_3_star_ratio = sum(i > 0.8 for i in away_recruiting_scores) / len(away_recruiting_scores)
-            away_any_star_ratio = sum(i > 0.1 for i in away_recruiting_scores) / len(away_recruiting_scores)
-
-            game_feature.append(home_average_recruit_score)
-            game_feature.append(home_bc_ratio)
-            game_feature.append(home_3_star_ratio)
-            game_feature.append(home_any_star_ratio)
-            game_feature.append(away_average_recruit_score)
-            game_feature.append(away_bc_ratio)
-            game_feature.append(away_3_star_ratio)
-            game_feature.append(away_any_star_ratio)
-
-            # Aggregate stats from all periods
-            for period_stats in game['HomeStats'] + game['AwayStats']:
-                # Team stats
-                for field in team_stats_fields:
-                    game_feature.append(float(period_stats.get(field, 0)))
-                # Player stats
-                for role in player_roles:
-                    players = period_stats.get(role, [{}] * max_players[role])
-                    for i in range(max_players[role]):
-                        player = players[i] if i < len(players) else {}
-
-                        stats_to_use = []
-                        if role == 'QB':
-                            stats_to_use = QB_stats_fields
-                        elif role in ['RBs', 'WRs/TEs']:
-                            stats_to_use = skill_position_stat_fields
-                        elif role == 'Defenders':
-                            stats_to_use = defender_stat_fields
-                        else:
-                            print("ERROR!!!! ROLE IS " + role)
-
-                        for field in stats_to_use:
-                            # Convert period_completed from True/False to 1/0
-                            if field == 'period_completed':
-                                game_feature.append(float(player.get(field, False) == "True"))
-                            else:
-                                game_feature.append(float(player.get(field, 0)))
-
-            home_points = float(game['HomePoints'])
-            away_points = float(game['AwayPoints'])
-            win_label = 1 if home_points > away_points else 0
-            features.append(game_feature)
-            labels.append([home_points, away_points, win_label])
-
-    print(f"{games_passed_checks} games passed the checks and were processed.")
-
-    X = np.array(features, dtype=float)
-    y = np.array(labels, dtype=float)
-
-    return X, y
-
-
 def load_data(filename):
     with open(filename, 'r') as file:
         data = json.load(file)
@@ -269,25 +130,6 @@ def load_feature_names(filename):
     return feature_names
 
 
-def lasso_feature_selection(X_train_scaled, y_train_scores, y_train_win_chance):
-    home_scores = y_train_scores[:, 0]  # Extract home scores
-    away_scores = y_train_scores[:, 1]  # Extract away scores
-
-    # Lasso for home scores
-    lasso_home_scores = LassoCV(cv=5, max_iter=1000000, verbose=1, n_jobs=-1).fit(X_train_scaled, home_scores)
-    home_scores_coef = lasso_home_scores.coef_
-
-    # Lasso for away scores
-    lasso_away_scores = LassoCV(cv=5, max_iter=1000000, verbose=1, n_jobs=-1).fit(X_train_scaled, away_scores)
-    away_scores_coef = lasso_away_scores.coef_
-
-    # Lasso for win chance
-    lasso_win_chance = LassoCV(cv=5, max_iter=1000000, verbose=1, n_jobs=-1).fit(X_train_scaled, y_train_win_chance)
-    win_chance_coef = lasso_win_chance.coef_
-
-    return home_scores_coef, away_scores_coef, win_chance_coef
-
-
 def cross_validate_regularization(X_train, y_train_scores, y_train_win_chance, X_val, y_val_scores, y_val_win_chance, reg_strengths):
     best_reg_strength = None
     best_val_loss = float('inf')
@@ -379,186 +221,171 @@ def plot_model_history(history, title='', window_size=25):
         plt.show()
 
 
-def load_and_predict_all_games(X_scaled, y_scores, y_win_chance, combined_model, scaler):
-    # Define the spread categories
-    bucket_ranges = [
-        (0.0, 3.5),
-        (3.5, 7.5),
-        (7.5, 10.5),
-        (10.5, 14.5),
-        (14.5, 17.5),
-        (17.5, 21.5),
-        (21.5, 24.5),
-        (24.5, 28.5),
-        (28.5, 35.5),
-        (35.5, 42.5),
-        (42.5, 49.5),
-        (49.5, 56.5),
-        (56.5, float('inf'))
-    ]
-
-    # Create the buckets dictionary
-    buckets = {
-        f"{low}-{high if high != float('inf') else '56.5+'}": {'range': (low, high), 'games': 0, 'wins': 0}
-        for low, high in bucket_ranges
-    }
-
-    win_chance_buckets = [
-        (0, 0.05), (0.05, 0.1), (0.1, 0.15), (0.15, 0.2),
-        (0.2, 0.25), (0.25, 0.3), (0.3, 0.35),
-        (0.35, 0.4), (0.4, 0.45), (0.45, 0.5), (0.5, 0.55),
-        (0.55, 0.6), (0.6, 0.65), (0.65, 0.7), (0.7, 0.75),
-        (0.75, 0.8), (0.8, 0.85), (0.85, 0.9), (0.9, 0.95),
-        (0.95, 1)
-    ]
-
-    win_chance_stats = {bucket_range: {'games': 0, 'wins': 0} for bucket_range in win_chance_buckets}
-
-    # Here you would loop through your predictions, classify them into these buckets based on their win chance,
-    # and update `win_chance_stats` accordingly with your game outcomes.
-
-    # Predict the outcomes using the provided scaled data
-    predictions = combined_model.predict(X_scaled)
-
-    # Unpack predictions
-    predicted_scores = predictions[0]
-    predicted_win_chance = predictions[1].flatten()
-
-    # Initialize counters for total games and total wins
-    total_games = len(predicted_scores)
-    total_wins = 0
-
-    # Prepare the list to sort the games
-    games_sorted = list(zip(predicted_scores, y_scores, predicted_win_chance))
-
-    # Sort games by predicted home team margin
-    games_sorted.sort(key=lambda x: x[0][0] - x[0][1])
-
-    for i, (predicted_score, actual_score, win_chance) in enumerate(games_sorted):
-        predicted_home, predicted_away = predicted_score
-        actual_home, actual_away = actual_score  # Use actual_score directly
-        actual_win = 1 if actual_home > actual_away else 0  # Determine actual winner
-
-        print(f"Game {i + 1}:\n"
-              f"Predicted Score - Home: {predicted_home:.2f}, Away: {predicted_away:.2f}\n"
-              f"Home Win Chance: {win_chance * 100:.2f}%\n"
-              f"Actual Score - Home: {actual_home}, Away: {actual_away}")
-
-        # Determine which bucket the predicted spread falls into
-        spread = abs(predicted_home - predicted_away)
-        for bucket_name, bucket_info in buckets.items():
-            low, high = bucket_info['range']  # Use bucket_info to access the range
-            if low <= spread < high:
-                bucket_info['games'] += 1
-                if (actual_home > actual_away and predicted_home > predicted_away) or (
-                        actual_away > actual_home and predicted_away > predicted_home):
-                    bucket_info['wins'] += 1
-                break
-
-    # Calculate the wins for the sorted games
-    for bucket_name, bucket_info in buckets.items():
-        if bucket_info['games'] > 0:
-            win_rate = (bucket_info['wins'] / bucket_info['games']) * 100
-            print(f"{bucket_name}: {bucket_info['games']} games, {bucket_info['wins']} wins, {win_rate:.1f}% win rate")
-            total_wins += bucket_info['wins']
-
-    # Calculate and print the total win rate
-    total_win_rate = (total_wins / total_games) * 100
-    print(f"Total: {total_games} games, {total_wins} wins, {total_win_rate:.1f}% win rate\n")
-
-    # Example prediction loop
-    for i, (predicted_score, actual_score, win_chance) in enumerate(
-            zip(predicted_scores, y_scores, predicted_win_chance)):
-        actual_win = y_win_chance[i]  # Assuming y_win_chance contains actual win status (1 for win, 0 for loss)
-
-        # Determine the win chance bucket
-        for low, high in win_chance_buckets:
-            if low <= win_chance < high:  # win_chance should already be a decimal representation
-                win_chance_stats[(low, high)]['games'] += 1
-                if actual_win == 1:
-                    win_chance_stats[(low, high)]['wins'] += 1
-                break
-
-    # After processing all predictions, print out stats for each bucket
-    for (low, high), stats in win_chance_stats.items():
-        if stats['games'] > 0:
-            win_rate = (stats['wins'] / stats['games']) * 100
-            print(
-                f"Win Chance {low * 100:.1f}%-{high * 100:.1f}% ({((low * 100 + high * 100) / 2):.1f}): {stats['games']} games, {stats['wins']} wins, Win Rate: {win_rate:.1f}%")
-
-
-def save_feature_importances(coef, feature_names, filename):
-    feature_importances = sorted(zip(feature_names, coef), key=lambda x: abs(x[1]), reverse=True)
-    with open(filename, 'w') as f:
-        for name, importance in feature_importances:
-            f.write(f"{name}: {importance}\n")
+def load_and_predict_all_games(X_scaled, y_scores, y_win_chance, combined_model, scaler, report_path=None):
+    """Predict every game and print the evaluation report (see evaluation.py); returns the report."""
+    predicted_scores, predicted_win_chance = combined_model.predict(X_scaled)
+    report = evaluate(predicted_scores, predicted_win_chance, y_scores, home_win=y_win_chance)
+    print_report(report)
+    if report_path:
+        write_report(report, report_path)
+    return report
 
 
 import os
 
-def main():
+MODELS_DIR = 'best_models'
+REGISTRY_PATH = os.path.join(MODELS_DIR, 'registry.json')
+ENSEMBLE_SIZE = 5  # export_ensemble.py exports the members ranked 1-5 in the registry
+
+
+def save_training_split(directory, **arrays):
+    """Save the arrays as .npy files so training workers can memory-map them instead of receiving copies."""
+    os.makedirs(directory, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f'{name}.npy'), array)
+
+
+def cpu_groups(threads_per_worker):
+    """Split the CPUs this process may use into one group per training worker."""
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count()))
+    groups = [cpus[i:i + threads_per_worker] for i in range(0, len(cpus) - threads_per_worker + 1, threads_per_worker)]
+    return groups or [cpus]
+
+
+def init_training_worker(cpu_queue):
+    # Each worker takes its own CPUs and sizes TensorFlow's thread pools to match, so workers do not compete
+    cpus = cpu_queue.get()
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+    tf.config.threading.set_intra_op_parallelism_threads(len(cpus))
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def train_ensemble_member(split_directory, seed, model_path):
+    """Train one member on the shared split and return its validation loss."""
+    def load(name):
+        return np.load(os.path.join(split_directory, f'{name}.npy'), mmap_mode='r')
+
+    keras.utils.set_random_seed(seed)
+    X_train_scaled, X_val_scaled = load('X_train_scaled'), load('X_val_scaled')
+    y_val_scores, y_val_win_chance = load('y_val_scores'), load('y_val_win_chance')
+    combined_model, _ = train_combined_model(X_train_scaled, load('y_train_scores'), load('y_train_win_chance'),
+                                             X_val_scaled, y_val_scores, y_val_win_chance)
+    combined_model.save(model_path)
+
+    # Evaluate the weights that were kept, which early stopping may have restored from an earlier epoch
+    val_labels = {'scores_output': y_val_scores, 'win_chance_output': y_val_win_chance}
+    val_loss = combined_model.evaluate(X_val_scaled, val_labels, verbose=0, return_dict=True)['loss']
+    return {'seed': seed, 'path': model_path, 'val_loss': float(val_loss)}
+
+
+def promote_top_models(run, members, top_k=ENSEMBLE_SIZE, registry_path=REGISTRY_PATH):
+    """Copy the top_k members to best_model_<rank>.h5 next to this run's scaler and record the ranking."""
+    ranked = sorted(members, key=lambda member: member['val_loss'])
+    # Copy everything under temporary names first, so a failed copy leaves the previous models in place
+    copies = []
+    for rank, member in enumerate(ranked, start=1):
+        member['rank'] = rank
+        if rank <= top_k:
+            member['promoted'] = f'best_model_{rank}.h5'
+            copies.append((member['path'], member['promoted']))
+    copies.append((run['scaler'], 'scaler.save'))
+    for source, target in copies:
+        shutil.copyfile(source, target + '.tmp')
+    for _, target in copies:
+        os.replace(target + '.tmp', target)
+
+    run['members'] = ranked
+    with open(registry_path + '.tmp', 'w') as f:
+        json.dump(run, f, indent=4)
+    os.replace(registry_path + '.tmp', registry_path)
+
+    # Ranks a previous run promoted beyond this run's top_k
+    promoted = {target for _, target in copies}
+    for stale in glob.glob('best_model_*.h5'):
+        if stale not in promoted:
+            os.remove(stale)
+    return ranked[:top_k]
+
+
+def main(n_members=10, top_k=ENSEMBLE_SIZE, threads_per_worker=2, workers=None, seed=None):
     filename = 'full_game_stats_for_dnn_polls.json'
-    data = load_data(filename)
 
-    # Preprocess data
-    X, y = preprocess_data(data)
+    # Only the columns kept by feature_selection.py are extracted (every column if there is no mask)
+    layout = load_selected_layout()
+
+    # Features come from the binary cache, which is rebuilt only when the dataset or layout changes
+    features = load_feature_matrix(filename, layout=layout)
+    rows = features.rows(pre_2023_period=True)
+    X = features.X[rows]
+    y = features.y[rows]
+    print(f"Loaded {X.shape[0]} games with {X.shape[1]} of {layout.n_all_features} features each")
 
     # Split y into scores and win chance
     y_scores = y[:, :2]
     y_win_chance = y[:, 2]
 
-    # Create the "best_models" folder if it doesn't exist
-    os.makedirs('best_models', exist_ok=True)
-
-    # Create a list to store the top 5 models
-    top_models = []
-
-    # Continuously train models
-    while True:
-        # Split data into training and validation sets
-        X_train, X_val, y_train_scores, y_val_scores, y_train_win_chance, y_val_win_chance = train_test_split(
-            X, y_scores, y_win_chance, test_size=0.2)
-
-        # Scale features
-        scaler = StandardScaler()
-        X_train_scaled = scaler.fit_transform(X_train)
-        X_val_scaled = scaler.transform(X_val)
-
-        # Print the size of the training and validation sets
-        print(f"Training set size: {X_train_scaled.shape[0]} games with {X_train_scaled.shape[1]} features each")
-        print(f"Validation set size: {X_val_scaled.shape[0]} games with {X_val_scaled.shape[1]} features each")
-
-        # Train Combined Model
-        combined_model, combined_history = train_combined_model(X_train_scaled, y_train_scores, y_train_win_chance,
-                                                                X_val_scaled, y_val_scores, y_val_win_chance)
-        # plot_model_history(combined_history, title='Combined Model')
-
-        # Save the trained model
-        model_filename = f'best_models/combined_model_{int(time.time())}.h5'
-        combined_model.save(model_filename)
-        print(f"Trained model saved as {model_filename}")
-
-        # Load the top 5 models based on validation loss
-        model_files = sorted(glob.glob('best_models/best_model_*.h5'))[-5:]
-        top_models = [keras.models.load_model(file) for file in model_files]
-
-        # Save models and scaler
-        joblib.dump(scaler, 'scaler.save')
-
-        # Wait for a certain period before training the next model (e.g., 1 hour)
-        time.sleep(3600)
-
-    # Load feature names
-    # feature_names = load_feature_names('feature_names.txt')
-
-    # Perform Lasso feature selection and save importances
-    # home_scores_coef, away_scores_coef, win_chance_coef = lasso_feature_selection(X_train_scaled, y_train_scores, y_train_win_chance)
-
-    # Save feature importances to files
-    # save_feature_importances(home_scores_coef, feature_names, 'home_scores_feature_importances.txt')
-    # save_feature_importances(away_scores_coef, feature_names, 'away_scores_feature_importances.txt')
-    # save_feature_importances(win_chance_coef, feature_names, 'win_chance_feature_importances.txt')
+    # Every member of the ensemble is trained on one split with one scaler, so they can be averaged
+    seed = seed if seed is not None else int(time.time())
+    run_id = f'run_{seed}'
+    run_directory = os.path.join(MODELS_DIR, run_id)
+    os.makedirs(run_directory, exist_ok=True)
+
+    # Split data into training and validation sets
+    X_train, X_val, y_train_scores, y_val_scores, y_train_win_chance, y_val_win_chance = train_test_split(
+        X, y_scores, y_win_chance, test_size=0.2, random_state=seed % (2 ** 32))
+
+    # Scale features
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_val_scaled = scaler.transform(X_val)
+    scaler_path = os.path.join(run_directory, 'scaler.save')
+    joblib.dump(scaler, scaler_path)
+
+    # Print the size of the training and validation sets
+    print(f"Training set size: {X_train_scaled.shape[0]} games with {X_train_scaled.shape[1]} features each")
+    print(f"Validation set size: {X_val_scaled.shape[0]} games with {X_val_scaled.shape[1]} features each")
+
+    split_directory = os.path.join(run_directory, 'split')
+    save_training_split(split_directory, X_train_scaled=X_train_scaled, X_val_scaled=X_val_scaled,
+                        y_train_scores=y_train_scores, y_val_scores=y_val_scores,
+                        y_train_win_chance=y_train_win_chance, y_val_win_chance=y_val_win_chance)
+
+    # Train the members concurrently, each worker pinned to its own CPUs
+    groups = cpu_groups(threads_per_worker)
+    workers = min(workers or len(groups), len(groups), n_members)
+    context = multiprocessing.get_context('spawn')  # TensorFlow is not fork-safe
+    cpu_queue = context.Queue()
+    for group in groups[:workers]:
+        cpu_queue.put(group)
+    print(f"Training {n_members} models with {workers} workers of {threads_per_worker} threads each")
+
+    members = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=init_training_worker, initargs=(cpu_queue,)) as executor:
+        futures = [executor.submit(train_ensemble_member, split_directory, seed + i,
+                                   os.path.join(run_directory, f'member_{i}.h5'))
+                   for i in range(n_members)]
+        for future in as_completed(futures):
+            member = future.result()
+            print(f"Trained model saved as {member['path']} (validation loss {member['val_loss']:.4f})")
+            members.append(member)
+
+    run = {'run': run_id, 'seed': seed, 'scaler': scaler_path, 'trained_at': int(time.time()),
+           'feature_schema': layout.schema_hash(), 'n_features': layout.n_features}
+    top_models = promote_top_models(run, members, top_k)
+    for member in top_models:
+        print(f"Rank {member['rank']}: {member['path']} -> {member['promoted']} "
+              f"(validation loss {member['val_loss']:.4f})")
+    shutil.rmtree(split_directory)
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Train an ensemble and promote its best models.')
+    parser.add_argument('--members', type=int, default=10, help='Number of models to train')
+    parser.add_argument('--top-k', type=int, default=ENSEMBLE_SIZE, help='Number of models to promote')
+    parser.add_argument('--threads-per-worker', type=int, default=2, help='CPUs given to each training worker')
+    parser.add_argument('--workers', type=int, default=None, help='Training workers (default: as many as fit)')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for the split and the members')
+    args = parser.parse_args()
+    main(args.members, args.top_k, args.threads_per_worker, args.workers, args.seed)
\ No newline at end of file
@@ -0,0 +1,214 @@
+"""Evaluation report for score and win-probability predictions.
+
+Every metric is computed with array operations over all games at once (np.digitize and
+np.bincount for the buckets), so backtests of hundreds of thousands of games evaluate
+instantly:
+
+* spread buckets: games bucketed by the predicted margin, with how often the predicted winner won
+* calibration: 20 equal-width bins of the home win probability (a reliability curve), with
+  the Brier score, log loss and expected calibration error
+* MAE of each score head (home and away points) and of the margin
+
+evaluate() returns the report as a dict; write_report() saves it as JSON and plot_report()
+draws the reliability curve and the spread-bucket accuracy. From the command line, any
+prediction files written by frontend/generate_predictions.py can be evaluated:
+
+    python evaluation.py ../frontend/predictions_2022.json ../frontend/predictions_2023.json --plot report.png
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+
+# Lower edges of the spread buckets; the last bucket is open-ended
+SPREAD_EDGES = np.array([0.0, 3.5, 7.5, 10.5, 14.5, 17.5, 21.5, 24.5, 28.5, 35.5, 42.5, 49.5, 56.5])
+CALIBRATION_BINS = 20
+# Probabilities are clipped this far from 0 and 1 before taking logs
+LOG_LOSS_EPSILON = 1e-15
+
+
+def spread_buckets(predicted_scores, actual_scores, edges=SPREAD_EDGES):
+    """Games and correct winner picks per predicted-spread bucket."""
+    predicted_margin = predicted_scores[:, 0] - predicted_scores[:, 1]
+    actual_margin = actual_scores[:, 0] - actual_scores[:, 1]
+    # A pick is right when the predicted winner won; ties on either side count as wrong
+    correct = np.sign(predicted_margin) * np.sign(actual_margin) > 0
+
+    bucket = np.digitize(np.abs(predicted_margin), edges) - 1
+    games = np.bincount(bucket, minlength=len(edges))
+    wins = np.bincount(bucket, weights=correct, minlength=len(edges)).astype(int)
+
+    buckets = []
+    for i, low in enumerate(edges):
+        high = edges[i + 1] if i + 1 < len(edges) else None
+        buckets.append({
+            'label': f"{low}-{high}" if high is not None else f"{low}+",
+            'low': float(low),
+            'high': float(high) if high is not None else None,
+            'games': int(games[i]),
+            'wins': int(wins[i]),
+            'win_rate': float(wins[i] / games[i]) if games[i] else None,
+        })
+    return buckets, int(np.count_nonzero(correct))
+
+
+def calibration(win_probability, home_win, n_bins=CALIBRATION_BINS):
+    """Reliability curve of the win probabilities plus Brier score, log loss and expected calibration error."""
+    edges = np.linspace(0.0, 1.0, n_bins + 1)
+    # Interior edges only, so a probability of exactly 1.0 lands in the top bin
+    bin_index = np.digitize(win_probability, edges[1:-1])
+    games = np.bincount(bin_index, minlength=n_bins)
+    wins = np.bincount(bin_index, weights=home_win, minlength=n_bins)
+    probability_sum = np.bincount(bin_index, weights=win_probability, minlength=n_bins)
+
+    filled = games > 0
+    mean_probability = np.divide(probability_sum, games, out=np.zeros(n_bins), where=filled)
+    win_rate = np.divide(wins, games, out=np.zeros(n_bins), where=filled)
+
+    clipped = np.clip(win_probability, LOG_LOSS_EPSILON, 1 - LOG_LOSS_EPSILON)
+    n_games = max(len(win_probability), 1)
+    bins = [{
+        'low': float(edges[i]),
+        'high': float(edges[i + 1]),
+        'games': int(games[i]),
+        'wins': int(wins[i]),
+        'mean_probability': float(mean_probability[i]) if filled[i] else None,
+        'win_rate': float(win_rate[i]) if filled[i] else None,
+    } for i in range(n_bins)]
+    return {
+        'bins': bins,
+        'brier_score': float(np.mean((win_probability - home_win) ** 2)) if len(home_win) else None,
+        'log_loss': float(-np.mean(home_win * np.log(clipped) + (1 - home_win) * np.log(1 - clipped)))
+        if len(home_win) else None,
+        'expected_calibration_error': float(np.sum(games * np.abs(mean_probability - win_rate)) / n_games),
+    }
+
+
+def evaluate(predicted_scores, win_probability, actual_scores, home_win=None):
+    """Full report for N games.
+
+    predicted_scores and actual_scores are (N, 2) arrays of home and away points and
+    win_probability is the predicted home win probability. home_win defaults to the actual
+    home score being higher.
+    """
+    predicted_scores = np.asarray(predicted_scores, dtype=float).reshape(-1, 2)
+    actual_scores = np.asarray(actual_scores, dtype=float).reshape(-1, 2)
+    win_probability = np.asarray(win_probability, dtype=float).ravel()
+    if home_win is None:
+        home_win = actual_scores[:, 0] > actual_scores[:, 1]
+    home_win = np.asarray(home_win, dtype=float).ravel()
+
+    buckets, correct = spread_buckets(predicted_scores, actual_scores)
+    errors = np.abs(predicted_scores - actual_scores)
+    margin_errors = np.abs((predicted_scores[:, 0] - predicted_scores[:, 1]) -
+                           (actual_scores[:, 0] - actual_scores[:, 1]))
+    n_games = len(actual_scores)
+    return {
+        'games': n_games,
+        'winner_accuracy': correct / n_games if n_games else None,
+        'mae': {
+            'home_score': float(errors[:, 0].mean()) if n_games else None,
+            'away_score': float(errors[:, 1].mean()) if n_games else None,
+            'margin': float(margin_errors.mean()) if n_games else None,
+        },
+        'spread_buckets': buckets,
+        'calibration': calibration(win_probability, home_win),
+    }
+
+
+def print_report(report):
+    for bucket in report['spread_buckets']:
+        if bucket['games']:
+            print(f"{bucket['label']}: {bucket['games']} games, {bucket['wins']} wins, "
+                  f"{bucket['win_rate'] * 100:.1f}% win rate")
+    correct = sum(bucket['wins'] for bucket in report['spread_buckets'])
+    accuracy = (report['winner_accuracy'] or 0) * 100
+    print(f"Total: {report['games']} games, {correct} wins, {accuracy:.1f}% win rate\n")
+
+    for stats in report['calibration']['bins']:
+        if stats['games']:
+            print(f"Win Chance {stats['low'] * 100:.1f}%-{stats['high'] * 100:.1f}% "
+                  f"({stats['mean_probability'] * 100:.1f}): {stats['games']} games, {stats['wins']} wins, "
+                  f"Win Rate: {stats['win_rate'] * 100:.1f}%")
+
+    if report['games']:
+        calibration_report = report['calibration']
+        print(f"\nBrier score {calibration_report['brier_score']:.4f}, log loss {calibration_report['log_loss']:.4f}, "
+              f"expected calibration error {calibration_report['expected_calibration_error']:.4f}")
+        mae = report['mae']
+        print(f"MAE: home {mae['home_score']:.2f}, away {mae['away_score']:.2f}, margin {mae['margin']:.2f} points")
+
+
+def write_report(report, path):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(report, f, indent=4)
+    os.replace(path + '.tmp', path)
+
+
+def plot_report(report, path=None):
+    """Reliability curve and spread-bucket accuracy; saved to ``path`` or shown."""
+    import matplotlib.pyplot as plt
+
+    figure, (reliability, spreads) = plt.subplots(1, 2, figsize=(12, 5))
+    bins = [stats for stats in report['calibration']['bins'] if stats['games']]
+    reliability.plot([0, 1], [0, 1], linestyle='--', color='gray', label='Perfect calibration')
+    reliability.plot([stats['mean_probability'] for stats in bins], [stats['win_rate'] for stats in bins],
+                     marker='o', label='Model')
+    reliability.set_xlabel('Predicted home win probability')
+    reliability.set_ylabel('Observed home win rate')
+    reliability.set_title(f"Calibration (Brier {report['calibration']['brier_score']:.4f})")
+    reliability.legend()
+
+    buckets = [bucket for bucket in report['spread_buckets'] if bucket['games']]
+    spreads.bar([bucket['label'] for bucket in buckets], [bucket['win_rate'] * 100 for bucket in buckets])
+    spreads.set_xlabel('Predicted spread')
+    spreads.set_ylabel('Winner picked correctly (%)')
+    spreads.set_title('Accuracy by predicted spread')
+    spreads.tick_params(axis='x', rotation=45)
+
+    figure.tight_layout()
+    if path:
+        figure.savefig(path)
+        plt.close(figure)
+    else:
+        plt.show()
+
+
+def load_prediction_files(paths):
+    """Predicted scores, win probabilities and actual scores of every played game in the prediction files."""
+    rows = []
+    for path in paths:
+        with open(path, 'r') as f:
+            predictions_data = json.load(f)
+        for entries in predictions_data.values():
+            for entry in entries:
+                actual = (entry.get('ActualHomeScore'), entry.get('ActualAwayScore'))
+                # Games not played yet have no score (or 0-0)
+                if '' in actual or None in actual or (float(actual[0]), float(actual[1])) == (0.0, 0.0):
+                    continue
+                rows.append((entry['PredictedHomeScore'], entry['PredictedAwayScore'], entry['HomeWinProbability'],
+                             float(actual[0]), float(actual[1])))
+    values = np.array(rows, dtype=float).reshape(-1, 5)
+    return values[:, 0:2], values[:, 2], values[:, 3:5]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate predictions against the actual results.')
+    parser.add_argument('predictions', nargs='+', help='Prediction files written by generate_predictions.py')
+    parser.add_argument('--output', default='evaluation_report.json', help='Where to write the JSON report')
+    parser.add_argument('--plot', default=None, help='Also save the calibration and spread plots here')
+    args = parser.parse_args()
+
+    predicted_scores, win_probability, actual_scores = load_prediction_files(args.predictions)
+    report = evaluate(predicted_scores, win_probability, actual_scores)
+    print_report(report)
+    write_report(report, args.output)
+    print(f"Report saved to {args.output}")
+    if args.plot:
+        plot_report(report, args.plot)
+
+
+if __name__ == '__main__':
+    main()
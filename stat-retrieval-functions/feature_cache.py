@@ -0,0 +1,179 @@
+"""Binary cache of the extracted feature matrix.
+
+Parsing the game-stats JSON and running extract_features takes minutes on the full dataset, so
+the result is kept as .npy files that open memory-mapped in well under a second. The cache is
+built by streaming the dataset (see game_stream.py), so building it never holds every game in memory:
+
+    feature_cache/<key>/X.npy         features, one row per game
+    feature_cache/<key>/y.npy         home points, away points, home win
+    feature_cache/<key>/game_ids.npy  GameID of each row
+    feature_cache/<key>/season.npy
+    feature_cache/<key>/week.npy
+
+``key`` combines a SHA-256 of the source dataset with the feature layout's schema hash, so the
+cache rebuilds itself whenever either changes. A layout with selected columns (see
+feature_selection.py) has its own schema hash and so its own, narrower cache. The dataset digest
+is remembered against the file's size and mtime to avoid rehashing an unchanged file on every
+start. Once a new cache is built, older caches of the same dataset path and layout are deleted.
+
+Each build writes to its own temporary directory, so several processes can build the same
+cache at once; the first to finish wins and the others discard their copy.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from game_features import LAYOUT, extract_features
+from game_stream import iter_game_chunks, iter_games
+
+
+CACHE_DIR = 'feature_cache'
+ARRAYS = ['X', 'y', 'game_ids', 'season', 'week']
+
+
+class FeatureMatrix:
+    def __init__(self, X, y, game_ids, season, week):
+        self.X = X
+        self.y = y
+        self.game_ids = game_ids
+        self.season = season
+        self.week = week
+
+    def __len__(self):
+        return self.X.shape[0]
+
+    def rows(self, pre_2023_period=None, seasons=None, weeks=None):
+        """Boolean mask selecting rows, using the same season split as preprocess_data."""
+        mask = np.ones(len(self), dtype=bool)
+        if pre_2023_period is not None:
+            mask &= (self.season < 2023) if pre_2023_period else (self.season >= 2023)
+        if seasons is not None:
+            mask &= np.isin(self.season, list(seasons))
+        if weeks is not None:
+            mask &= np.isin(self.week, list(weeks))
+        return mask
+
+
+def file_digest(path, cache_dir=CACHE_DIR):
+    """SHA-256 of a file, reusing the last digest if its size and mtime are unchanged."""
+    stat = os.stat(path)
+    stamp = {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    stamp_path = os.path.join(cache_dir, 'digests.json')
+
+    digests = {}
+    if os.path.exists(stamp_path):
+        with open(stamp_path, 'r') as f:
+            digests = json.load(f)
+    known = digests.get(stamp['path'])
+    if known and known['size'] == stamp['size'] and known['mtime_ns'] == stamp['mtime_ns']:
+        return known['sha256']
+
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(chunk)
+    stamp['sha256'] = sha256.hexdigest()
+
+    os.makedirs(cache_dir, exist_ok=True)
+    digests[stamp['path']] = stamp
+    handle, temp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    with os.fdopen(handle, 'w') as f:
+        json.dump(digests, f, indent=4)
+    os.replace(temp_path, stamp_path)
+    return stamp['sha256']
+
+
+def cache_key(source_path, cache_dir=CACHE_DIR, layout=LAYOUT):
+    payload = file_digest(source_path, cache_dir) + layout.schema_hash()
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def build_feature_matrix(source_path, directory, layout=LAYOUT, chunk_size=250):
+    """Stream the dataset through extract_features chunk by chunk and write the cache files.
+
+    Feature rows go to disk as each chunk is extracted, so memory use depends on ``chunk_size``
+    rather than on the size of the dataset.
+    """
+    # Write next to the final location and rename, so readers never see a half-written cache
+    parent = os.path.dirname(directory) or '.'
+    os.makedirs(parent, exist_ok=True)
+    temp_directory = tempfile.mkdtemp(dir=parent, prefix=os.path.basename(directory) + '.', suffix='.tmp')
+    try:
+        _write_feature_matrix(source_path, temp_directory, layout, chunk_size)
+        os.replace(temp_directory, directory)
+    except OSError:
+        # Another process built the same cache first; its copy is identical
+        if not os.path.exists(os.path.join(directory, 'meta.json')):
+            raise
+    finally:
+        shutil.rmtree(temp_directory, ignore_errors=True)
+    prune_superseded(directory, source_path, layout)
+
+
+def _write_feature_matrix(source_path, temp_directory, layout, chunk_size):
+    rows = 0
+    labels, game_ids, seasons, weeks = [], [], [], []
+    raw_path = os.path.join(temp_directory, 'X.raw')
+    with open(raw_path, 'wb') as raw_file:
+        for chunk in iter_game_chunks(iter_games(source_path), chunk_size):
+            X, y, chunk_game_ids = extract_features(chunk, None, layout)
+            raw_file.write(X.tobytes())
+            rows += X.shape[0]
+            labels.append(y)
+            game_ids.extend(chunk_game_ids)
+            # Taken from the games, since a layout with selected columns may not keep the season and week
+            games_by_id = {game['GameID']: game for game in chunk}
+            seasons.append(np.array([int(games_by_id[game_id]['Season']) for game_id in chunk_game_ids],
+                                    dtype=np.int32))
+            weeks.append(np.array([int(games_by_id[game_id]['Week']) for game_id in chunk_game_ids], dtype=np.int32))
+
+    # Copy the raw rows into a proper .npy one block at a time
+    X = np.lib.format.open_memmap(os.path.join(temp_directory, 'X.npy'), mode='w+', dtype=float,
+                                  shape=(rows, layout.n_features))
+    if rows:
+        raw = np.memmap(raw_path, dtype=float, mode='r', shape=(rows, layout.n_features))
+        for start in range(0, rows, chunk_size):
+            X[start:start + chunk_size] = raw[start:start + chunk_size]
+        del raw
+    X.flush()
+    del X
+    os.remove(raw_path)
+
+    np.save(os.path.join(temp_directory, 'y.npy'), np.concatenate(labels) if labels else np.zeros((0, 3)))
+    np.save(os.path.join(temp_directory, 'game_ids.npy'), np.array(game_ids, dtype=str))
+    np.save(os.path.join(temp_directory, 'season.npy'),
+            np.concatenate(seasons) if seasons else np.zeros(0, dtype=np.int32))
+    np.save(os.path.join(temp_directory, 'week.npy'), np.concatenate(weeks) if weeks else np.zeros(0, dtype=np.int32))
+    with open(os.path.join(temp_directory, 'meta.json'), 'w') as f:
+        json.dump({'source': os.path.abspath(source_path), 'schema': layout.schema_hash(), 'rows': rows},
+                  f, indent=4)
+
+
+def prune_superseded(directory, source_path, layout=LAYOUT):
+    """Delete the other caches of the same dataset path and layout, which older versions of the file produced."""
+    cache_dir = os.path.dirname(directory) or '.'
+    source, schema = os.path.abspath(source_path), layout.schema_hash()
+    for name in os.listdir(cache_dir):
+        other = os.path.join(cache_dir, name)
+        meta_path = os.path.join(other, 'meta.json')
+        if other == directory or not os.path.exists(meta_path):
+            continue
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get('source') == source and meta.get('schema') == schema:
+            shutil.rmtree(other, ignore_errors=True)
+
+
+def load_feature_matrix(source_path, cache_dir=CACHE_DIR, layout=LAYOUT):
+    """Memory-mapped features for ``source_path``, building the cache first if needed."""
+    directory = os.path.join(cache_dir, cache_key(source_path, cache_dir, layout))
+    if not os.path.exists(os.path.join(directory, 'meta.json')):
+        print(f"Building feature cache for {source_path} in {directory}")
+        build_feature_matrix(source_path, directory, layout)
+
+    arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r') for name in ARRAYS}
+    return FeatureMatrix(**arrays)
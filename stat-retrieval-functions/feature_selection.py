@@ -0,0 +1,302 @@
+"""Lasso feature selection for the DNN inputs.
+
+Fits a cross-validated Lasso per target (home points, away points, home win) on the
+standardized pre-2023 training features and keeps every column with a non-zero coefficient
+for at least one of them. The kept columns are saved to ``feature_mask.json`` together with
+the schema hash of the layout they index, and the per-target coefficients go to the
+``*_feature_importances.txt`` reports:
+
+    python feature_selection.py
+    python feature_selection.py --threshold 1e-4    # also drop columns with tiny coefficients
+
+The fit gives the same result as ``LassoCV(cv=5)`` for each target, with less repeated work:
+
+* the Gram matrix ``X.T @ X`` is computed once; each training fold's centered Gram follows
+  from it by subtracting the held-out fold's block, and is shared by all three targets
+* every (target, fold) regularization path runs lasso_path on the precomputed Gram and
+  ``X.T @ y``, so coordinate descent never touches the rows of X; each alpha starts from the
+  previous alpha's coefficients
+* the paths run concurrently on a thread pool, since coordinate descent releases the GIL
+* each target's final fit walks the same path down to its chosen alpha, and its result is
+  checkpointed so an interrupted run only redoes the unfinished targets
+
+Training (create_model.py) and prediction (frontend/generate_predictions.py) build their
+FeatureLayout through load_selected_layout, so dropped columns are never extracted from the
+games at all. Without a mask file every column is used. A mask whose schema hash no longer
+matches the layout in game_features.py is refused rather than applied to the wrong columns.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from feature_cache import load_feature_matrix
+from game_features import LAYOUT, check_feature_names
+
+
+DATASET_PATH = 'full_game_stats_for_dnn_polls.json'
+FEATURE_MASK_PATH = 'feature_mask.json'
+CHECKPOINT_DIR = 'lasso_checkpoints'
+TARGETS = ['home_scores', 'away_scores', 'win_chance']
+
+
+def fold_bounds(n_samples, cv):
+    """Contiguous held-out folds, the same ones KFold(cv) without shuffling (LassoCV's default) makes."""
+    sizes = np.full(cv, n_samples // cv)
+    sizes[:n_samples % cv] += 1
+    stops = np.cumsum(sizes)
+    return list(zip((stops - sizes).tolist(), stops.tolist()))
+
+
+def alpha_grid(xy, n_samples, n_alphas=100, eps=1e-3):
+    """Alphas from the smallest one that zeroes every coefficient down by ``eps``, as LassoCV chooses them."""
+    alpha_max = np.max(np.abs(xy)) / n_samples
+    if alpha_max <= np.finfo(float).resolution:
+        return np.full(n_alphas, np.finfo(float).resolution)
+    return np.logspace(np.log10(alpha_max * eps), np.log10(alpha_max), num=n_alphas)[::-1]
+
+
+class CenteredMoments:
+    """Centered Gram matrix and X.T @ y of the rows outside one held-out fold (or of every row)."""
+
+    def __init__(self, n_samples, x_mean, y_mean, gram, xy):
+        self.n_samples = n_samples
+        self.x_mean = x_mean
+        self.y_mean = y_mean
+        self.gram = gram
+        self.xy = xy
+
+
+def centered_moments(X, Y, gram, xy, x_sum, y_sum, exclude=None):
+    """Moments of X without the rows in ``exclude`` = (start, stop), derived from the all-row sums.
+
+    ``gram``, ``xy``, ``x_sum`` and ``y_sum`` are the uncentered X.T @ X, X.T @ Y and column sums
+    of every row; only the excluded block is multiplied again.
+    """
+    n_samples = X.shape[0]
+    if exclude is not None:
+        start, stop = exclude
+        block, y_block = X[start:stop], Y[start:stop]
+        gram = gram - block.T @ block
+        xy = xy - block.T @ y_block
+        x_sum = x_sum - block.sum(axis=0)
+        y_sum = y_sum - y_block.sum(axis=0)
+        n_samples -= stop - start
+    else:
+        gram = gram.copy()
+    x_mean = x_sum / n_samples
+    y_mean = y_sum / n_samples
+    # Centering: (X - m).T @ (X - m) = X.T @ X - n * m m.T, and likewise for X.T @ y
+    gram -= n_samples * np.outer(x_mean, x_mean)
+    xy = np.asfortranarray(xy - n_samples * np.outer(x_mean, y_mean))
+    return CenteredMoments(n_samples, x_mean, y_mean, gram, xy)
+
+
+def gram_lasso_path(moments, y_centered, target, alphas, max_iter, tol):
+    """Coefficients (n_features, n_alphas) along ``alphas``, solved on the precomputed Gram matrix."""
+    from sklearn.linear_model import lasso_path
+
+    # With a precomputed Gram and Xy and check_input=False, lasso_path uses X only for its
+    # shape, so a zero-strided stand-in replaces a copy of the training rows
+    X_shape_only = np.broadcast_to(np.zeros((), dtype=float), (moments.n_samples, moments.gram.shape[0]))
+    _, coefs, _ = lasso_path(X_shape_only, y_centered, alphas=alphas, precompute=moments.gram,
+                             Xy=np.ascontiguousarray(moments.xy[:, target]), max_iter=max_iter, tol=tol,
+                             check_input=False)
+    return coefs
+
+
+def fold_mse_path(X, Y, target, fold, moments, alphas, max_iter, tol):
+    """Held-out mean squared error of every alpha on the path fitted without ``fold``."""
+    start, stop = fold
+    y = Y[:, target]
+    y_centered = np.concatenate([y[:start], y[stop:]]) - moments.y_mean[target]
+    coefs = gram_lasso_path(moments, y_centered, target, alphas, max_iter, tol)
+    intercepts = moments.y_mean[target] - moments.x_mean @ coefs
+    residuals = y[start:stop, np.newaxis] - (X[start:stop] @ coefs + intercepts)
+    return np.mean(residuals ** 2, axis=0)
+
+
+def refit_target(Y, target, moments, alphas, mse_path, max_iter, tol):
+    """Fit every row at the alpha with the lowest mean held-out error, warm-starting down the path."""
+    best = int(np.argmin(mse_path.mean(axis=0)))
+    y_centered = Y[:, target] - moments.y_mean[target]
+    coefs = gram_lasso_path(moments, y_centered, target, alphas[:best + 1], max_iter, tol)
+    return {'coef': coefs[:, -1], 'alpha': float(alphas[best]), 'alphas': alphas, 'mse_path': mse_path}
+
+
+def data_key(X, Y, **params):
+    """Identifies the inputs of a fit, so a checkpoint is only reused for the same data and settings."""
+    sha256 = hashlib.sha256(json.dumps([X.shape, Y.shape, params], sort_keys=True).encode('utf-8'))
+    for start in range(0, X.shape[0], 4096):
+        sha256.update(np.ascontiguousarray(X[start:start + 4096]).tobytes())
+    sha256.update(np.ascontiguousarray(Y).tobytes())
+    return sha256.hexdigest()
+
+
+def load_checkpoint(checkpoint_dir, name, key):
+    path = os.path.join(checkpoint_dir, f'{name}.npz')
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as arrays:
+        if str(arrays['key']) != key:
+            return None
+        return {'coef': arrays['coef'], 'alpha': float(arrays['alpha']), 'alphas': arrays['alphas'],
+                'mse_path': arrays['mse_path']}
+
+
+def save_checkpoint(checkpoint_dir, name, key, result):
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    path = os.path.join(checkpoint_dir, f'{name}.npz')
+    np.savez(path + '.tmp.npz', key=np.array(key), **result)
+    os.replace(path + '.tmp.npz', path)
+
+
+def fit_lasso_cv(X, Y, names=TARGETS, cv=5, n_alphas=100, eps=1e-3, max_iter=1000000, tol=1e-4,
+                 workers=None, checkpoint_dir=None):
+    """Cross-validated Lasso for every column of Y, sharing the Gram matrix across folds and targets.
+
+    Returns {name: {'coef', 'alpha', 'alphas', 'mse_path'}} with mse_path shaped (cv, n_alphas).
+    """
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float).reshape(X.shape[0], -1)
+    names = list(names)
+    params = {'cv': cv, 'n_alphas': n_alphas, 'eps': eps, 'max_iter': max_iter, 'tol': tol}
+
+    results = {}
+    key = None
+    if checkpoint_dir:
+        key = data_key(X, Y, **params)
+        for target, name in enumerate(names):
+            result = load_checkpoint(checkpoint_dir, name, key + name)
+            if result is not None:
+                print(f"{name}: reusing the checkpoint (alpha {result['alpha']:.4g})")
+                results[name] = result
+    pending = [target for target, name in enumerate(names) if name not in results]
+    if not pending:
+        return results
+
+    start_time = time.time()
+    folds = fold_bounds(X.shape[0], cv)
+    gram, xy, x_sum, y_sum = X.T @ X, X.T @ Y, X.sum(axis=0), Y.sum(axis=0)
+    full = centered_moments(X, Y, gram, xy, x_sum, y_sum)
+    # Like LassoCV, each target's alphas come from all rows and are shared by its folds
+    alphas = {target: alpha_grid(full.xy[:, target], full.n_samples, n_alphas, eps) for target in pending}
+    fold_moments = [centered_moments(X, Y, gram, xy, x_sum, y_sum, exclude=fold) for fold in folds]
+    del gram, xy
+    print(f"Gram matrices ready in {time.time() - start_time:.1f}s; fitting {len(pending)} targets x {cv} folds")
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        paths = {(target, k): executor.submit(fold_mse_path, X, Y, target, fold, fold_moments[k], alphas[target],
+                                              max_iter, tol)
+                 for target in pending for k, fold in enumerate(folds)}
+        refits = {}
+        for target in pending:
+            mse_path = np.vstack([paths[(target, k)].result() for k in range(cv)])
+            refits[target] = executor.submit(refit_target, Y, target, full, alphas[target], mse_path, max_iter, tol)
+        for target in pending:
+            name = names[target]
+            results[name] = refits[target].result()
+            if checkpoint_dir:
+                save_checkpoint(checkpoint_dir, name, key + name, results[name])
+            print(f"{name}: alpha {results[name]['alpha']:.4g}, "
+                  f"{np.count_nonzero(results[name]['coef'])} non-zero coefficients "
+                  f"({time.time() - start_time:.1f}s)")
+    return results
+
+
+def lasso_feature_selection(X_train_scaled, y_train_scores, y_train_win_chance, workers=None,
+                            checkpoint_dir=None):
+    """Lasso coefficients for home scores, away scores and win chance, in that order."""
+    Y = np.column_stack([y_train_scores[:, 0], y_train_scores[:, 1], y_train_win_chance])
+    results = fit_lasso_cv(X_train_scaled, Y, TARGETS, workers=workers, checkpoint_dir=checkpoint_dir)
+    return tuple(results[name]['coef'] for name in TARGETS)
+
+
+def save_feature_importances(coef, feature_names, filename):
+    feature_importances = sorted(zip(feature_names, coef), key=lambda x: abs(x[1]), reverse=True)
+    with open(filename, 'w') as f:
+        for name, importance in feature_importances:
+            f.write(f"{name}: {importance}\n")
+
+
+def feature_mask(coefs, threshold=0.0):
+    """Columns whose coefficient magnitude exceeds ``threshold`` for any of the targets."""
+    return np.any(np.abs(np.vstack(coefs)) > threshold, axis=0)
+
+
+def save_feature_mask(mask, path=FEATURE_MASK_PATH, layout=LAYOUT, **details):
+    mask = np.asarray(mask, dtype=bool)
+    if mask.shape != (layout.n_all_features,):
+        raise ValueError(f"Expected a mask of {layout.n_all_features} columns, got shape {mask.shape}")
+    data = {
+        'schema_hash': layout.schema_hash(),
+        'n_features': layout.n_all_features,
+        'columns': np.flatnonzero(mask).tolist(),
+        **details,
+    }
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f, indent=4)
+    os.replace(path + '.tmp', path)
+
+
+def load_feature_mask(path=FEATURE_MASK_PATH, layout=LAYOUT):
+    """Indices of the kept columns, checked against the layout the mask was fitted on."""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if data['schema_hash'] != layout.schema_hash():
+        raise ValueError(f"{path} was fitted on a different feature layout; "
+                         f"run feature_selection.py again or delete the file")
+    return np.asarray(data['columns'], dtype=np.intp)
+
+
+def load_selected_layout(path=FEATURE_MASK_PATH, layout=LAYOUT):
+    """``layout`` narrowed to the columns in the mask file, or ``layout`` itself if there is no mask."""
+    if not os.path.exists(path):
+        return layout
+    return layout.select(load_feature_mask(path, layout))
+
+
+def main():
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    parser = argparse.ArgumentParser(description='Fit the Lasso feature mask used by training and prediction.')
+    parser.add_argument('--data', default=DATASET_PATH, help='Game-stats dataset')
+    parser.add_argument('--output', default=FEATURE_MASK_PATH, help='Where to write the mask')
+    parser.add_argument('--threshold', type=float, default=0.0,
+                        help='Keep columns whose largest coefficient magnitude is above this')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the training/validation split')
+    parser.add_argument('--workers', type=int, default=None, help='Threads fitting paths (default: one per CPU)')
+    parser.add_argument('--checkpoint-dir', default=CHECKPOINT_DIR, help='Where finished targets are checkpointed')
+    args = parser.parse_args()
+
+    # The mask indexes the full layout, so it is always fitted on every column
+    features = load_feature_matrix(args.data, layout=LAYOUT)
+    rows = features.rows(pre_2023_period=True)
+    X, y = features.X[rows], features.y[rows]
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=args.seed)
+    X_train_scaled = StandardScaler().fit_transform(X_train)
+
+    results = fit_lasso_cv(X_train_scaled, y_train, TARGETS, workers=args.workers,
+                           checkpoint_dir=args.checkpoint_dir)
+    coefs = [results[target]['coef'] for target in TARGETS]
+
+    feature_names = check_feature_names('feature_names.txt', LAYOUT)
+    for target, coef in zip(TARGETS, coefs):
+        save_feature_importances(coef, feature_names, f'{target}_feature_importances.txt')
+
+    mask = feature_mask(coefs, args.threshold)
+    if not mask.any():
+        raise SystemExit("Lasso kept no features; lower --threshold")
+    save_feature_mask(mask, args.output, LAYOUT, threshold=args.threshold,
+                      alphas={target: results[target]['alpha'] for target in TARGETS},
+                      nonzero={target: int(np.count_nonzero(coef)) for target, coef in zip(TARGETS, coefs)})
+    print(f"Keeping {int(mask.sum())} of {mask.size} features; mask saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
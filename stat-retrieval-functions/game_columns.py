@@ -0,0 +1,328 @@
+"""Compact columnar storage for the game-stats datasets.
+
+A game record repeats every key name for each of its 10 period blocks, player groups and
+players, and every player's recruiting score and id are copied into each period. A columnar
+file (.npz) stores the same records as fixed-schema arrays instead:
+
+    game_ids            (games,)                      index into the string table
+    game_values         (games, 8)                    Season, Week, HomePoints, AwayPoints, the 4 poll votes
+    period_counts       (games, 2)                    number of HomeStats and AwayStats blocks
+    divisions, periods  (games, 10)                   string-table index of each block's division and period name
+    groups_present      (games, 10)       uint8       bit i set if the block has player group i (even if empty)
+    team_stats          (games, 10, 16)   float32     TEAM_STATS_FIELDS of each block
+    <group>_stats       (games, 10, slots, fields)    float32, one array per player group (QB, RBs, ...)
+    <group>_players     (games, 10, slots)            index into the player table, -1 for an empty slot
+    player_ids, player_scores                         the player table: id and recruiting score (float64, so
+                                                      the star thresholds compare exactly), once per player
+    strings                                           the string table, one UTF-8 blob
+
+Blocks 0-4 are the HomeStats periods and 5-9 the AwayStats periods. Each group has as many
+slots as its largest period in the dataset, so no player is dropped. The field lists are
+stored with the arrays, so a file stays readable if the lists in game_features.py change.
+
+to_games()/iter_games() rebuild the dict records. Stats come back as float32 values, and
+period_completed comes back as the "True"/"False" string the feature extractor expects; missing
+team and player stats come back as 0, as the extractor reads them. A player group comes back only
+if the block had it, so records round-trip unchanged apart from these defaults.
+game_stream.iter_games reads .npz files directly, so every consumer of the JSON datasets accepts
+them too:
+
+    python game_columns.py pack full_game_stats_for_dnn_polls.json full_game_stats_for_dnn_polls.npz
+    python game_columns.py unpack full_game_stats_for_dnn_polls.npz full_game_stats_for_dnn_polls.json
+"""
+import argparse
+import json
+import os
+from array import array
+
+import numpy as np
+
+from game_features import MAX_PLAYERS, N_PERIODS, ROLE_STAT_FIELDS, TEAM_STATS_FIELDS
+
+
+PLAYER_GROUPS = list(MAX_PLAYERS)
+# Offensive linemen only carry the stats every player has
+GROUP_FIELDS = {group: ROLE_STAT_FIELDS.get(group, ['fumbles_per_game', 'period_completed']) for group in PLAYER_GROUPS}
+GAME_TEXT_FIELDS = ['Season', 'Week', 'HomePoints', 'AwayPoints']  # Stored as strings in the records
+VOTE_FIELDS = ['HomeAPVotes', 'AwayAPVotes', 'HomeFCSVotes', 'AwayFCSVotes']
+PERIODS_PER_TEAM = N_PERIODS // 2
+# Marks an absent game field, division or period name
+MISSING = -1
+
+GAME_KEYS = {'GameID', 'HomeStats', 'AwayStats'} | set(GAME_TEXT_FIELDS) | set(VOTE_FIELDS)
+BLOCK_KEYS = {'division', 'period'} | set(TEAM_STATS_FIELDS) | set(PLAYER_GROUPS)
+PLAYER_KEYS = {group: {'player_id', 'recruiting_score'} | set(fields) for group, fields in GROUP_FIELDS.items()}
+
+
+def array_name(group):
+    return group.replace('/', '_')
+
+
+class StringTable:
+    def __init__(self):
+        self.strings = []
+        self.index = {}
+
+    def add(self, value):
+        position = self.index.get(value)
+        if position is None:
+            if '\n' in value:
+                raise ValueError(f"Strings in the string table cannot contain newlines: {value!r}")
+            position = self.index[value] = len(self.strings)
+            self.strings.append(value)
+        return position
+
+
+def encode_strings(strings):
+    return np.frombuffer('\n'.join(strings).encode('utf-8'), dtype=np.uint8)
+
+
+def decode_strings(blob):
+    return blob.tobytes().decode('utf-8').split('\n') if blob.size else []
+
+
+def _int_field(game, field):
+    value = game.get(field)
+    if value is None or value == '':
+        return MISSING
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Game {game.get('GameID')}: {field} must be a whole number, got {value!r}")
+
+
+def _check_keys(keys, allowed, where):
+    unknown = set(keys) - allowed
+    if unknown:
+        raise ValueError(f"{where} has fields outside the columnar schema: {', '.join(sorted(unknown))}")
+
+
+class GameColumns:
+    def __init__(self, arrays, strings, schema):
+        self.arrays = arrays
+        self.strings = strings
+        self.team_fields = schema['team_stats_fields']
+        self.group_fields = schema['group_fields']
+        self.groups = list(self.group_fields)
+        self._player_ids = None
+        self._player_scores = None
+
+    def __len__(self):
+        return len(self.arrays['game_ids'])
+
+    @classmethod
+    def from_games(cls, games):
+        """Pack dict records (any iterable) in one pass."""
+        strings = StringTable()
+        player_table = {}
+        player_ids, player_scores = array('i'), array('d')
+        game_ids, game_values, period_counts = array('i'), array('q'), array('b')
+        divisions, periods, team_stats, groups_present = array('i'), array('i'), array('f'), array('B')
+        # Players are collected as flat rows with a count per block and spread over slots at the end
+        rows = {group: array('f') for group in PLAYER_GROUPS}
+        row_players = {group: array('i') for group in PLAYER_GROUPS}
+        counts = {group: array('i') for group in PLAYER_GROUPS}
+        empty_team = [0.0] * len(TEAM_STATS_FIELDS)
+
+        for game in games:
+            _check_keys(game, GAME_KEYS, f"Game {game.get('GameID')}")
+            game_ids.append(strings.add(game['GameID']))
+            game_values.extend(_int_field(game, field) for field in GAME_TEXT_FIELDS + VOTE_FIELDS)
+            blocks = []
+            for side in ('HomeStats', 'AwayStats'):
+                side_blocks = game.get(side, [])
+                if len(side_blocks) > PERIODS_PER_TEAM:
+                    raise ValueError(f"Game {game['GameID']} has {len(side_blocks)} {side} periods, "
+                                     f"at most {PERIODS_PER_TEAM} fit the columnar schema")
+                period_counts.append(len(side_blocks))
+                blocks.extend(side_blocks)
+                blocks.extend([None] * (PERIODS_PER_TEAM - len(side_blocks)))
+
+            for block in blocks:
+                if block is None:
+                    divisions.append(MISSING)
+                    periods.append(MISSING)
+                    team_stats.extend(empty_team)
+                    groups_present.append(0)
+                    for group in PLAYER_GROUPS:
+                        counts[group].append(0)
+                    continue
+                _check_keys(block, BLOCK_KEYS, f"A period of game {game['GameID']}")
+                divisions.append(strings.add(block['division']) if 'division' in block else MISSING)
+                periods.append(strings.add(block['period']) if 'period' in block else MISSING)
+                team_stats.extend(float(block.get(field, 0)) for field in TEAM_STATS_FIELDS)
+                groups_present.append(sum(1 << bit for bit, group in enumerate(PLAYER_GROUPS) if group in block))
+                for group in PLAYER_GROUPS:
+                    players = block.get(group, ())
+                    fields = GROUP_FIELDS[group]
+                    counts[group].append(len(players))
+                    for player in players:
+                        _check_keys(player, PLAYER_KEYS[group], f"A {group} player of game {game['GameID']}")
+                        key = (player['player_id'], float(player.get('recruiting_score', 0)))
+                        index = player_table.get(key)
+                        if index is None:
+                            index = player_table[key] = len(player_ids)
+                            player_ids.append(strings.add(key[0]))
+                            player_scores.append(key[1])
+                        row_players[group].append(index)
+                        for field in fields:
+                            value = player.get(field, 0)
+                            rows[group].append((value == "True") if field == 'period_completed' else float(value))
+
+        n_games = len(game_ids)
+        arrays = {
+            'game_ids': np.frombuffer(game_ids, dtype=np.int32).copy(),
+            'game_values': np.frombuffer(game_values, dtype=np.int64).reshape(
+                n_games, len(GAME_TEXT_FIELDS + VOTE_FIELDS)).copy(),
+            'period_counts': np.frombuffer(period_counts, dtype=np.int8).reshape(n_games, 2).copy(),
+            'divisions': np.frombuffer(divisions, dtype=np.int32).reshape(n_games, N_PERIODS).copy(),
+            'periods': np.frombuffer(periods, dtype=np.int32).reshape(n_games, N_PERIODS).copy(),
+            'groups_present': np.frombuffer(groups_present, dtype=np.uint8).reshape(n_games, N_PERIODS).copy(),
+            'team_stats': np.frombuffer(team_stats, dtype=np.float32).reshape(
+                n_games, N_PERIODS, len(TEAM_STATS_FIELDS)).copy(),
+            'player_ids': np.frombuffer(player_ids, dtype=np.int32).copy(),
+            'player_scores': np.frombuffer(player_scores, dtype=np.float64).copy(),
+        }
+        for group in PLAYER_GROUPS:
+            stats, players = _spread_slots(np.frombuffer(rows[group], dtype=np.float32),
+                                           np.frombuffer(row_players[group], dtype=np.int32),
+                                           np.frombuffer(counts[group], dtype=np.int32),
+                                           n_games, len(GROUP_FIELDS[group]))
+            arrays[f'{array_name(group)}_stats'] = stats
+            arrays[f'{array_name(group)}_players'] = players
+        schema = {'team_stats_fields': TEAM_STATS_FIELDS, 'group_fields': GROUP_FIELDS}
+        return cls(arrays, strings.strings, schema)
+
+    def save(self, path):
+        """Write an uncompressed .npz (written next to ``path`` and renamed into place)."""
+        schema = {'team_stats_fields': self.team_fields, 'group_fields': self.group_fields}
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, strings=encode_strings(self.strings), schema=np.array(json.dumps(schema)), **self.arrays)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files if name not in ('strings', 'schema')}
+            strings = decode_strings(data['strings'])
+            schema = json.loads(str(data['schema']))
+        return cls(arrays, strings, schema)
+
+    def rows(self, seasons=None, weeks=None):
+        """Indices of the games in the given seasons/weeks."""
+        mask = np.ones(len(self), dtype=bool)
+        if seasons is not None:
+            mask &= np.isin(self.arrays['game_values'][:, 0], [int(season) for season in seasons])
+        if weeks is not None:
+            mask &= np.isin(self.arrays['game_values'][:, 1], [int(week) for week in weeks])
+        return np.flatnonzero(mask)
+
+    def game(self, index):
+        """The dict record of one game."""
+        if self._player_ids is None:
+            self._player_ids = [self.strings[i] for i in self.arrays['player_ids'].tolist()]
+            self._player_scores = self.arrays['player_scores'].tolist()
+        values = self.arrays['game_values'][index].tolist()
+        game = {'GameID': self.strings[int(self.arrays['game_ids'][index])]}
+        for field, value in zip(GAME_TEXT_FIELDS, values):
+            game[field] = '' if value == MISSING else str(value)
+        home_count, away_count = self.arrays['period_counts'][index].tolist()
+        game['HomeStats'] = [self._block(index, period) for period in range(home_count)]
+        game['AwayStats'] = [self._block(index, PERIODS_PER_TEAM + period) for period in range(away_count)]
+        for field, value in zip(VOTE_FIELDS, values[len(GAME_TEXT_FIELDS):]):
+            if value != MISSING:
+                game[field] = value
+        return game
+
+    def _block(self, index, period):
+        block = {}
+        division = int(self.arrays['divisions'][index, period])
+        if division != MISSING:
+            block['division'] = self.strings[division]
+        block.update(zip(self.team_fields, self.arrays['team_stats'][index, period].tolist()))
+        # Files written before groups_present was recorded have every group in every block
+        present = int(self.arrays['groups_present'][index, period]) if 'groups_present' in self.arrays else -1
+        for bit, group in enumerate(self.groups):
+            if not present & (1 << bit):
+                continue
+            fields = self.group_fields[group]
+            completed = fields.index('period_completed') if 'period_completed' in fields else None
+            slots = self.arrays[f'{array_name(group)}_players'][index, period]
+            count = int(np.count_nonzero(slots >= 0))
+            players = []
+            for player, values in zip(slots[:count].tolist(),
+                                      self.arrays[f'{array_name(group)}_stats'][index, period, :count].tolist()):
+                if completed is not None:
+                    values[completed] = "True" if values[completed] else "False"
+                record = {'player_id': self._player_ids[player], 'recruiting_score': self._player_scores[player]}
+                record.update(zip(fields, values))
+                players.append(record)
+            block[group] = players
+        name = int(self.arrays['periods'][index, period])
+        if name != MISSING:
+            block['period'] = self.strings[name]
+        return block
+
+    def iter_games(self, indices=None):
+        for index in (range(len(self)) if indices is None else indices):
+            yield self.game(int(index))
+
+    def to_games(self):
+        return list(self.iter_games())
+
+
+def _spread_slots(rows, row_players, counts, n_games, n_fields):
+    """Place flat player rows into (games, periods, slots, fields) arrays, padding empty slots."""
+    slots = int(counts.max()) if counts.size else 0
+    stats = np.zeros((n_games * N_PERIODS, slots, n_fields), dtype=np.float32)
+    players = np.full((n_games * N_PERIODS, slots), MISSING, dtype=np.int32)
+    if row_players.size:
+        block = np.repeat(np.arange(counts.size), counts)
+        starts = np.cumsum(counts) - counts
+        slot = np.arange(row_players.size) - starts[block]
+        stats[block, slot] = rows.reshape(-1, n_fields)
+        players[block, slot] = row_players
+    return (stats.reshape(n_games, N_PERIODS, slots, n_fields),
+            players.reshape(n_games, N_PERIODS, slots))
+
+
+def pack_file(source_path, output_path):
+    """Convert a JSON array or JSONL dataset to a columnar .npz; returns the number of games."""
+    from game_stream import iter_games
+
+    columns = GameColumns.from_games(iter_games(source_path))
+    columns.save(output_path)
+    return len(columns)
+
+
+def unpack_file(source_path, output_path):
+    """Write a columnar .npz back out as a JSON array of game records; returns the number of games."""
+    columns = GameColumns.load(source_path)
+    with open(output_path + '.tmp', 'w') as f:
+        f.write('[')
+        for index, game in enumerate(columns.iter_games()):
+            f.write((',\n' if index else '\n') + json.dumps(game))
+        f.write('\n]\n')
+    os.replace(output_path + '.tmp', output_path)
+    return len(columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert game-stats datasets to and from the columnar format.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    pack_parser = subparsers.add_parser('pack', help='JSON array or JSONL dataset -> columnar .npz')
+    pack_parser.add_argument('source')
+    pack_parser.add_argument('output')
+    unpack_parser = subparsers.add_parser('unpack', help='Columnar .npz -> JSON array dataset')
+    unpack_parser.add_argument('source')
+    unpack_parser.add_argument('output')
+    args = parser.parse_args()
+
+    convert = pack_file if args.command == 'pack' else unpack_file
+    count = convert(args.source, args.output)
+    print(f"Wrote {count} games to {args.output} "
+          f"({os.path.getsize(args.source) / 1e6:.1f} MB -> {os.path.getsize(args.output) / 1e6:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
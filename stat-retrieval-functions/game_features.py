@@ -0,0 +1,388 @@
+"""Feature extraction shared by training (create_model.py) and prediction (frontend/generate_predictions.py).
+
+The column layout is compiled once into a FeatureLayout and every game is written straight
+into a preallocated NumPy matrix. Columns, in order (see feature_names.txt):
+
+* 8 game columns: season, week, FBS flags and poll votes
+* 58 recruiting scores, one per roster slot (home then away, QB/RBs/WRs/Defenders/OLs)
+* 8 recruiting aggregates per team (average, blue chip, 3-star and any-star ratios)
+* one block of team stats and per-slot player stats for each of the 10 periods
+  (the 5 HomeStats periods followed by the 5 AwayStats periods)
+
+A layout built with ``columns`` (see feature_selection.py) keeps only those columns: its
+matrices are that narrow, and period blocks, player groups and slots without a kept column
+are never read from the games. The raw recruiting scores are still extracted for every game,
+since the recruiting aggregates are computed from all of them.
+"""
+import hashlib
+import json
+from itertools import chain
+from operator import itemgetter
+
+import numpy as np
+
+
+TEAM_STATS_FIELDS = ['win_percentage', 'strength_of_record', 'points_per_game', 'points_allowed_per_game',
+                     'total_YPG', 'turnovers_per_game', 'penalties_per_game', '3rd_down_eff',
+                     'redzone_eff', 'sacks_per_game', 'interceptions_per_game', 'forced_fumbles_per_game',
+                     'yards_per_play', 'yards_allowed_per_game', 'yards_allowed_per_play', 'FBS_opponent_ratio']
+
+PLAYER_ROLES = ['QB', 'RBs', 'WRs/TEs', 'Defenders']
+
+QB_STATS_FIELDS = ['fumbles_per_game', 'period_completed', 'completion_percentage', 'passing_yards_per_game',
+                   'TD_INT_ratio', 'QBR', 'rushing_yards', 'rushing_touchdowns', 'passing_touchdowns']
+
+SKILL_POSITION_STAT_FIELDS = ['fumbles_per_game', 'period_completed', 'rushing_yards_per_game',
+                              'rushing_yards_per_carry',
+                              'rushing_touchdowns_per_game', 'receiving_touchdowns_per_game', 'receptions_per_game',
+                              'receiving_yards_per_game', 'receiving_yards_per_catch']
+
+DEFENDER_STAT_FIELDS = ['fumbles_per_game', 'period_completed', 'tackles_per_game', 'sacks_per_game',
+                        'interceptions_per_game', 'forced_fumbles_per_game', 'passes_defended_per_game']
+
+ROLE_STAT_FIELDS = {
+    'QB': QB_STATS_FIELDS,
+    'RBs': SKILL_POSITION_STAT_FIELDS,
+    'WRs/TEs': SKILL_POSITION_STAT_FIELDS,
+    'Defenders': DEFENDER_STAT_FIELDS,
+}
+
+MAX_PLAYERS = {'QB': 1, 'RBs': 4, 'WRs/TEs': 7, 'Defenders': 12, 'OLs': 5}
+
+# Every game must have at least one player in each of these groups in every period
+REQUIRED_ROLES = ['QB', 'RBs', 'WRs/TEs', 'OLs']
+
+N_GAME_COLUMNS = 8
+N_PERIODS = 10  # 5 HomeStats periods followed by 5 AwayStats periods
+
+# Column names as written in feature_names.txt; check_feature_names() compares the file against names()
+GAME_COLUMN_NAMES = ['Season', 'Week', 'Home Team Division', 'Away Team Division', 'Home Team AP Votes',
+                     'Away Team AP Votes', 'Home Team FCS Votes', 'Away Team FCS Votes']
+RECRUITING_AGGREGATE_NAMES = ['Average Recruiting Score', 'Blue Chip Ratio', '3-Star Ratio', 'Any-Star Ratio']
+SLOT_NAMES = {'QB': 'QB', 'RBs': 'RB{}', 'WRs/TEs': 'WR{}', 'Defenders': 'Defender {}', 'OLs': 'OL{}'}
+PERIOD_NAMES = {
+    'Home': ['Season', 'Last 3 Games', 'Last 3 Home Games', 'Last Season', 'Home Games this Season'],
+    'Away': ['Season', 'Last 3 Games', 'Last 3 Away Games', 'Last Season', 'Away Games this Season'],
+}
+FIELD_NAMES = {
+    'win_percentage': 'Win Percentage', 'strength_of_record': 'Strength of Record',
+    'points_per_game': 'Points per Game', 'points_allowed_per_game': 'Points Allowed per Game',
+    'total_YPG': 'Total Yards Per Game', 'turnovers_per_game': 'Turnovers per Game',
+    'penalties_per_game': 'Penalties per Game', '3rd_down_eff': '3rd Down Efficiency',
+    'redzone_eff': 'Redzone Efficiency', 'sacks_per_game': 'Sacks per Game',
+    'interceptions_per_game': 'Interceptions per Game', 'forced_fumbles_per_game': 'Forced Fumbles per Game',
+    'yards_per_play': 'Yards per Play', 'yards_allowed_per_game': 'Yards Allowed per Game',
+    'yards_allowed_per_play': 'Yards Allowed per Play', 'FBS_opponent_ratio': 'FBS Opponent Ratio',
+    'fumbles_per_game': 'Fumbles per Game', 'period_completed': 'Period Completed',
+    'completion_percentage': 'Completion Percentage', 'passing_yards_per_game': 'Passing Yards per Game',
+    'TD_INT_ratio': 'TD/INT Ratio', 'QBR': 'QBR', 'rushing_yards': 'Rushing Yards',
+    'rushing_touchdowns': 'Rushing Touchdowns', 'passing_touchdowns': 'Passing Touchdowns',
+    'rushing_yards_per_game': 'Rushing Yards per Game', 'rushing_yards_per_carry': 'Rushing Yards per Carry',
+    'rushing_touchdowns_per_game': 'Rushing Touchdowns per Game',
+    'receiving_touchdowns_per_game': 'Receiving Touchdowns per Game', 'receptions_per_game': 'Receptions per Game',
+    'receiving_yards_per_game': 'Receiving Yards per Game', 'receiving_yards_per_catch': 'Receiving Yards per Catch',
+    'tackles_per_game': 'Tackles per Game', 'passes_defended_per_game': 'Passes Defended per Game',
+}
+
+BLUE_CHIP_THRESHOLD = 0.9
+THREE_STAR_THRESHOLD = 0.8
+ANY_STAR_THRESHOLD = 0.1
+
+
+class RoleLayout:
+    def __init__(self, role, fields, max_players):
+        self.role = role
+        self.fields = fields
+        self.max_players = max_players
+        self.getter = itemgetter(*fields)
+        # Zero padding for 0..max_players missing slots
+        self.padding = [[0.0] * (len(fields) * missing) for missing in range(max_players + 1)]
+
+    def values(self, players):
+        """Raw stats for the first max_players players, zero-filled to a fixed width."""
+        values = []
+        self.extend_values(values, players)
+        return values
+
+    def extend_values(self, values, players):
+        # period_completed is left as stored ("True"/"False"); FeatureLayout converts it afterwards
+        players = players[:self.max_players]
+        start = len(values)
+        try:
+            values.extend(chain.from_iterable(map(self.getter, players)))
+        except KeyError:
+            # Some player is missing a stat; redo this group with defaults
+            del values[start:]
+            values.extend(player.get(field, 0) for player in players for field in self.fields)
+        missing = self.max_players - len(players)
+        if missing:
+            values.extend(self.padding[missing])
+
+
+class FeatureLayout:
+    """Column positions for one game row, compiled once from the field lists above.
+
+    ``columns`` optionally selects the feature columns to keep, as indices into the full layout.
+    """
+
+    def __init__(self, columns=None):
+        self.roles = [RoleLayout(role, ROLE_STAT_FIELDS[role], MAX_PLAYERS[role]) for role in PLAYER_ROLES]
+        self.team_getter = itemgetter(*TEAM_STATS_FIELDS)
+
+        self.recruiting_slots = sum(MAX_PLAYERS.values())
+        self.recruiting_start = N_GAME_COLUMNS
+        self.aggregates_start = self.recruiting_start + 2 * self.recruiting_slots
+        self.periods_start = self.aggregates_start + 8
+        self.period_width = len(TEAM_STATS_FIELDS) + sum(len(role.fields) * role.max_players for role in self.roles)
+        self.n_all_features = self.periods_start + N_PERIODS * self.period_width
+
+        self.columns = None
+        if columns is not None:
+            self.columns = np.unique(np.asarray(columns, dtype=np.intp))
+            if self.columns.size == 0 or self.columns[0] < 0 or self.columns[-1] >= self.n_all_features:
+                raise ValueError(f"Selected columns must be between 0 and {self.n_all_features - 1}")
+        self.n_features = self.n_all_features if self.columns is None else len(self.columns)
+        self._compile_period_plan()
+
+    def _compile_period_plan(self):
+        """Decide which team blocks and player slots period_values reads, and where their values go.
+
+        Sets ``period_plan`` to one (read team stats?, [(RoleLayout, slots)]) entry per period and
+        ``period_columns`` to the full-layout column of every value period_values returns.
+        """
+        kept = None if self.columns is None else set(self.columns.tolist())
+        self.period_plan = []
+        period_columns = []
+        completed_positions = []
+        role_layouts = {}
+        for period in range(N_PERIODS):
+            offset = self.periods_start + period * self.period_width
+            team_columns = list(range(offset, offset + len(TEAM_STATS_FIELDS)))
+            read_team = kept is None or not kept.isdisjoint(team_columns)
+            if read_team:
+                period_columns.extend(team_columns)
+            offset += len(TEAM_STATS_FIELDS)
+
+            roles = []
+            for role in self.roles:
+                width = len(role.fields)
+                slots = role.max_players
+                if kept is not None:
+                    # Read players up to the last slot that has a kept column
+                    used = [slot for slot in range(role.max_players)
+                            if not kept.isdisjoint(range(offset + slot * width, offset + (slot + 1) * width))]
+                    slots = used[-1] + 1 if used else 0
+                if slots:
+                    if (role.role, slots) not in role_layouts:
+                        role_layouts[(role.role, slots)] = (role if slots == role.max_players
+                                                            else RoleLayout(role.role, role.fields, slots))
+                    roles.append((role_layouts[(role.role, slots)], slots))
+                    completed_index = role.fields.index('period_completed')
+                    for slot in range(slots):
+                        completed_positions.append(len(period_columns) + slot * width + completed_index)
+                    period_columns.extend(range(offset, offset + slots * width))
+                offset += role.max_players * width
+            self.period_plan.append((read_team, [role for role, _ in roles]))
+
+        self.period_columns = np.asarray(period_columns, dtype=np.intp)
+        # Positions of every period_completed value within period_values' output
+        self.period_completed_offsets = completed_positions
+
+        if self.columns is not None:
+            # Values are gathered into a scratch row of the game columns, the recruiting columns and the
+            # period values, in that order; take maps each selected column to its place in that row
+            scratch_columns = np.concatenate([np.arange(self.periods_start), self.period_columns])
+            order = np.argsort(scratch_columns, kind='stable')
+            self.take = order[np.searchsorted(scratch_columns, self.columns, sorter=order)]
+            self.scratch_width = len(scratch_columns)
+
+    def select(self, columns):
+        """A layout keeping only ``columns`` of this (full) layout."""
+        if self.columns is not None:
+            columns = self.columns[np.asarray(columns, dtype=np.intp)]
+        return FeatureLayout(columns)
+
+    def names(self):
+        """Name of every column of the full layout, in order, matching feature_names.txt."""
+        names = list(GAME_COLUMN_NAMES)
+        for side in ('Home', 'Away'):
+            names.extend(f"{side} Team {SLOT_NAMES[position].format(slot)} Recruiting Score"
+                         for position, max_count in MAX_PLAYERS.items() for slot in range(1, max_count + 1))
+        for side in ('Home', 'Away'):
+            names.extend(f"{side} Team {name}" for name in RECRUITING_AGGREGATE_NAMES)
+        for side in ('Home', 'Away'):
+            for period in PERIOD_NAMES[side]:
+                names.extend(f"{side} Team {FIELD_NAMES[field]} ({period})" for field in TEAM_STATS_FIELDS)
+                for role in self.roles:
+                    for slot in range(1, role.max_players + 1):
+                        player = f"{side} Team {SLOT_NAMES[role.role].format(slot)}"
+                        names.extend(f"{player} {FIELD_NAMES[field]} ({period})" for field in role.fields)
+        return names
+
+    def select_names(self, names):
+        """The names of the kept columns, given the names of every column in the full layout."""
+        return list(names) if self.columns is None else [names[column] for column in self.columns]
+
+    def schema(self):
+        schema = {
+            'team_stats_fields': TEAM_STATS_FIELDS,
+            'role_stat_fields': ROLE_STAT_FIELDS,
+            'max_players': MAX_PLAYERS,
+            'n_periods': N_PERIODS,
+            'n_features': self.n_all_features,
+        }
+        if self.columns is not None:
+            schema['columns'] = self.columns.tolist()
+        return schema
+
+    def schema_hash(self):
+        payload = json.dumps(self.schema(), sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def period_values(self, periods):
+        """Team and player stats for all periods as one flat list, in column order.
+
+        With selected columns only the blocks in ``period_plan`` are read; ``period_columns``
+        says which column each value belongs to.
+        """
+        values = []
+        for period_stats, (read_team, roles) in zip(periods, self.period_plan):
+            if read_team:
+                try:
+                    values.extend(self.team_getter(period_stats))
+                except KeyError:
+                    values.extend(period_stats.get(field, 0) for field in TEAM_STATS_FIELDS)
+            for role in roles:
+                role.extend_values(values, period_stats.get(role.role, ()))
+        # period_completed is stored as the string "True"/"False"
+        for offset in self.period_completed_offsets:
+            values[offset] = values[offset] == "True"
+        return values
+
+    def recruiting_scores(self, period_stats):
+        scores = []
+        for position, max_count in MAX_PLAYERS.items():
+            players = period_stats.get(position, [])[:max_count]
+            scores.extend(player.get('recruiting_score', 0) for player in players)
+            scores.extend([0.0] * (max_count - len(players)))
+        return scores
+
+
+LAYOUT = FeatureLayout()
+
+
+def check_feature_names(filename='feature_names.txt', layout=LAYOUT):
+    """Raise unless feature_names.txt names the layout's columns, in order; returns the names of the kept columns."""
+    with open(filename, 'r') as file:
+        names = [line.strip() for line in file if line.strip()]
+    expected = layout.names()
+    if len(names) != len(expected):
+        raise ValueError(f"{filename} lists {len(names)} features but the layout has {len(expected)}")
+    for column, (name, expected_name) in enumerate(zip(names, expected)):
+        if name != expected_name:
+            raise ValueError(f"{filename} names column {column} {name!r} but the layout has {expected_name!r}")
+    return layout.select_names(names)
+
+
+def in_season_range(season, pre_2023_period):
+    """pre_2023_period: True for seasons before 2023, False for 2023 onwards, None for every season."""
+    if pre_2023_period is None:
+        return True
+    return int(season) < 2023 if pre_2023_period else int(season) >= 2023
+
+
+def has_required_players(periods):
+    return not any(len(period.get(role, [])) == 0 for role in REQUIRED_ROLES for period in periods)
+
+
+def extract_features(games, pre_2023_period=None, layout=LAYOUT):
+    """Feature matrix, labels and GameIDs for every game that passes the checks.
+
+    Returns (X, y, game_ids) where row i of X and y belongs to game_ids[i].
+    """
+    games = games if isinstance(games, list) else list(games)
+    X = np.zeros((len(games), layout.n_features), dtype=float)
+    y = np.zeros((len(games), 3), dtype=float)
+    game_ids = []
+    selected = layout.columns is not None
+    if selected:
+        # Each game is gathered into a scratch row and only its selected columns are copied into X
+        scratch = np.zeros(layout.scratch_width, dtype=float)
+        recruiting = np.zeros((len(games), layout.aggregates_start - layout.recruiting_start), dtype=float)
+
+    rows = 0
+    for game in games:
+        if not in_season_range(game['Season'], pre_2023_period):
+            continue
+        periods = game['HomeStats'] + game['AwayStats']
+        if len(periods) != N_PERIODS or not has_required_players(periods):
+            continue
+
+        row = scratch if selected else X[rows]
+        row[:N_GAME_COLUMNS] = (
+            float(game['Season']) - 2014.0,
+            float(game['Week']),
+            game['HomeStats'][0]['division'] == "FBS",
+            game['AwayStats'][0]['division'] == "FBS",
+            float(game['HomeAPVotes']),
+            float(game['AwayAPVotes']),
+            float(game['HomeFCSVotes']),
+            float(game['AwayFCSVotes']),
+        )
+        row[layout.recruiting_start:layout.aggregates_start] = (
+            layout.recruiting_scores(game['HomeStats'][0]) + layout.recruiting_scores(game['AwayStats'][0]))
+
+        row[layout.periods_start:] = layout.period_values(periods)
+        if selected:
+            X[rows] = scratch[layout.take]
+            recruiting[rows] = scratch[layout.recruiting_start:layout.aggregates_start]
+
+        home_points = float(game['HomePoints'])
+        away_points = float(game['AwayPoints'])
+        y[rows] = (home_points, away_points, 1.0 if home_points > away_points else 0.0)
+        game_ids.append(game['GameID'])
+        rows += 1
+
+    X = X[:rows]
+    y = y[:rows]
+    if selected:
+        fill_selected_aggregates(X, recruiting[:rows], layout)
+    else:
+        fill_recruiting_aggregates(X, layout)
+    return X, y, game_ids
+
+
+def recruiting_aggregates(recruiting, slots):
+    """Team-wide recruiting average and star ratios for home then away, from both teams' raw scores."""
+    aggregates = np.zeros((recruiting.shape[0], 8))
+    for team in range(2):
+        scores = recruiting[:, team * slots:(team + 1) * slots]
+        # Summing column by column keeps the same addition order as a per-row Python sum
+        total = np.zeros(recruiting.shape[0])
+        for column in range(slots):
+            total += scores[:, column]
+        aggregates[:, 4 * team] = total / slots
+        aggregates[:, 4 * team + 1] = np.count_nonzero(scores > BLUE_CHIP_THRESHOLD, axis=1) / slots
+        aggregates[:, 4 * team + 2] = np.count_nonzero(scores > THREE_STAR_THRESHOLD, axis=1) / slots
+        aggregates[:, 4 * team + 3] = np.count_nonzero(scores > ANY_STAR_THRESHOLD, axis=1) / slots
+    return aggregates
+
+
+def fill_recruiting_aggregates(X, layout=LAYOUT):
+    """Team-wide recruiting average and star ratios, computed for all rows at once."""
+    X[:, layout.aggregates_start:layout.periods_start] = recruiting_aggregates(
+        X[:, layout.recruiting_start:layout.aggregates_start], layout.recruiting_slots)
+
+
+def fill_selected_aggregates(X, recruiting, layout):
+    """Write the selected aggregate columns of a selected-columns matrix."""
+    positions = np.flatnonzero((layout.columns >= layout.aggregates_start) & (layout.columns < layout.periods_start))
+    if positions.size:
+        aggregates = recruiting_aggregates(recruiting, layout.recruiting_slots)
+        X[:, positions] = aggregates[:, layout.columns[positions] - layout.aggregates_start]
+
+
+def preprocess_data(games, pre_2023_period=True):
+    X, y, _ = extract_features(games, pre_2023_period)
+    print(f"{X.shape[0]} games passed the checks and were processed.")
+    return X, y
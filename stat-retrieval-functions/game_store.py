@@ -0,0 +1,202 @@
+"""Append-only store for ingested game records.
+
+Games are kept one JSON object per line in ``<name>.jsonl`` next to a GameID index
+``<name>.idx`` (one id per line), so checking for a duplicate never means re-reading
+the games. Every append is flushed and fsync'd before its id reaches the index. If
+the process dies mid-write, the torn last line is dropped the next time the store
+is opened and the index is rebuilt from whatever games made it to disk. The index
+is also rebuilt when it does not hold one complete line per game, which catches a
+crash between the two writes and a torn index line.
+
+The trainer still consumes a single JSON array; ``export`` merges the store into that
+shape:
+
+    python game_store.py export --base full_game_stats_for_dnn.json --output full_game_stats_for_dnn.json
+    python game_store.py compact
+"""
+import argparse
+import json
+import os
+
+
+class GameStore:
+    def __init__(self, path='game_stats_for_dnn.jsonl'):
+        self.path = path
+        self.index_path = os.path.splitext(path)[0] + '.idx'
+        self._repair_tail()
+        self.game_ids = self._load_index()
+
+    def __contains__(self, game_id):
+        return game_id in self.game_ids
+
+    def __len__(self):
+        return len(self.game_ids)
+
+    def _repair_tail(self):
+        """Drop a partially written last line left behind by a crash."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b'\n':
+                return
+            # Walk back to the end of the last complete line
+            position = size - 1
+            while position > 0:
+                step = min(65536, position)
+                f.seek(position - step)
+                chunk = f.read(step)
+                newline = chunk.rfind(b'\n')
+                if newline != -1:
+                    position = position - step + newline + 1
+                    break
+                position -= step
+            f.truncate(position)
+        # The index may reference the game we just dropped
+        self.rebuild_index()
+
+    def _load_index(self):
+        if os.path.exists(self.path) and not self._index_consistent():
+            self.rebuild_index()
+        if not os.path.exists(self.index_path):
+            return set()
+        with open(self.index_path, 'r') as f:
+            return {line.strip() for line in f if line.strip()}
+
+    def _index_consistent(self):
+        """True if the index exists, ends in a complete line and has one line per stored game."""
+        if not os.path.exists(self.index_path):
+            return False
+        with open(self.index_path, 'rb') as f:
+            index_lines = [line for line in f if line.strip()]
+        if index_lines and not index_lines[-1].endswith(b'\n'):
+            return False
+        with open(self.path, 'rb') as f:
+            return len(index_lines) == sum(1 for line in f if line.strip())
+
+    def rebuild_index(self):
+        game_ids = [game['GameID'] for game in self.iter_games()]
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            f.writelines(game_id + '\n' for game_id in game_ids)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.index_path)
+        self.game_ids = set(game_ids)
+
+    def append(self, game):
+        """Store a game unless its GameID is already present. Returns True if it was written."""
+        if game['GameID'] in self.game_ids:
+            return False
+
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(game, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+        with open(self.index_path, 'a') as f:
+            f.write(game['GameID'] + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.game_ids.add(game['GameID'])
+        return True
+
+    def iter_games(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def compact(self):
+        """Rewrite the store keeping the first copy of each game, then rebuild the index."""
+        seen = set()
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            for game in self.iter_games():
+                if game['GameID'] in seen:
+                    continue
+                seen.add(game['GameID'])
+                f.write(json.dumps(game, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self.rebuild_index()
+
+
+def load_game_ids(filename):
+    """GameIDs present in a JSON array dataset such as full_game_stats_for_dnn.json."""
+    if not os.path.exists(filename):
+        return set()
+    with open(filename, 'r') as f:
+        try:
+            return {game['GameID'] for game in json.load(f)}
+        except json.JSONDecodeError:
+            return set()
+
+
+def export_dataset(store, output_path, base_paths=()):
+    """Write the games from ``base_paths`` followed by the store's new games as one JSON array.
+
+    The first occurrence of a GameID wins, so games already in a base dataset (for example
+    with poll votes attached) are kept as they are.
+    """
+    seen = set()
+    temp_path = output_path + '.tmp'
+    with open(temp_path, 'w') as f:
+        f.write('[\n')
+        first = True
+
+        def write_games(games):
+            nonlocal first
+            for game in games:
+                if game['GameID'] in seen:
+                    continue
+                seen.add(game['GameID'])
+                if not first:
+                    f.write(',\n')
+                f.write(json.dumps(game))
+                first = False
+
+        for base_path in base_paths:
+            if os.path.exists(base_path):
+                with open(base_path, 'r') as base_file:
+                    write_games(json.load(base_file))
+        write_games(store.iter_games())
+
+        f.write('\n]')
+    os.replace(temp_path, output_path)
+    return len(seen)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain the append-only game store.')
+    parser.add_argument('--store', default='game_stats_for_dnn.jsonl', help='Path of the JSONL game store')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='Merge the store into a JSON array dataset')
+    export_parser.add_argument('--base', action='append', default=[],
+                               help='Existing JSON array dataset to merge in first (repeatable)')
+    export_parser.add_argument('--output', default='full_game_stats_for_dnn.json', help='Output JSON array file')
+
+    subparsers.add_parser('compact', help='Drop duplicate games and rebuild the GameID index')
+
+    args = parser.parse_args()
+    store = GameStore(args.store)
+
+    if args.command == 'export':
+        count = export_dataset(store, args.output, args.base)
+        print(f"Exported {count} games to {args.output}")
+    elif args.command == 'compact':
+        store.compact()
+        print(f"Compacted {args.store}: {len(store)} games")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Incremental reading of the game-stats datasets.
+
+json.load on full_game_stats_for_dnn_polls.json keeps every game as Python dicts at once.
+iter_games instead decodes one game at a time from a JSON array file, a JSONL game store
+or a columnar .npz (game_columns.py), so only the games of the current chunk are ever held
+as dicts:
+
+    for chunk in iter_game_chunks(iter_games(path, seasons={2023}), 1000):
+        X, y, game_ids = extract_features(chunk)
+"""
+import json
+
+import numpy as np
+
+from game_columns import GameColumns
+from game_features import LAYOUT, extract_features
+
+
+READ_SIZE = 1 << 20
+
+
+def iter_games(path, seasons=None, weeks=None):
+    """Yield the games in ``path`` one at a time, optionally only those in the given seasons/weeks."""
+    if path.endswith('.npz'):
+        # Columnar files (see game_columns.py) filter on their season/week arrays before building any dicts
+        columns = GameColumns.load(path)
+        yield from columns.iter_games(columns.rows(seasons, weeks))
+        return
+    games = _iter_json_lines(path) if path.endswith('.jsonl') else _iter_json_array(path)
+    seasons = {int(season) for season in seasons} if seasons is not None else None
+    weeks = {int(week) for week in weeks} if weeks is not None else None
+    for game in games:
+        if seasons is not None and int(game['Season']) not in seasons:
+            continue
+        if weeks is not None and int(game['Week']) not in weeks:
+            continue
+        yield game
+
+
+def _iter_json_lines(path):
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _iter_json_array(path):
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buffer = f.read(READ_SIZE)
+        position = _skip_whitespace(buffer, 0)
+        if position >= len(buffer) or buffer[position] != '[':
+            raise ValueError(f"{path} does not contain a JSON array")
+        position += 1
+        end_of_file = False
+
+        while True:
+            position = _skip_whitespace(buffer, position)
+            if position < len(buffer) and buffer[position] == ',':
+                position = _skip_whitespace(buffer, position + 1)
+            if position < len(buffer) and buffer[position] == ']':
+                return
+
+            try:
+                game, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The next game is only partly in the buffer; read more and try again.
+                # Reading at least as much as is already buffered keeps retries logarithmic in game size.
+                if end_of_file:
+                    raise
+                chunk = f.read(max(READ_SIZE, len(buffer) - position))
+                end_of_file = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+
+            yield game
+
+            # Drop what has been decoded so the buffer never grows past a few games
+            if position > READ_SIZE:
+                buffer = buffer[position:]
+                position = 0
+
+
+def _skip_whitespace(buffer, position):
+    while position < len(buffer) and buffer[position] in ' \t\r\n':
+        position += 1
+    return position
+
+
+def iter_game_chunks(games, chunk_size=1000):
+    chunk = []
+    for game in games:
+        chunk.append(game)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_feature_chunks(path, chunk_size=1000, pre_2023_period=None, seasons=None, weeks=None, layout=LAYOUT):
+    """Yield (X, y, game_ids) for successive chunks of at most ``chunk_size`` games."""
+    for chunk in iter_game_chunks(iter_games(path, seasons, weeks), chunk_size):
+        X, y, game_ids = extract_features(chunk, pre_2023_period, layout)
+        if len(game_ids):
+            yield X, y, game_ids
+
+
+def preprocess_file(path, pre_2023_period=True, chunk_size=1000, seasons=None, weeks=None, layout=LAYOUT):
+    """Same output as preprocess_data(json.load(path), pre_2023_period) without loading every game at once."""
+    X_chunks, y_chunks = [], []
+    for X, y, _ in iter_feature_chunks(path, chunk_size, pre_2023_period, seasons, weeks, layout):
+        X_chunks.append(X)
+        y_chunks.append(y)
+
+    X = np.concatenate(X_chunks) if X_chunks else np.zeros((0, layout.n_features))
+    y = np.concatenate(y_chunks) if y_chunks else np.zeros((0, 3))
+    print(f"{X.shape[0]} games passed the checks and were processed.")
+    return X, y
@@ -0,0 +1,281 @@
+"""Durable work queue of the games create-roster.py still has to ingest.
+
+The manifest is a small SQLite database with one row per scheduled game:
+
+* ``pending``  not attempted yet
+* ``running``  claimed by the current run
+* ``done``     stored in the game store
+* ``failed``   the last attempt hit a backend error (timeout, lost worker, failed query);
+  retried after an exponential backoff of ``base_delay * 2 ** (attempts - 1)`` seconds
+  (capped at ``max_delay``) until ``max_attempts`` attempts have been made
+* ``missing``  the backend had no stats for the game; retrying straight away would not help,
+  so it is attempted again on the next run instead
+
+Exhausted games get a fresh set of attempts whenever the schedule changes.
+
+Games are claimed in schedule order and every state change is committed immediately, so
+a run that dies loses nothing: the next one retries its ``running`` games straight away
+(or marks them done if they reached the game store before the crash) and carries on.
+The schedule is only re-read when the file changes, and the legacy JSON datasets are
+scanned once, when the manifest is first created, to mark the games they already hold as done.
+
+    python ingest_queue.py status
+    python ingest_queue.py failed
+    python ingest_queue.py retry            # give exhausted games a fresh set of attempts
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+MISSING = 'missing'
+STATES = (PENDING, RUNNING, DONE, FAILED, MISSING)
+
+
+def file_signature(path):
+    """Size and modification time, enough to tell whether a schedule file changed."""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class IngestQueue:
+    def __init__(self, path='ingest_queue.sqlite', max_attempts=5, base_delay=30, max_delay=3600):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS games (
+                game_id TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                game TEXT NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._connection.execute('CREATE INDEX IF NOT EXISTS games_state ON games (state, position)')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        self._connection.commit()
+
+    def _meta(self, key):
+        row = self._connection.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self._connection.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    @property
+    def seeded(self):
+        """True once the games ingested before the manifest existed have been recorded as done."""
+        with self._lock:
+            return self._meta('seeded') is not None
+
+    def mark_seeded(self):
+        with self._lock:
+            self._set_meta('seeded', str(time.time()))
+            self._connection.commit()
+
+    def sync_schedule(self, schedule_path, done_ids=(), force=False):
+        """Queue the schedule's games that are not in the manifest yet; skipped if the file is unchanged.
+
+        New games found in ``done_ids`` are recorded as done. Returns the number of games added.
+        """
+        signature = file_signature(schedule_path)
+        key = 'schedule:' + os.path.abspath(schedule_path)
+        with self._lock:
+            if not force and self._meta(key) == signature:
+                return 0
+        with open(schedule_path, 'r') as f:
+            schedule = json.load(f)
+        added = self.add_games(schedule, done_ids)
+        # A changed schedule may fix what made games fail, so give up on none of them yet
+        self.retry_exhausted()
+        with self._lock:
+            self._set_meta(key, signature)
+            self._connection.commit()
+        return added
+
+    def add_games(self, games, done_ids=()):
+        """Queue games (schedule entries). Games already in the manifest keep their state, but the
+        ones not done yet take the new entry, so e.g. scores filled in later reach the game records.
+
+        Returns the number of games that were not in the manifest yet.
+        """
+        now = time.time()
+        with self._lock:
+            start, before = self._connection.execute(
+                'SELECT COALESCE(MAX(position), -1) + 1, COUNT(*) FROM games').fetchone()
+            self._connection.executemany(
+                'INSERT INTO games (game_id, position, game, state, updated_at) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (game_id) DO UPDATE SET game = excluded.game, updated_at = excluded.updated_at '
+                'WHERE games.state != ? AND games.game != excluded.game',
+                ((game['GameID'], start + i, json.dumps(game), DONE if game['GameID'] in done_ids else PENDING, now,
+                  DONE) for i, game in enumerate(games)))
+            added = self._connection.execute('SELECT COUNT(*) FROM games').fetchone()[0] - before
+            self._connection.commit()
+        return added
+
+    def recover(self, stored_ids=()):
+        """Put games left running by a crashed run back in the queue as failed attempts.
+
+        Games that reached the store (``stored_ids``) before the crash are marked done instead.
+        Returns (requeued, completed).
+        """
+        now = time.time()
+        with self._lock:
+            running = [row[0] for row in
+                       self._connection.execute('SELECT game_id FROM games WHERE state = ?', (RUNNING,))]
+            completed = [game_id for game_id in running if game_id in stored_ids]
+            requeued = [game_id for game_id in running if game_id not in stored_ids]
+            self._connection.executemany(
+                'UPDATE games SET state = ?, last_error = NULL, updated_at = ? WHERE game_id = ?',
+                ((DONE, now, game_id) for game_id in completed))
+            # Due again straight away, but the interrupted attempt still counts, so a game that keeps
+            # killing the process runs out of attempts
+            self._connection.executemany(
+                'UPDATE games SET state = ?, last_error = ?, next_attempt_at = ?, updated_at = ? WHERE game_id = ?',
+                ((FAILED, 'Interrupted', now, now, game_id) for game_id in requeued))
+            self._connection.commit()
+        return len(requeued), len(completed)
+
+    def claim(self, now=None):
+        """Mark the next game that is due as running and return its schedule entry, or None."""
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT game_id, game FROM games '
+                'WHERE (state = ? OR state = ?) AND attempts < ? AND next_attempt_at <= ? '
+                'ORDER BY position LIMIT 1', (PENDING, FAILED, self.max_attempts, now)).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                'UPDATE games SET state = ?, attempts = attempts + 1, updated_at = ? WHERE game_id = ?',
+                (RUNNING, now, row[0]))
+            self._connection.commit()
+        return json.loads(row[1])
+
+    def next_retry_at(self):
+        """When the earliest failed game that still has attempts left becomes due, or None."""
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT MIN(next_attempt_at) FROM games WHERE state = ? AND attempts < ?',
+                (FAILED, self.max_attempts)).fetchone()
+        return row[0]
+
+    def iter_claims(self):
+        """Claim games until none are due."""
+        while True:
+            game = self.claim()
+            if game is None:
+                return
+            yield game
+
+    def complete(self, game_id):
+        with self._lock:
+            self._connection.execute('UPDATE games SET state = ?, last_error = NULL, updated_at = ? WHERE game_id = ?',
+                                     (DONE, time.time(), game_id))
+            self._connection.commit()
+
+    def fail(self, game_id, error):
+        """Record a failed attempt and schedule the retry. Returns the retry time, or None if out of attempts."""
+        now = time.time()
+        with self._lock:
+            attempts = self._connection.execute('SELECT attempts FROM games WHERE game_id = ?',
+                                                (game_id,)).fetchone()[0]
+            delay = min(self.max_delay, self.base_delay * 2 ** max(0, attempts - 1))
+            self._connection.execute(
+                'UPDATE games SET state = ?, last_error = ?, next_attempt_at = ?, updated_at = ? WHERE game_id = ?',
+                (FAILED, str(error), now + delay, now, game_id))
+            self._connection.commit()
+        return now + delay if attempts < self.max_attempts else None
+
+    def miss(self, game_id, error):
+        """Record that the backend had no stats for the game; it is attempted again by rearm_missing()."""
+        with self._lock:
+            self._connection.execute('UPDATE games SET state = ?, last_error = ?, updated_at = ? WHERE game_id = ?',
+                                     (MISSING, str(error), time.time(), game_id))
+            self._connection.commit()
+
+    def rearm_missing(self):
+        """Queue the games that had no stats again, as every run did before the queue existed."""
+        with self._lock:
+            before = self._connection.total_changes
+            self._connection.execute(
+                'UPDATE games SET state = ?, attempts = 0, next_attempt_at = 0, updated_at = ? WHERE state = ?',
+                (PENDING, time.time(), MISSING))
+            rearmed = self._connection.total_changes - before
+            self._connection.commit()
+        return rearmed
+
+    def retry_exhausted(self):
+        """Give failed games that ran out of attempts a fresh set. Returns how many were reset."""
+        with self._lock:
+            before = self._connection.total_changes
+            self._connection.execute(
+                'UPDATE games SET state = ?, attempts = 0, next_attempt_at = 0, updated_at = ? '
+                'WHERE state = ? AND attempts >= ?', (PENDING, time.time(), FAILED, self.max_attempts))
+            reset = self._connection.total_changes - before
+            self._connection.commit()
+        return reset
+
+    def failed_games(self):
+        """(game_id, state, attempts, last_error) of every failed or missing game, in schedule order."""
+        with self._lock:
+            return self._connection.execute(
+                'SELECT game_id, state, attempts, last_error FROM games WHERE state IN (?, ?) ORDER BY position',
+                (FAILED, MISSING)).fetchall()
+
+    def counts(self):
+        """Games per state, with failed split into 'failed' (will be retried) and 'exhausted'."""
+        counts = dict.fromkeys(STATES + ('exhausted',), 0)
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT state, attempts >= ?, COUNT(*) FROM games GROUP BY state, attempts >= ?',
+                (self.max_attempts, self.max_attempts)).fetchall()
+        for state, exhausted, count in rows:
+            counts['exhausted' if state == FAILED and exhausted else state] += count
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._connection.commit()
+            self._connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect and maintain the ingestion work queue.')
+    parser.add_argument('--queue', default='ingest_queue.sqlite', help='Path of the queue manifest')
+    parser.add_argument('--max-attempts', type=int, default=5, help='Attempts a game gets before it is given up on')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('status', help='Number of games in each state')
+    subparsers.add_parser('failed', help='List failed and missing games with their last error')
+    subparsers.add_parser('retry', help='Give games that ran out of attempts a fresh set')
+    args = parser.parse_args()
+
+    queue = IngestQueue(args.queue, max_attempts=args.max_attempts)
+    if args.command == 'status':
+        for state, count in queue.counts().items():
+            print(f"{state:<10} {count}")
+    elif args.command == 'failed':
+        for game_id, state, attempts, error in queue.failed_games():
+            print(f"{game_id}  {state}  attempts={attempts}  {error}")
+    elif args.command == 'retry':
+        print(f"Reset {queue.retry_exhausted()} games")
+    queue.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,7 @@ const { getStatsForPlayer, getInfoForPlayer, getStatsForTeam, getFBSFCSForTeam,
     getPlayerStats, getMatchupTeams
 } = require("./retrieve-statistics");
 const process = require("process"); // Adjust the path as necessary
+const readline = require("readline");
 
 async function getYardsPerCarry(playerId, year, week, period) {
     return getStatsForPlayer(playerId, year, week, period, ['RushingYards', 'RushingAttempts'])
@@ -486,7 +487,8 @@ async function getSORForTeam(teamId, year, week, period) {
         })
         .catch(error => {
             console.error('Error calculating SOR:', error);
-            return 0;
+            // null rather than 0, so the failure is not cached as a real strength of record
+            return null;
         });
 }
 
@@ -549,6 +551,82 @@ async function getMatchupInfo(gameID) {
     }
 }
 
+const awayPeriods = ['season', 'last3Games', 'last3GamesAway', 'lastSeason', 'seasonAway'];
+const homePeriods = ['season', 'last3Games', 'last3GamesHome', 'lastSeason', 'seasonHome'];
+
+// Key a caller uses to hand in a result it already has, e.g. from create-roster.py's stat cache
+function statCallKey(funcName, args) {
+    return [funcName, ...args].join('|');
+}
+
+async function resolveStat(known, fetched, funcName, ...args) {
+    const key = statCallKey(funcName, args);
+    if (Object.prototype.hasOwnProperty.call(known, key)) {
+        return known[key];
+    }
+    const startMs = performance.now();
+    const result = await statFunctions[funcName](...args);
+    // Report everything we had to query so the caller can cache it, with its timing for create-roster.py's trace
+    fetched.push({ func: funcName, args, result, startMs, durationMs: performance.now() - startMs });
+    return result;
+}
+
+async function getTeamPeriodStats(teamId, year, week, period, known, fetched) {
+    const teamStats = await resolveStat(known, fetched, 'getTeamStatsForPeriod', teamId, year, week, period);
+    // Strength of record is only looked up when the team has stats for the period
+    const strengthOfRecord = teamStats ? await resolveStat(known, fetched, 'getSORForTeam', teamId, year, week, period) : null;
+    const roster = await resolveStat(known, fetched, 'getTeamRosterForSeason', teamId, year, period);
+    const playerStats = await resolveStat(known, fetched, 'getPlayerStatsForPeriod', roster, year, week, period);
+    return { period, teamStats, strengthOfRecord, playerStats };
+}
+
+// Everything create-roster.py needs for one game (both teams, all ten periods) in a single call.
+// knownResults optionally maps statCallKey(...) to results the caller already has; those calls are skipped.
+async function getGameStats(gameID, knownResults) {
+    const known = typeof knownResults === 'string' ? JSON.parse(knownResults) : (knownResults || {});
+    const fetched = [];
+    const callStartMs = performance.now();
+
+    let matchupInfo;
+    const matchupKey = statCallKey('getMatchupInfo', [gameID]);
+    if (known[matchupKey]) {
+        matchupInfo = JSON.parse(known[matchupKey]);
+    } else {
+        const startMs = performance.now();
+        try {
+            matchupInfo = await getMatchupTeams(gameID);
+        } catch (error) {
+            // A game missing from the schedule is reported as no data, like getMatchupInfo, rather than as a
+            // backend error that create-roster.py would retry
+            if (error === 'No data found') {
+                return null;
+            }
+            throw error;
+        }
+        // Reported as the getMatchupInfo result it equals, so the caller can cache it for the next run
+        fetched.push({ func: 'getMatchupInfo', args: [gameID], result: JSON.stringify(matchupInfo), startMs,
+            durationMs: performance.now() - startMs });
+    }
+    const year = String(matchupInfo.Season);
+    const week = String(matchupInfo.Week);
+
+    const away = [];
+    for (const period of awayPeriods) {
+        away.push(await getTeamPeriodStats(matchupInfo.AwayTeamID, year, week, period, known, fetched));
+    }
+
+    const home = [];
+    for (const period of homePeriods) {
+        home.push(await getTeamPeriodStats(matchupInfo.HomeTeamID, year, week, period, known, fetched));
+    }
+
+    // Query start times are reported relative to the start of this call
+    for (const call of fetched) {
+        call.startMs -= callStartMs;
+    }
+    return { matchup: matchupInfo, home, away, fetched };
+}
+
 async function logStats() {
     let stat = await getPlayerStatsForPeriod(["8a9f69c8-954d-4f97-acd8-6b1db734b370","","4ccebbe3-60e5-4c12-b1c9-ed9aaed3131c","2dc8bd1b-6d0a-45c7-ae34-1f719ebb4ed1","dcb8b276-c202-401d-a77f-d418a6c9fd91","a0f5f3c8-7ee7-4aa3-882a-f826e7bb08eb","fdb835ad-1ffe-4e21-96eb-8f3a6b8b29aa","3df3b9b4-3ee8-4ad7-bf29-67ef11f81de4","3b1b3235-35b2-4f75-b73a-37c4077d67c9","11e84799-6c1f-4f1f-bb84-236220b11d73","e971beb8-c06d-452f-af09-6afbb5b69666","0460cca3-7a2f-47db-a841-b086d92369ce","33c9690c-9228-4cdb-a5c2-ac0d3b10e750","8013844d-a7d7-4820-888c-792e7c745325","1d0c1d7d-d87a-4b1f-a75a-706a1bdcc381","e750f539-d40d-4571-806a-ba35e12fd9f9","2cc3eeb8-4b8f-4e1c-aef4-f17eff5e2176","cc5e0f4c-b7d2-44e8-951e-bd6d98ffe016","17e84fbf-b67a-4826-ada6-5c6a7fed017f","9450489d-5e4d-4745-bdc6-7cc5d47f7a3f","bc0c5268-a42a-4994-aaf5-49f8938fc6e7","48d367c0-ed2f-40cc-88f1-ddaeecbae1e2","b5c1ba28-cf40-403a-bc54-768b918b5b2b","30fe07ec-7458-4107-b228-aea17902f1be","17936af5-4717-4f1c-a06d-e7f1f969c836","40eeb538-41e3-4fe3-ab4f-ea1e61f1fcb8","320a1942-e2f9-467f-986d-a2f00bae7a47","caa785d2-6e25-4082-96d1-6c4cee067856",""],
         2018, 9,'season')
@@ -557,6 +635,50 @@ async function logStats() {
 
 //logStats()
 
+// Functions callable from Python, either as a one-off CLI call or through the worker protocol
+const statFunctions = {
+    getYardsPerCarry,
+    getCompletionPercentage,
+    getPassingYardsPerGame,
+    getTDINTRatio,
+    getQBR,
+    getRushingYardsPerGame,
+    getRushingTDsPerGame,
+    getPassingTDsPerGame,
+    getFumblesPerGame,
+    getReceptionsPerGame,
+    getReceivingYardsPerGame,
+    getReceivingTDsPerGame,
+    getReceivingYardsPerCatch,
+    getTacklesPerGame,
+    getSacksPerGame,
+    getInterceptionsPerGame,
+    getPassesDefendedPerGame,
+    getForcedFumblesPerGame,
+    getRecruitingScore,
+    getTeamYardsPerPlay,
+    getTeamYardsPerGame,
+    getTeamTurnoversPerGame,
+    getTeamPenaltiesPerGame,
+    getTeamThirdDownSuccessRate,
+    getTeamRedZoneSuccessRate,
+    getTeamForcedFumblesPerGame,
+    getTeamSacksPerGame,
+    getTeamInterceptionsPerGame,
+    getTeamPointsPerGame,
+    getTeamOpponentPointsPerGame,
+    getTeamOpponentYardsPerGame,
+    getDivisionForTeam,
+    getFBSRatioForTeam,
+    getTeamWinPercentage,
+    getSORForTeam,
+    getTeamStatsForPeriod,
+    getPlayerStatsForPeriod,
+    getMatchupInfo,
+    getTeamRosterForSeason,
+    getGameStats
+};
+
 async function main() {
     const args = process.argv.slice(2); // Skip node and script path arguments
     if (args.length === 0) {
@@ -568,56 +690,12 @@ async function main() {
     const params = args.slice(1);
 
     try {
-        let result;
-
-        // Adding case for each function
-        switch (functionName) {
-            case 'getYardsPerCarry':
-            case 'getCompletionPercentage':
-            case 'getPassingYardsPerGame':
-            case 'getTDINTRatio':
-            case 'getQBR':
-            case 'getRushingYardsPerGame':
-            case 'getRushingTDsPerGame':
-            case 'getPassingTDsPerGame':
-            case 'getFumblesPerGame':
-            case 'getReceptionsPerGame':
-            case 'getReceivingYardsPerGame':
-            case 'getReceivingTDsPerGame':
-            case 'getReceivingYardsPerCatch':
-            case 'getTacklesPerGame':
-            case 'getSacksPerGame':
-            case 'getInterceptionsPerGame':
-            case 'getPassesDefendedPerGame':
-            case 'getForcedFumblesPerGame':
-            case 'getRecruitingScore':
-            case 'getTeamYardsPerPlay':
-            case 'getTeamYardsPerGame':
-            case 'getTeamTurnoversPerGame':
-            case 'getTeamPenaltiesPerGame':
-            case 'getTeamThirdDownSuccessRate':
-            case 'getTeamRedZoneSuccessRate':
-            case 'getTeamForcedFumblesPerGame':
-            case 'getTeamSacksPerGame':
-            case 'getTeamInterceptionsPerGame':
-            case 'getTeamPointsPerGame':
-            case 'getTeamOpponentPointsPerGame':
-            case 'getTeamOpponentYardsPerGame':
-            case 'getDivisionForTeam':
-            case 'getFBSRatioForTeam':
-            case 'getTeamWinPercentage':
-            case 'getSORForTeam':
-            case 'getTeamStatsForPeriod':
-            case 'getPlayerStatsForPeriod':
-            case 'getMatchupInfo':
-            case 'getTeamRosterForSeason':
-                // Assuming each function returns a promise and takes parameters as needed
-                result = await eval(functionName)(...params);
-                console.log(JSON.stringify(result));
-                break;
-            default:
-                throw new Error(`Function ${functionName} not recognized.`);
+        if (!Object.prototype.hasOwnProperty.call(statFunctions, functionName)) {
+            throw new Error(`Function ${functionName} not recognized.`);
         }
+        // Each function returns a promise and takes its parameters as strings
+        const result = await statFunctions[functionName](...params);
+        console.log(JSON.stringify(result));
         process.exit(0); // Exit successfully
     } catch (error) {
         console.error('Error:', error.message);
@@ -625,4 +703,59 @@ async function main() {
     }
 }
 
-main();
\ No newline at end of file
+function writeWorkerResponse(response) {
+    process.stdout.write(JSON.stringify(response) + '\n');
+}
+
+async function handleWorkerRequest(line) {
+    let request;
+    try {
+        request = JSON.parse(line);
+    } catch (error) {
+        writeWorkerResponse({ id: null, error: `Invalid request: ${error.message}` });
+        return;
+    }
+
+    if (!Object.prototype.hasOwnProperty.call(statFunctions, request.func)) {
+        writeWorkerResponse({ id: request.id, error: `Function ${request.func} not recognized.` });
+        return;
+    }
+
+    try {
+        const result = await statFunctions[request.func](...(request.args || []));
+        writeWorkerResponse({ id: request.id, result: result === undefined ? null : result });
+    } catch (error) {
+        writeWorkerResponse({ id: request.id, error: error && error.message ? error.message : String(error) });
+    }
+}
+
+// Long-lived mode used by stat_worker.py: one JSON request per stdin line, one JSON response per stdout line.
+// The database connection from databaseConnection.js is opened once and reused for every request.
+function runWorker() {
+    // stdout carries the response stream, so all diagnostic logging goes to stderr
+    console.log = console.error;
+
+    // tedious can only run one request per connection at a time, so requests are handled in arrival order
+    let pending = Promise.resolve();
+    const lines = readline.createInterface({ input: process.stdin, terminal: false });
+
+    lines.on('line', line => {
+        if (line.trim() === '') {
+            return;
+        }
+        pending = pending.then(() => handleWorkerRequest(line));
+    });
+
+    lines.on('close', () => {
+        pending.then(() => {
+            connection.close();
+            process.exit(0);
+        });
+    });
+}
+
+if (process.argv[2] === '--worker') {
+    runWorker();
+} else {
+    main();
+}
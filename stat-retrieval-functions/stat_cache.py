@@ -0,0 +1,196 @@
+"""Persistent SQLite cache for stat-backend results.
+
+Entries are keyed by a hash of the function name and its arguments. Whether an entry
+may live forever depends on the season/week it describes:
+
+* weeks that are already complete never change, so their results are kept until evicted
+* the week in progress (or anything later) may still change and expires after ``live_ttl`` seconds
+
+``current_season`` defaults to the season in progress (seasons start in August). Without a
+``current_week`` every week of the current season is treated as in progress.
+
+The cache is bounded by ``max_entries``; the least recently used entries are evicted first.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from datetime import date
+
+
+# Position of the season and week arguments for the functions whose results depend on them
+SEASON_WEEK_ARGS = {
+    'getTeamStatsForPeriod': (1, 2),
+    'getSORForTeam': (1, 2),
+    'getPlayerStatsForPeriod': (1, 2),
+    'getTeamRosterForSeason': (1, None),
+}
+
+# Results that depend only on the game and never change once it is scheduled
+GAME_FUNCTIONS = {'getMatchupInfo'}
+
+# Periods whose team stats cover the whole previous season, so the week argument does not matter
+WEEK_INDEPENDENT_TEAM_PERIODS = {'lastSeason', 'lastSeasonHome', 'lastSeasonAway'}
+
+
+def is_cacheable(func_name):
+    return func_name in SEASON_WEEK_ARGS or func_name in GAME_FUNCTIONS
+
+
+def default_current_season(today=None):
+    today = today or date.today()
+    return today.year if today.month >= 8 else today.year - 1
+
+
+def normalize_args(func_name, args):
+    """Drop arguments that do not affect the result so equivalent calls share an entry."""
+    args = list(args)
+    if func_name == 'getTeamStatsForPeriod' and len(args) > 3 and args[3] in WEEK_INDEPENDENT_TEAM_PERIODS:
+        args[2] = None
+    return args
+
+
+def cache_key(func_name, args):
+    payload = json.dumps([func_name, normalize_args(func_name, args)], separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def season_and_week(func_name, args):
+    """The (season, week) a call describes, or (None, None) if it is not tied to one."""
+    positions = SEASON_WEEK_ARGS.get(func_name)
+    if positions is None:
+        return None, None
+    season_position, week_position = positions
+    season = _to_int(args[season_position]) if season_position < len(args) else None
+    week = _to_int(args[week_position]) if week_position is not None and week_position < len(args) else None
+    if func_name == 'getTeamStatsForPeriod' and len(args) > 3 and args[3] in WEEK_INDEPENDENT_TEAM_PERIODS:
+        # Describes the whole previous season, which is complete as soon as the next one starts
+        return (season - 1 if season is not None else None), None
+    return season, week
+
+
+def should_cache(func_name, result):
+    # Failed lookups (including getSORForTeam) come back as null, and a failed roster lookup as an empty list
+    if result is None:
+        return False
+    return not (func_name == 'getTeamRosterForSeason' and result == '[]')
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class StatCache:
+    def __init__(self, path='stat_cache.sqlite', current_season=None, current_week=None,
+                 live_ttl=6 * 3600, max_entries=500000):
+        self.path = path
+        self.current_season = current_season if current_season is not None else default_current_season()
+        self.current_week = current_week
+        self.live_ttl = live_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._puts_since_evict = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                func_name TEXT NOT NULL,
+                season INTEGER,
+                week INTEGER,
+                value TEXT NOT NULL,
+                expires_at REAL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._connection.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS results_season_week ON results (season, week)')
+        self._connection.commit()
+
+    def is_completed(self, season, week):
+        """True if the season/week can no longer change."""
+        if season is None:
+            # Calls not tied to a season (e.g. matchup info) never change
+            return True
+        if season < self.current_season:
+            return True
+        if season > self.current_season or self.current_week is None:
+            return False
+        return week is not None and week < self.current_week
+
+    def get(self, func_name, args):
+        """Return (True, value) on a hit, (False, None) on a miss."""
+        key = cache_key(func_name, args)
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute('SELECT value, expires_at FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] < now):
+                self.misses += 1
+                return False, None
+            self._connection.execute('UPDATE results SET last_used = ? WHERE key = ?', (now, key))
+            self.hits += 1
+        return True, json.loads(row[0])
+
+    def put(self, func_name, args, value):
+        self.put_many([(func_name, args, value)])
+
+    def put_many(self, entries):
+        """Store several (func_name, args, value) results in one transaction."""
+        now = time.time()
+        rows = []
+        for func_name, args, value in entries:
+            season, week = season_and_week(func_name, args)
+            expires_at = None if self.is_completed(season, week) else now + self.live_ttl
+            rows.append((cache_key(func_name, args), func_name, season, week, json.dumps(value), expires_at, now))
+        with self._lock:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO results (key, func_name, season, week, value, expires_at, last_used) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            self._evict(len(rows))
+            self._connection.commit()
+
+    def _evict(self, inserted):
+        # Counting rows is a scan, so only check the bound every 1000 inserts
+        self._puts_since_evict += inserted
+        if self._puts_since_evict < 1000:
+            return
+        self._puts_since_evict = 0
+        count = self._connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        if count <= self.max_entries:
+            return
+        # Trim an extra 10% so we are not evicting on every insert once full
+        excess = count - int(self.max_entries * 0.9)
+        self._connection.execute(
+            'DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)', (excess,))
+
+    def invalidate(self, season, week=None):
+        """Drop cached results for a season, or for one week of it."""
+        with self._lock:
+            if week is None:
+                self._connection.execute('DELETE FROM results WHERE season = ?', (season,))
+            else:
+                self._connection.execute('DELETE FROM results WHERE season = ? AND week = ?', (season, week))
+            self._connection.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+            self._connection.commit()  # Persist last_used updates from reads
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0,
+            'entries': entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._connection.commit()
+            self._connection.close()
@@ -0,0 +1,254 @@
+"""Long-lived Node processes serving the functions in player-stat-functions.js.
+
+Starting ``node player-stat-functions.js <function> ...`` for every stat call pays
+Node startup, module loading and a fresh database handshake each time. A StatWorker
+keeps one ``player-stat-functions.js --worker`` process alive and talks to it with
+newline-delimited JSON, so the database connection is reused across calls:
+
+    request:  {"id": 1, "func": "getTeamStatsForPeriod", "args": ["<teamID>", "2019", "5", "season"]}
+    response: {"id": 1, "result": {...}}   or   {"id": 1, "error": "..."}
+
+Every call can carry a deadline. A worker that misses it is killed (a hung query would
+otherwise block it for as long as the database driver's own timeout) and respawned by the
+next call. Failures are raised as StatWorkerError subclasses, and those marked ``retryable``
+are retried a bounded number of times by StatWorkerPool.call(). For idempotent reads the
+pool can also hedge: when a call is still running after the p95 (by default) of that
+function's recent latencies, a duplicate goes to an idle worker and whichever answers
+first wins.
+"""
+import itertools
+import json
+import queue
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+
+from tracing import percentile
+
+
+class StatWorkerError(Exception):
+    """Raised when a worker cannot answer a request."""
+    retryable = False
+
+
+class StatWorkerTimeout(StatWorkerError):
+    """The request missed its deadline; the worker was killed and the next call respawns it."""
+    retryable = True
+
+
+class StatWorkerCrash(StatWorkerError):
+    """The worker died or its output got out of step with the requests."""
+    retryable = True
+
+
+class StatBackendError(StatWorkerError):
+    """The backend function itself reported an error."""
+
+
+def call_with_retries(attempt, retries=0, backoff=0.1):
+    """Run ``attempt()``, retrying retryable StatWorkerErrors up to ``retries`` times with exponential backoff."""
+    for retry in itertools.count():
+        try:
+            return attempt()
+        except StatWorkerError as e:
+            if not e.retryable or retry >= retries:
+                raise
+        time.sleep(backoff * 2 ** retry)
+
+
+class StatWorker:
+    def __init__(self, script='player-stat-functions.js', node='node', stderr=subprocess.DEVNULL):
+        self.command = [node, script, '--worker']
+        self.stderr = stderr
+        self.process = None
+        self._responses = None
+        self._request_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Spawn the Node process if it is not already running."""
+        if self.process is None or self.process.poll() is not None:
+            self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                            stderr=self.stderr, text=True, bufsize=1)
+            # Responses are read on a thread of their own so a call can stop waiting at its deadline
+            self._responses = queue.Queue()
+            threading.Thread(target=self._read_responses, args=(self.process.stdout, self._responses),
+                             daemon=True).start()
+
+    @staticmethod
+    def _read_responses(stdout, responses):
+        try:
+            for line in stdout:
+                responses.put(line)
+        except (OSError, ValueError):
+            pass
+        responses.put(None)
+
+    def call(self, func_name, *args, timeout=None):
+        """Call a backend function, waiting at most ``timeout`` seconds (None waits forever)."""
+        with self._lock:
+            self.start()
+            request_id = next(self._request_ids)
+            request = json.dumps({'id': request_id, 'func': func_name, 'args': list(args)})
+
+            try:
+                self.process.stdin.write(request + '\n')
+                self.process.stdin.flush()
+            except OSError as e:
+                self._discard()
+                raise StatWorkerCrash(f"Worker pipe failed during {func_name}: {e}")
+
+            try:
+                line = self._responses.get(timeout=timeout)
+            except queue.Empty:
+                # The worker is stuck on this request, so nothing it answers later can be trusted
+                self._discard()
+                raise StatWorkerTimeout(f"{func_name} did not answer within {timeout:g} s")
+
+            if not line:
+                self._discard()
+                raise StatWorkerCrash(f"Worker exited while handling {func_name}")
+
+            try:
+                response = json.loads(line)
+            except json.JSONDecodeError:
+                # The stream is out of sync with our requests, so start over with a fresh process
+                self._discard()
+                raise StatWorkerCrash(f"Worker returned invalid JSON for {func_name}: {line.strip()}")
+
+            if response.get('id') != request_id:
+                self._discard()
+                raise StatWorkerCrash(f"Worker answered request {response.get('id')} instead of {request_id}")
+
+            if 'error' in response:
+                raise StatBackendError(f"{func_name} failed: {response['error']}")
+
+            return response.get('result')
+
+    def _discard(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+
+    def close(self):
+        with self._lock:
+            if self.process is None:
+                return
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+
+class StatWorkerPool:
+    """A fixed set of StatWorkers shared between threads; each call uses whichever worker is idle.
+
+    Hedged calls start once ``min_samples`` successful latencies of the function are known
+    and are only sent when another worker is idle at that moment.
+    """
+
+    def __init__(self, size=1, hedge_percentile=0.95, min_samples=20, latency_window=500, **worker_kwargs):
+        self.workers = [StatWorker(**worker_kwargs) for _ in range(size)]
+        self._idle = queue.Queue()
+        for worker in self.workers:
+            self._idle.put(worker)
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.latency_window = latency_window
+        self.counts = dict.fromkeys(('calls', 'timeouts', 'crashes', 'retries', 'hedges', 'hedge_wins'), 0)
+        self._latencies = {}
+        self._stats_lock = threading.Lock()
+        self._executor = None
+
+    def call(self, func_name, *args, timeout=None, retries=0, hedge=False):
+        """Call a backend function with a per-attempt deadline, bounded retries and optional hedging."""
+        attempts = itertools.count()
+
+        def attempt():
+            if next(attempts):
+                self._count('retries')
+            if hedge:
+                return self._call_hedged(func_name, args, timeout)
+            return self._call_on(self._idle.get(), func_name, args, timeout)
+
+        return call_with_retries(attempt, retries)
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.counts[name] += 1
+
+    def _call_on(self, worker, func_name, args, timeout):
+        """Call on a worker taken from the idle queue and hand it back afterwards."""
+        self._count('calls')
+        start = time.perf_counter()
+        try:
+            result = worker.call(func_name, *args, timeout=timeout)
+        except StatWorkerTimeout:
+            self._count('timeouts')
+            raise
+        except StatWorkerCrash:
+            self._count('crashes')
+            raise
+        finally:
+            self._idle.put(worker)
+        with self._stats_lock:
+            self._latencies.setdefault(func_name, deque(maxlen=self.latency_window)).append(
+                time.perf_counter() - start)
+        return result
+
+    def hedge_delay(self, func_name):
+        """Seconds after which a call to ``func_name`` is hedged, or None until enough latencies are known."""
+        with self._stats_lock:
+            latencies = sorted(self._latencies.get(func_name, ()))
+        if len(latencies) < self.min_samples:
+            return None
+        return percentile(latencies, self.hedge_percentile)
+
+    def _call_hedged(self, func_name, args, timeout):
+        delay = self.hedge_delay(func_name)
+        if delay is None or len(self.workers) < 2:
+            return self._call_on(self._idle.get(), func_name, args, timeout)
+        if self._executor is None:
+            with self._stats_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=2 * len(self.workers),
+                                                        thread_name_prefix='stat-hedge')
+
+        # The hedge delay is measured like the latencies, from when a worker starts the call, so a call
+        # that is only waiting for a worker is never hedged
+        primary = self._executor.submit(self._call_on, self._idle.get(), func_name, args, timeout)
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+        try:
+            spare = self._idle.get_nowait()
+        except queue.Empty:
+            return primary.result()
+        self._count('hedges')
+        hedged = self._executor.submit(self._call_on, spare, func_name, args, timeout)
+
+        # The first answer wins; the other call still finishes (or hits its deadline) on its worker
+        done, _ = wait([primary, hedged], return_when=FIRST_COMPLETED)
+        first = done.pop()
+        if first.exception() is not None:
+            first = hedged if first is primary else primary
+        if first is hedged and hedged.exception() is None:
+            self._count('hedge_wins')
+        return first.result()
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self.counts)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        for worker in self.workers:
+            worker.close()
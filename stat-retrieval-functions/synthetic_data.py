@@ -0,0 +1,215 @@
+"""Deterministic synthetic game records for load-testing the pipeline offline.
+
+Every record has the shape structure_data_for_dnn in create-roster.py produces after
+update_json_with_votes.js has added the poll votes: GameID, Season, Week, HomePoints,
+AwayPoints, the four vote fields, and five HomeStats and five AwayStats period blocks built
+like build_roster_object (division, team stats and the QB/RBs/WRs/TEs/Defenders/OLs player
+groups). Schedule entries have the SCHEDULE.json shape. The same seed always gives the same
+output, so preprocess_data, training and the frontend can be scaled to 10x or 100x the real
+data:
+
+    python synthetic_data.py --games 150000 --seasons 2015-2023 --output synthetic_games.jsonl
+    python synthetic_data.py --games 1000 --max-players Defenders=20 --max-players WRs/TEs=10
+
+Each team keeps one roster per season, so players, their ids and recruiting scores repeat
+across that team's games and periods the way they do in the real data. Group sizes default
+to game_features.MAX_PLAYERS and can be raised to test larger layouts.
+"""
+import argparse
+import json
+import random
+import uuid
+
+from game_features import MAX_PLAYERS, ROLE_STAT_FIELDS, TEAM_STATS_FIELDS
+
+
+HOME_PERIODS = ['season', 'last3Games', 'last3GamesHome', 'lastSeason', 'seasonHome']
+AWAY_PERIODS = ['season', 'last3Games', 'last3GamesAway', 'lastSeason', 'seasonAway']
+PLAYER_GROUPS = ['QB', 'RBs', 'WRs/TEs', 'Defenders', 'OLs']
+COMMON_PLAYER_FIELDS = ['fumbles_per_game', 'period_completed']
+
+TEAM_STAT_RANGES = {
+    'win_percentage': (0, 1), 'strength_of_record': (0, 1), 'points_per_game': (10, 50),
+    'points_allowed_per_game': (10, 50), 'total_YPG': (250, 550), 'turnovers_per_game': (0, 3),
+    'penalties_per_game': (3, 10), '3rd_down_eff': (0.2, 0.6), 'redzone_eff': (0.5, 1),
+    'sacks_per_game': (0, 4), 'interceptions_per_game': (0, 2), 'forced_fumbles_per_game': (0, 2),
+    'yards_per_play': (4, 8), 'yards_allowed_per_game': (250, 550), 'yards_allowed_per_play': (4, 8),
+    'FBS_opponent_ratio': (0, 1),
+}
+
+PLAYER_STAT_RANGES = {
+    'fumbles_per_game': (0, 1), 'completion_percentage': (0.4, 0.75), 'passing_yards_per_game': (0, 350),
+    'TD_INT_ratio': (0, 5), 'QBR': (60, 180), 'rushing_yards': (0, 80), 'rushing_touchdowns': (0, 1),
+    'passing_touchdowns': (0, 3), 'rushing_yards_per_game': (0, 120), 'rushing_yards_per_carry': (0, 7),
+    'rushing_touchdowns_per_game': (0, 1.5), 'receiving_touchdowns_per_game': (0, 1),
+    'receptions_per_game': (0, 8), 'receiving_yards_per_game': (0, 110), 'receiving_yards_per_catch': (0, 18),
+    'tackles_per_game': (0, 9), 'sacks_per_game': (0, 1), 'interceptions_per_game': (0, 0.5),
+    'forced_fumbles_per_game': (0, 0.3), 'passes_defended_per_game': (0, 1.5),
+}
+
+assert set(TEAM_STAT_RANGES) == set(TEAM_STATS_FIELDS)
+
+
+def parse_range(text):
+    """'2023' -> [2023], '2015-2023' -> [2015, ..., 2023], '2015,2020-2023' -> [2015, 2020, ..., 2023]."""
+    values = []
+    for part in text.split(','):
+        start, _, end = part.strip().partition('-')
+        values.extend(range(int(start), int(end or start) + 1))
+    return values
+
+
+def parse_max_players(items):
+    """['Defenders=20', 'QB=2'] -> MAX_PLAYERS with those groups overridden."""
+    max_players = dict(MAX_PLAYERS)
+    for item in items or ():
+        group, _, count = item.partition('=')
+        if group not in max_players or not count.isdigit():
+            raise ValueError(f"Expected GROUP=COUNT with GROUP one of {', '.join(PLAYER_GROUPS)}, got {item!r}")
+        max_players[group] = int(count)
+    return max_players
+
+
+def stat_value(rng, field):
+    low, high = PLAYER_STAT_RANGES.get(field, TEAM_STAT_RANGES.get(field, (0, 1)))
+    return round(rng.uniform(low, high), 3)
+
+
+def recruiting_score(rng):
+    # Most players are unrated; the rest spread over the star thresholds in game_features
+    if rng.random() < 0.3:
+        return 0
+    return round(rng.uniform(0.7, 1.0), 4)
+
+
+class SyntheticGenerator:
+    """Builds games from a seeded random.Random, keeping one roster per team and season."""
+
+    def __init__(self, seed=0, seasons=range(2015, 2024), weeks=range(1, 16), n_teams=130,
+                 max_players=None, fcs_share=0.1):
+        self.rng = random.Random(seed)
+        self.seasons = list(seasons)
+        self.weeks = list(weeks)
+        self.teams = [self._uuid() for _ in range(n_teams)]
+        self.divisions = {team: 'FCS' if self.rng.random() < fcs_share else 'FBS' for team in self.teams}
+        self.max_players = dict(max_players or MAX_PLAYERS)
+        self.rosters = {}
+
+    def _uuid(self):
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def roster(self, team, season):
+        """Player ids and recruiting scores for each group of one team's season roster."""
+        key = (team, season)
+        if key not in self.rosters:
+            self.rosters[key] = {group: [(self._uuid(), recruiting_score(self.rng)) for _ in range(count)]
+                                 for group, count in self.max_players.items()}
+        return self.rosters[key]
+
+    def player(self, group, player_id, score):
+        fields = ROLE_STAT_FIELDS.get(group, COMMON_PLAYER_FIELDS)
+        player = {'player_id': player_id, 'recruiting_score': score}
+        for field in fields:
+            if field == 'period_completed':
+                player[field] = self.rng.choice(['True', 'False'])
+            else:
+                player[field] = stat_value(self.rng, field)
+        return player
+
+    def period_block(self, team, season, period):
+        block = {'division': self.divisions[team]}
+        block.update((field, stat_value(self.rng, field)) for field in TEAM_STATS_FIELDS)
+        for group, players in self.roster(team, season).items():
+            # Injuries and depth vary by period, but every group keeps at least one player
+            count = self.rng.randint(max(1, len(players) - 2), len(players)) if players else 0
+            block[group] = [self.player(group, player_id, score) for player_id, score in players[:count]]
+        block['period'] = period
+        return block
+
+    def votes(self, team, poll_division):
+        if self.divisions[team] != poll_division or self.rng.random() < 0.7:
+            return 0
+        return self.rng.randint(1, 1500)
+
+    def game(self):
+        home, away = self.rng.sample(self.teams, 2)
+        season = self.rng.choice(self.seasons)
+        week = self.rng.choice(self.weeks)
+        return {
+            'GameID': self._uuid(),
+            'Season': str(season),
+            'Week': str(week),
+            'HomePoints': str(self.rng.randint(0, 63)),
+            'AwayPoints': str(self.rng.randint(0, 59)),
+            'HomeStats': [self.period_block(home, season, period) for period in HOME_PERIODS],
+            'AwayStats': [self.period_block(away, season, period) for period in AWAY_PERIODS],
+            'HomeAPVotes': self.votes(home, 'FBS'),
+            'AwayAPVotes': self.votes(away, 'FBS'),
+            'HomeFCSVotes': self.votes(home, 'FCS'),
+            'AwayFCSVotes': self.votes(away, 'FCS'),
+        }
+
+    def games(self, n_games):
+        for _ in range(n_games):
+            yield self.game()
+
+
+def schedule_entry(game):
+    return {key: game[key] for key in ('GameID', 'HomePoints', 'AwayPoints', 'Season', 'Week')}
+
+
+def generate_games(n_games, seed=0, **options):
+    """The first ``n_games`` games for ``seed``; options are passed to SyntheticGenerator."""
+    return list(SyntheticGenerator(seed, **options).games(n_games))
+
+
+def write_games(games, output_path, schedule_path=None):
+    """Stream games to a JSON array (or one game per line for a .jsonl path) without holding them all."""
+    lines = output_path.endswith('.jsonl')
+    schedule = []
+    count = 0
+    with open(output_path, 'w') as file:
+        if not lines:
+            file.write('[')
+        for game in games:
+            if lines:
+                file.write(json.dumps(game) + '\n')
+            else:
+                file.write((',\n' if count else '\n') + json.dumps(game))
+            if schedule_path:
+                schedule.append(schedule_entry(game))
+            count += 1
+        if not lines:
+            file.write('\n]\n')
+    if schedule_path:
+        with open(schedule_path, 'w') as file:
+            json.dump(schedule, file, indent=4)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write deterministic synthetic game records.')
+    parser.add_argument('--games', type=int, default=10000, help='Number of games to generate')
+    parser.add_argument('--seasons', type=parse_range, default=parse_range('2015-2023'),
+                        help='Seasons to spread the games over, e.g. 2015-2023')
+    parser.add_argument('--weeks', type=parse_range, default=parse_range('1-15'), help='Weeks, e.g. 1-15')
+    parser.add_argument('--teams', type=int, default=130, help='Number of teams')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-players', action='append', metavar='GROUP=COUNT',
+                        help='Players per group, e.g. Defenders=20 (default: game_features.MAX_PLAYERS)')
+    parser.add_argument('--output', default='synthetic_games.json',
+                        help='Output file; a .jsonl path is written one game per line')
+    parser.add_argument('--schedule-output', default=None, help='Also write SCHEDULE.json-style entries here')
+    args = parser.parse_args()
+
+    try:
+        max_players = parse_max_players(args.max_players)
+    except ValueError as error:
+        parser.error(str(error))
+    generator = SyntheticGenerator(args.seed, args.seasons, args.weeks, args.teams, max_players)
+    count = write_games(generator.games(args.games), args.output, args.schedule_output)
+    print(f"Wrote {count} games to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
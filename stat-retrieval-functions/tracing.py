@@ -0,0 +1,184 @@
+"""Lightweight span tracing for the ingestion pipeline.
+
+A span times one unit of work and carries attributes such as the backend function, team
+and period:
+
+    with tracer.span('getTeamStatsForPeriod', category='backend', team=team_id, period=period):
+        ...
+
+Spans nest per thread (each thread keeps its own stack of open spans), so a game span
+contains its period and backend-call spans. Work timed outside Python, such as the queries
+the Node worker runs inside getGameStats, is added with Tracer.record(). Finished spans feed
+three outputs:
+
+* a duration histogram per (category, name), and per (category, name, period) for spans with a
+  ``period`` attribute, summarized as count, total, p50, p95 and p99
+* the N slowest spans with their attributes
+* an optional Chrome trace-event file (open it in chrome://tracing or https://ui.perfetto.dev)
+
+Tracer.report() prints the histograms and the slowest spans and writes the trace file;
+create-roster.py calls it at exit.
+"""
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Span:
+    def __init__(self, name, category, attributes, parent, start=None):
+        self.name = name
+        self.category = category
+        self.attributes = attributes
+        self.parent = parent
+        self.start = time.perf_counter() if start is None else start
+        self.duration = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+class Tracer:
+    def __init__(self, top_n=20, max_events=1_000_000, breakdown='period'):
+        self.top_n = top_n
+        # Attribute whose values get histograms of their own, so e.g. each period's queries can be compared
+        self.breakdown = breakdown
+        # Trace events beyond this many are dropped from the trace file; histograms still count them
+        self.max_events = max_events
+        self.durations = {}
+        self.events = []
+        self.dropped_events = 0
+        self._slowest = []
+        self._sequence = itertools.count()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current(self):
+        """The innermost open span on this thread, or None."""
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name, category='', **attributes):
+        stack = self._stack()
+        span = Span(name, category, attributes, stack[-1] if stack else None)
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as error:
+            span.set(error=type(error).__name__)
+            raise
+        finally:
+            span.duration = time.perf_counter() - span.start
+            stack.pop()
+            self._record(span)
+
+    def record(self, name, category, start, duration, **attributes):
+        """Record a span timed elsewhere, e.g. a query the Node worker ran; ``start`` is a perf_counter() time."""
+        span = Span(name, category, attributes, self.current(), start)
+        span.duration = duration
+        self._record(span)
+
+    def _record(self, span):
+        keys = [(span.category, span.name, '')]
+        if self.breakdown in span.attributes and span.category != self.breakdown:
+            keys.append((span.category, span.name, str(span.attributes[self.breakdown])))
+        with self._lock:
+            for key in keys:
+                self.durations.setdefault(key, []).append(span.duration)
+
+            entry = (span.duration, next(self._sequence), span)
+            if len(self._slowest) < self.top_n:
+                heapq.heappush(self._slowest, entry)
+            elif span.duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+            if len(self.events) < self.max_events:
+                self.events.append({
+                    'name': span.name,
+                    'cat': span.category,
+                    'ph': 'X',
+                    'ts': (span.start - self._origin) * 1e6,
+                    'dur': span.duration * 1e6,
+                    'pid': os.getpid(),
+                    'tid': threading.get_ident(),
+                    'args': {key: _jsonable(value) for key, value in span.attributes.items()},
+                })
+            else:
+                self.dropped_events += 1
+
+    def histograms(self):
+        """{(category, name, breakdown value or ''): {'count', 'total', 'p50', 'p95', 'p99', 'max'}} in seconds."""
+        with self._lock:
+            durations = {key: sorted(values) for key, values in self.durations.items()}
+        return {key: {'count': len(values), 'total': sum(values), 'p50': percentile(values, 0.50),
+                      'p95': percentile(values, 0.95), 'p99': percentile(values, 0.99), 'max': values[-1]}
+                for key, values in durations.items()}
+
+    def slowest(self):
+        """The slowest spans seen so far, slowest first."""
+        with self._lock:
+            slowest = sorted(self._slowest, key=lambda entry: entry[:2], reverse=True)
+        return [span for _, _, span in slowest[:self.top_n]]
+
+    def write_chrome_trace(self, path):
+        with self._lock:
+            events = list(self.events)
+        with open(path + '.tmp', 'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+        os.replace(path + '.tmp', path)
+        return len(events)
+
+    def summary(self):
+        histograms = self.histograms()
+        if not histograms:
+            return "No spans were recorded."
+        lines = [f"{'category':<10} {'name':<44} {'count':>7} {'total s':>9} "
+                 f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+        # Each span's overall row comes first, followed by its breakdown rows, slowest total first
+        totals = {key[:2]: stats['total'] for key, stats in histograms.items() if not key[2]}
+        order = sorted(histograms, key=lambda key: (-totals[key[:2]], key[:2], bool(key[2]), -histograms[key]['total']))
+        for category, name, value in order:
+            stats = histograms[(category, name, value)]
+            label = f"  {self.breakdown}={value}" if value else name
+            lines.append(f"{category:<10} {label:<44} {stats['count']:>7} {stats['total']:>9.2f} "
+                         f"{stats['p50'] * 1e3:>9.1f} {stats['p95'] * 1e3:>9.1f} "
+                         f"{stats['p99'] * 1e3:>9.1f} {stats['max'] * 1e3:>9.1f}")
+        lines.append(f"\nSlowest {self.top_n} spans:")
+        for span in self.slowest():
+            attributes = ', '.join(f"{key}={value}" for key, value in span.attributes.items())
+            lines.append(f"  {span.duration * 1e3:9.1f} ms  {span.category}/{span.name}  {attributes}")
+        return '\n'.join(lines)
+
+    def report(self, trace_path=None):
+        print(self.summary())
+        if trace_path:
+            count = self.write_chrome_trace(trace_path)
+            dropped = f" ({self.dropped_events} dropped)" if self.dropped_events else ''
+            print(f"Wrote {count} trace events to {trace_path}{dropped}")
+
+
+def _jsonable(value):
+    return value if isinstance(value, (str, int, float, bool)) or value is None else str(value)
+
+
+# Shared by the ingestion modules
+tracer = Tracer()